@@ -10,10 +10,126 @@ class Settings:
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "./static/documents")  # default added
     CHROMA_COLLECTION: str = "document_embeddings"
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
-    
-    # Validation
-    if not GEMINI_API_KEY:
-        raise ValueError("GEMINI_API_KEY not set in environment variables")
+    CLEAN_ON_INGEST: bool = os.getenv("CLEAN_ON_INGEST", "true").lower() == "true"
+    # Chunks whose dirtiness score (0..1) after local repair is below this skip the LLM cleaner
+    CLEAN_DIRTY_THRESHOLD: float = float(os.getenv("CLEAN_DIRTY_THRESHOLD", "0.15"))
+
+    # LLM backend: "gemini", or "fake" for the deterministic local stand-in (no API key needed)
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "gemini").lower()
+    FAKE_EMBEDDING_DIM: int = int(os.getenv("FAKE_EMBEDDING_DIM", "768"))
+    FAKE_EMBED_LATENCY_MS: float = float(os.getenv("FAKE_EMBED_LATENCY_MS", "0"))
+    FAKE_LLM_LATENCY_MS: float = float(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+
+    # Gemini client limits
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+    GEMINI_RATE_LIMIT_RPS: float = float(os.getenv("GEMINI_RATE_LIMIT_RPS", "10"))
+    GEMINI_RATE_BURST: int = int(os.getenv("GEMINI_RATE_BURST", "10"))
+    GEMINI_MAX_RETRIES: int = int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+    GEMINI_BACKOFF_BASE: float = float(os.getenv("GEMINI_BACKOFF_BASE", "0.5"))
+    GEMINI_BACKOFF_MAX: float = float(os.getenv("GEMINI_BACKOFF_MAX", "16"))
+
+    # Persistent embedding cache
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH: str = os.getenv("EMBEDDING_CACHE_PATH", "./cache/embeddings.sqlite3")
+    EMBEDDING_CACHE_MAX_BYTES: int = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+    # Hybrid BM25 + vector retrieval
+    HYBRID_SEARCH_ENABLED: bool = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+    BM25_INDEX_PATH: str = os.getenv("BM25_INDEX_PATH", "./cache/bm25.sqlite3")
+    HYBRID_CANDIDATE_MULTIPLIER: int = int(os.getenv("HYBRID_CANDIDATE_MULTIPLIER", "3"))
+    RRF_K: int = int(os.getenv("RRF_K", "60"))
+
+    # Exact + semantic answer cache in front of /query
+    ANSWER_CACHE_ENABLED: bool = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_MAX_ENTRIES: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+    ANSWER_CACHE_TTL_SECONDS: float = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+    SEMANTIC_CACHE_MAX_DISTANCE: float = float(os.getenv("SEMANTIC_CACHE_MAX_DISTANCE", "0.05"))
+
+    # Batched ingestion embedding
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+    EMBEDDING_BATCH_CONCURRENCY: int = int(os.getenv("EMBEDDING_BATCH_CONCURRENCY", "4"))
+    EMBEDDING_BATCH_RETRIES: int = int(os.getenv("EMBEDDING_BATCH_RETRIES", "2"))
+
+    # Background ingestion jobs
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", "2"))
+    JOB_STORE_PATH: str = os.getenv("JOB_STORE_PATH", "./cache/jobs.sqlite3")
+
+    # Observability
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+
+    # Streaming ingestion: uploads are spooled to disk in chunks and parsed in page ranges
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+    PDF_PAGE_RANGE_SIZE: int = int(os.getenv("PDF_PAGE_RANGE_SIZE", "16"))
+    PDF_EXTRACT_PARALLELISM: int = int(os.getenv("PDF_EXTRACT_PARALLELISM", str(os.cpu_count() or 2)))
+    PDF_BOILERPLATE_SAMPLE_PAGES: int = int(os.getenv("PDF_BOILERPLATE_SAMPLE_PAGES", "24"))
+
+    # Document registry: filename -> chunk ids, so deletes and listings never scan Chroma
+    DOCUMENT_REGISTRY_PATH: str = os.getenv("DOCUMENT_REGISTRY_PATH", "./cache/documents.sqlite3")
+    DELETE_BATCH_SIZE: int = int(os.getenv("DELETE_BATCH_SIZE", "500"))
+
+    # Near-duplicate chunks (repeated warnings, boilerplate) folded into one canonical chunk
+    DEDUP_ENABLED: bool = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_INDEX_PATH: str = os.getenv("DEDUP_INDEX_PATH", "./cache/dedup.sqlite3")
+    DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.85"))  # estimated Jaccard of word shingles
+    DEDUP_NUM_PERM: int = int(os.getenv("DEDUP_NUM_PERM", "128"))
+    DEDUP_BANDS: int = int(os.getenv("DEDUP_BANDS", "16"))
+
+    # Compact vectors: Matryoshka truncation (0 = full model width) and an optional
+    # quantized dense search path ("none", "float16" or "int8") with float re-scoring
+    EMBEDDING_DIMENSIONS: int = int(os.getenv("EMBEDDING_DIMENSIONS", "0"))
+    VECTOR_QUANTIZATION: str = os.getenv("VECTOR_QUANTIZATION", "none").lower()
+    QUANTIZED_STORE_PATH: str = os.getenv("QUANTIZED_STORE_PATH", "./cache/vectors")
+    QUANTIZED_RESCORE_MULTIPLIER: int = int(os.getenv("QUANTIZED_RESCORE_MULTIPLIER", "4"))
+
+    # /query/batch limits
+    QUERY_BATCH_MAX_QUESTIONS: int = int(os.getenv("QUERY_BATCH_MAX_QUESTIONS", "100"))
+    QUERY_BATCH_ANSWER_CONCURRENCY: int = int(os.getenv("QUERY_BATCH_ANSWER_CONCURRENCY", "4"))
+
+    # Answer context assembly: MMR over retrieved chunks, packed into a token budget
+    MMR_LAMBDA: float = float(os.getenv("MMR_LAMBDA", "0.7"))  # 1.0 = relevance only
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1000"))
+    CONTEXT_MAX_CHUNKS: int = int(os.getenv("CONTEXT_MAX_CHUNKS", "5"))
+
+    # Scaling out: "embedded" (one process, PersistentClient), "server" (every worker
+    # talks to one Chroma server) or "replica" (read-only, serves the published snapshot)
+    STORE_MODE: str = os.getenv("STORE_MODE", "embedded").lower()
+    CHROMA_HOST: str = os.getenv("CHROMA_HOST", "localhost")
+    CHROMA_PORT: int = int(os.getenv("CHROMA_PORT", "8000"))
+    CHROMA_HTTP_MAX_CONNECTIONS: int = int(os.getenv("CHROMA_HTTP_MAX_CONNECTIONS", "16"))
+    # One process per shared volume holds this lock and runs ingestion
+    WRITER_LOCK_PATH: str = os.getenv("WRITER_LOCK_PATH", "./cache/writer.lock")
+    STORE_VERSION_PATH: str = os.getenv("STORE_VERSION_PATH", "./cache/store_version")
+    STORE_SYNC_INTERVAL_SECONDS: float = float(os.getenv("STORE_SYNC_INTERVAL_SECONDS", "1"))
+    INGEST_POLL_SECONDS: float = float(os.getenv("INGEST_POLL_SECONDS", "2"))
+    # Snapshots the writer publishes for replicas
+    SNAPSHOT_DIR: str = os.getenv("SNAPSHOT_DIR", "./cache/snapshots")
+    SNAPSHOT_PUBLISH_ENABLED: bool = os.getenv("SNAPSHOT_PUBLISH_ENABLED", "false").lower() == "true"
+    SNAPSHOT_PUBLISH_INTERVAL_SECONDS: float = float(os.getenv("SNAPSHOT_PUBLISH_INTERVAL_SECONDS", "30"))
+    SNAPSHOT_KEEP: int = int(os.getenv("SNAPSHOT_KEEP", "3"))
+
+    # Cited pages served as single-page PDFs (/document/{filename}/pages/{pages}),
+    # extracted on first request into a size-bounded LRU disk cache
+    PAGE_CACHE_DIR: str = os.getenv("PAGE_CACHE_DIR", "./cache/pages")
+    PAGE_CACHE_MAX_BYTES: int = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    PAGE_RANGE_MAX_PAGES: int = int(os.getenv("PAGE_RANGE_MAX_PAGES", "20"))
+    # Make query results link to the page endpoint instead of the full PDF's #page= fragment
+    PAGE_LINKS_ENABLED: bool = os.getenv("PAGE_LINKS_ENABLED", "false").lower() == "true"
+
+    # Startup: warmup loads the vector index, primes caches with these queries
+    # ("|"-separated) and spawns PDF workers before /readyz reports ready
+    WARMUP_ENABLED: bool = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    WARMUP_QUERIES: list = [q.strip() for q in os.getenv("WARMUP_QUERIES", "").split("|") if q.strip()]
+
+    # Executor pools keeping blocking work off the event loop
+    THREAD_POOL_SIZE: int = int(os.getenv("THREAD_POOL_SIZE", "16"))
+    PROCESS_POOL_SIZE: int = int(os.getenv("PROCESS_POOL_SIZE", str(os.cpu_count() or 2)))
+
+    def validate(self) -> None:
+        """Fail on settings the service cannot run with; checked at startup, not at import."""
+        if self.LLM_BACKEND == "gemini" and not self.GEMINI_API_KEY:
+            raise ValueError("GEMINI_API_KEY not set in environment variables")
+        if self.STORE_MODE not in ("embedded", "server", "replica"):
+            raise ValueError(f"Unknown STORE_MODE: {self.STORE_MODE}")
 
 settings = Settings()
 
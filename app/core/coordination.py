@@ -0,0 +1,101 @@
+import fcntl
+import os
+from typing import Optional
+
+from app.core.config import settings, logger
+
+
+class WriterLock:
+    """
+    Elects the single writer among the processes sharing a data volume
+    (uvicorn workers, containers): whoever holds an exclusive flock on
+    WRITER_LOCK_PATH runs ingestion. The OS drops the lock when the
+    holder exits, so a restarted process can take over.
+    """
+
+    _instance = None
+
+    def __init__(self, path: str = settings.WRITER_LOCK_PATH):
+        self.path = path
+        self._file = None
+
+    @classmethod
+    def get_instance(cls) -> "WriterLock":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        """Take the lock without blocking; returns whether this process is the writer."""
+        if self._file is not None:
+            return True
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        f = open(self.path, "a+")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            return False
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        self._file = f
+        logger.info("Process %d holds the writer lock", os.getpid())
+        return True
+
+    def release(self) -> None:
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+class StoreVersion:
+    """
+    Counter in a small shared file, bumped after every corpus write, so
+    other processes know to drop their answer caches and in-memory stats.
+    Bumps are serialized with an flock on STORE_VERSION_PATH + ".lock".
+    """
+
+    _instance = None
+
+    def __init__(self, path: str = settings.STORE_VERSION_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    @classmethod
+    def get_instance(cls) -> "StoreVersion":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def read(self) -> Optional[int]:
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def bump(self) -> int:
+        """
+        Increment the counter. The read and the write happen under an
+        exclusive flock on a sidecar file, so concurrent bumps from other
+        processes (or threads) are never lost; readers only ever see whole
+        values thanks to the rename.
+        """
+        with open(f"{self.path}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                version = (self.read() or 0) + 1
+                tmp = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp, "w") as f:
+                    f.write(str(version))
+                os.replace(tmp, self.path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        return version
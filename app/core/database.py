@@ -1,24 +1,111 @@
+from typing import Any, Callable, List, Optional
 
-import chromadb
-from chromadb.config import Settings as ChromaSettings
-from app.core.config import settings
+from app.core.config import settings, logger
+
+# Collections a swap_collection goes through next to the live one
+STAGING_SUFFIX = "__staging"
+BACKUP_SUFFIX = "__previous"
 
 class VectorDB:
     _instance = None
-    
+
     @classmethod
     def get_instance(cls):
         if cls._instance is None:
-            cls._instance = chromadb.PersistentClient(
-                path=settings.VECTOR_DB_PATH,
-                settings=ChromaSettings(allow_reset=True)
-            )
+            # Imported on first use: chromadb dominates import time
+            import chromadb
+            from chromadb.config import Settings as ChromaSettings
+
+            if settings.STORE_MODE == "server":
+                # One pooled HTTP client per process, shared by every I/O thread
+                cls._instance = chromadb.HttpClient(
+                    host=settings.CHROMA_HOST,
+                    port=settings.CHROMA_PORT,
+                    settings=ChromaSettings(
+                        chroma_http_max_connections=settings.CHROMA_HTTP_MAX_CONNECTIONS,
+                        chroma_http_max_keepalive_connections=settings.CHROMA_HTTP_MAX_CONNECTIONS,
+                    ),
+                )
+            else:
+                cls._instance = chromadb.PersistentClient(
+                    path=settings.VECTOR_DB_PATH,
+                    settings=ChromaSettings(allow_reset=True)
+                )
         return cls._instance
 
 # Initialize collection
 def get_collection():
+    if settings.STORE_MODE == "replica":
+        # Read-only view of the latest published snapshot; no Chroma in this process
+        from app.services.snapshot import ReplicaCollection
+
+        return ReplicaCollection.get_instance()
     client = VectorDB.get_instance()
+    if settings.STORE_MODE == "embedded":
+        # Before get_or_create could put an empty collection where a swap left none
+        recover_collection_swap(client)
     return client.get_or_create_collection(
         name=settings.CHROMA_COLLECTION,
         metadata={"hnsw:space": "cosine"}
-    )
\ No newline at end of file
+    )
+
+def _collection_names(client) -> List[str]:
+    return [c if isinstance(c, str) else c.name for c in client.list_collections()]
+
+def recover_collection_swap(client=None, name: Optional[str] = None) -> Optional[str]:
+    """
+    Finish or undo a swap_collection that was interrupted, before anything
+    is deleted:
+    - staging only: the fill never finished; the staging copy is dropped
+    - staging + backup, no live: it stopped between the renames; staging
+      was complete, so it is renamed in and the backup dropped
+    - backup + live: only the backup drop was left
+    - backup only: the backup is restored under the live name
+    Returns what was done, or None if there was nothing to recover.
+    """
+    client = client or VectorDB.get_instance()
+    name = name or settings.CHROMA_COLLECTION
+    staging, backup = f"{name}{STAGING_SUFFIX}", f"{name}{BACKUP_SUFFIX}"
+    names = set(_collection_names(client))
+    if backup not in names:
+        if staging not in names:
+            return None
+        client.delete_collection(staging)
+        action = "dropped an unfinished staging collection"
+    else:
+        if name in names and staging in names:
+            # The live name was re-created after the crash; only an empty one is safe to drop
+            if client.get_collection(name).count():
+                raise RuntimeError(f"{name}, {staging} and {backup} all exist; resolve the interrupted swap by hand")
+            client.delete_collection(name)
+            names.discard(name)
+        if name not in names and staging not in names:
+            client.get_collection(backup).modify(name=name)
+            action = "restored the previous collection"
+        else:
+            if name not in names:
+                client.get_collection(staging).modify(name=name)
+            client.delete_collection(backup)
+            action = "finished the interrupted swap"
+    logger.warning("Collection %s: %s", name, action)
+    return action
+
+def swap_collection(fill: Callable[[Any], Any], client=None, name: Optional[str] = None) -> Any:
+    """
+    Replace collection `name` with a freshly built one: `fill(staging)`
+    loads a new staging collection, then the live collection is renamed to
+    a backup, staging renamed to `name` and the backup dropped. Nothing is
+    deleted until the new collection is in place, and recover_collection_swap
+    (run first here) finishes or undoes a swap interrupted at any step.
+    Returns what `fill` returned.
+    """
+    client = client or VectorDB.get_instance()
+    name = name or settings.CHROMA_COLLECTION
+    recover_collection_swap(client, name)
+    staging = client.create_collection(name=f"{name}{STAGING_SUFFIX}", metadata={"hnsw:space": "cosine"})
+    result = fill(staging)
+    live = client.get_or_create_collection(name=name, metadata={"hnsw:space": "cosine"})
+    live.modify(name=f"{name}{BACKUP_SUFFIX}")
+    staging.modify(name=name)
+    client.delete_collection(f"{name}{BACKUP_SUFFIX}")
+    return result
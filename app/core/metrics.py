@@ -0,0 +1,85 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+
+STAGE_LATENCY = Histogram(
+    "pipeline_stage_seconds",
+    "Latency of each /query and /upload pipeline stage",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+LLM_CALLS = Counter("llm_calls_total", "Gemini API calls", ["kind", "status"])
+LLM_TOKENS = Counter("llm_tokens_total", "Gemini tokens reported by usage metadata", ["kind", "direction"])
+CHROMA_RESULTS = Histogram(
+    "chroma_query_results",
+    "Results returned per vector search",
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50),
+)
+THRESHOLD_CANDIDATES = Counter("threshold_filter_candidates_total", "Results checked by the similarity threshold")
+THRESHOLD_DROPPED = Counter("threshold_filter_dropped_total", "Results dropped by the similarity threshold")
+CONTEXT_CHUNKS = Histogram(
+    "answer_context_chunks",
+    "Chunks packed into each answer prompt",
+    buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20),
+)
+CONTEXT_TOKENS = Histogram(
+    "answer_context_tokens",
+    "Estimated tokens of each answer prompt context",
+    buckets=(50, 100, 250, 500, 750, 1000, 1500, 2000, 4000, 8000),
+)
+CONTEXT_TOKENS_SAVED = Counter(
+    "answer_context_tokens_saved_total",
+    "Estimated context tokens avoided versus sending every retrieved chunk",
+)
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by cache and outcome", ["cache", "result"])
+DEDUP_CHUNKS = Counter("dedup_chunks_total", "Chunks checked by the near-duplicate filter", ["result"])
+CLEANED_CHUNKS = Counter("cleaned_chunks_total", "Chunks cleaned at ingest, by cleaner", ["cleaner"])
+
+# Per-request stage timings, surfaced in the Server-Timing header
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage into the histogram and the current request's timings."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.labels(stage=name).observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+async def timed(name: str, awaitable):
+    """Await under a stage timer; handy inside asyncio.gather."""
+    with stage(name):
+        return await awaitable
+
+
+def begin_request_timings() -> List[Tuple[str, float]]:
+    timings: List[Tuple[str, float]] = []
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing_header(timings: List[Tuple[str, float]]) -> str:
+    """Sum repeated stages and render `name;dur=<ms>` entries."""
+    totals: Dict[str, float] = {}
+    for name, elapsed in timings:
+        totals[name] = totals.get(name, 0.0) + elapsed
+    return ", ".join(f"{name};dur={elapsed * 1000:.1f}" for name, elapsed in totals.items())
+
+
+def record_llm_usage(kind: str, response) -> None:
+    """Count prompt/output tokens when the response carries usage metadata."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    LLM_TOKENS.labels(kind=kind, direction="prompt").inc(getattr(usage, "prompt_token_count", 0) or 0)
+    LLM_TOKENS.labels(kind=kind, direction="output").inc(getattr(usage, "candidates_token_count", 0) or 0)
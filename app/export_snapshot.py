@@ -0,0 +1,62 @@
+"""
+Export the collection as a portable, versioned snapshot directory.
+
+- vectors.npy: float32 embeddings, memory-mappable with numpy.load(mmap_mode="r")
+- ids / documents / metadatas: columnar string files (UTF-8 blob + int64 offsets)
+- near-duplicate signatures and references (DEDUP_ENABLED), so chunks
+  folded at ingest stay reachable after an import
+- manifest.json: format version, row count, width and per-file SHA-256
+
+The snapshot restores with `python -m app.import_snapshot` without any
+embedding calls, and can be served directly by STORE_MODE=replica
+(--publish writes it into SNAPSHOT_DIR as the current version). Export
+while no ingestion is running, with the same environment as the server:
+
+    python -m app.export_snapshot ./backups/corpus-2026-10 --batch-size 5000
+"""
+import argparse
+import json
+import os
+import shutil
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", nargs="?", help="directory to create (omit with --publish)")
+    parser.add_argument("--publish", action="store_true", help="publish into SNAPSHOT_DIR for replicas")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    if not args.path and not args.publish:
+        parser.error("give a target path or --publish")
+
+    from app.core.config import settings
+    from app.core.database import get_collection
+    from app.services.dedup import NearDuplicateIndex
+    from app.services.snapshot import publish_snapshot, write_snapshot
+
+    if settings.STORE_MODE == "replica":
+        raise SystemExit("STORE_MODE=replica has no collection to export; run against the writer's store")
+    collection = get_collection()
+    fields = {"collection_name": settings.CHROMA_COLLECTION, "llm_backend": settings.LLM_BACKEND}
+    if settings.DEDUP_ENABLED:
+        fields["dedup_index"] = NearDuplicateIndex.get_instance()
+
+    if args.publish:
+        manifest = publish_snapshot(collection, batch_size=args.batch_size, **fields)
+    else:
+        if os.path.exists(args.path):
+            raise SystemExit(f"{args.path} already exists")
+        staging = f"{args.path}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        manifest = write_snapshot(collection, staging, args.batch_size, **fields)
+        os.replace(staging, args.path)
+
+    size = sum(entry["bytes"] for entry in manifest["files"].values())
+    report = {key: manifest[key] for key in ("count", "dimensions", "seconds")}
+    report["bytes"] = size
+    report["mb_per_s"] = round(size / 1e6 / max(manifest["seconds"], 1e-9), 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
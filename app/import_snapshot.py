@@ -0,0 +1,111 @@
+"""
+Bulk-load a snapshot written by `python -m app.export_snapshot`.
+
+- Verifies every file against the manifest checksums (skip with --no-verify)
+- Loads stored vectors in large batches; nothing is re-embedded
+- --replace loads into a staging collection and swaps it in under the
+  configured name; --merge upserts into the existing collection
+- Clears the derived indexes (document registry, BM25, quantized vectors)
+  so the next server start rebuilds them from the imported collection
+- Restores the snapshot's near-duplicate signatures and references; with
+  --replace they replace the current ones
+
+Run with the server stopped and the same environment it uses:
+
+    python -m app.import_snapshot ./backups/corpus-2026-10 --replace
+"""
+import argparse
+import json
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", help="snapshot directory")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--replace", action="store_true", help="replace the current collection")
+    mode.add_argument("--merge", action="store_true", help="upsert into the current collection")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--no-verify", action="store_true", help="skip checksum verification")
+    args = parser.parse_args()
+
+    from app.core.config import settings, logger
+    from app.core.coordination import StoreVersion
+    from app.core.database import VectorDB, get_collection, recover_collection_swap, swap_collection
+    from app.services.dedup import NearDuplicateIndex
+    from app.services.document_registry import DocumentRegistry
+    from app.services.lexical_index import LexicalIndex
+    from app.services.quantized_store import QuantizedVectorStore
+    from app.services.snapshot import SnapshotCollection, load_dedup, load_snapshot, verify_snapshot
+
+    if settings.STORE_MODE == "replica":
+        raise SystemExit("STORE_MODE=replica is read-only; import on the writer's store")
+    start = time.perf_counter()
+    if not args.no_verify:
+        verify_snapshot(args.path)
+    verified = time.perf_counter()
+    snapshot = SnapshotCollection(args.path)
+    manifest = snapshot.manifest
+    if manifest.get("llm_backend") not in (None, settings.LLM_BACKEND):
+        logger.warning(
+            "Snapshot vectors come from LLM_BACKEND=%s but this server uses %s; queries will not match them",
+            manifest["llm_backend"], settings.LLM_BACKEND,
+        )
+    if settings.EMBEDDING_DIMENSIONS and manifest["dimensions"] not in (0, settings.EMBEDDING_DIMENSIONS):
+        logger.warning(
+            "Snapshot vectors are %d wide but EMBEDDING_DIMENSIONS=%d; run `python -m app.migrate_vectors` after importing",
+            manifest["dimensions"], settings.EMBEDDING_DIMENSIONS,
+        )
+
+    client = VectorDB.get_instance()
+    # A swap interrupted by an earlier run is finished or undone before anything else
+    recover_collection_swap(client)
+    collection = get_collection()
+    existing = collection.count()
+    if existing and not (args.replace or args.merge):
+        raise SystemExit(f"The collection already holds {existing} chunks; pass --replace or --merge")
+    if existing and args.merge:
+        sample = collection.get(include=["embeddings"], limit=1)
+        width = len(sample["embeddings"][0])
+        if manifest["dimensions"] and width != manifest["dimensions"]:
+            raise SystemExit(f"Cannot merge {manifest['dimensions']}-wide vectors into a {width}-wide collection")
+
+    batch_size = max(1, min(args.batch_size, client.get_max_batch_size()))
+
+    def progress(done: int, total: int) -> None:
+        logger.info("Imported %d/%d chunks", done, total)
+
+    if existing and args.replace:
+        loaded = swap_collection(lambda staging: load_snapshot(snapshot, staging, batch_size, progress), client)
+    else:
+        loaded = load_snapshot(snapshot, collection, batch_size, progress)
+
+    # Derived from the collection; the server rebuilds them at startup
+    DocumentRegistry.get_instance().clear()
+    LexicalIndex.get_instance().clear()
+    if settings.VECTOR_QUANTIZATION != "none":
+        QuantizedVectorStore.get_instance().clear()
+    dedup = None
+    if settings.DEDUP_ENABLED:
+        dedup_index = NearDuplicateIndex.get_instance()
+        if args.replace:
+            dedup_index.clear()
+        dedup = load_dedup(snapshot, dedup_index)
+    StoreVersion.get_instance().bump()
+
+    seconds = time.perf_counter() - start
+    report = {
+        "chunks": loaded,
+        "collection_count": get_collection().count(),
+        "dimensions": manifest["dimensions"],
+        "snapshot_version": manifest.get("version"),
+        "dedup": dedup,
+        "verify_seconds": round(verified - start, 2),
+        "seconds": round(seconds, 2),
+        "chunks_per_s": round(loaded / max(seconds, 1e-9), 1),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
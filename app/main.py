@@ -1,27 +1,71 @@
 import os
+import json
+import asyncio
 import shutil
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from urllib.parse import quote
+import numpy as np
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings, logger
+from app.core.coordination import StoreVersion, WriterLock
+from app.core.executors import run_in_thread, shutdown_executors
+from app.core.lazy import Lazy
+from app.core.metrics import (
+    THRESHOLD_CANDIDATES,
+    THRESHOLD_DROPPED,
+    begin_request_timings,
+    server_timing_header,
+    stage,
+)
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.services.pdf_processor import PDFProcessor
 from app.services.vector_service import VectorService
-from app.services.file_manager import save_pdf, delete_pdf
+from app.services.file_manager import save_pdf_stream, delete_pdf, staging_pdf_path, discard_staged_pdf
+from app.services.ingestion import IngestionQueue
+from app.services.answer_cache import AnswerCache
+from app.services.page_cache import PageCache
+from app.services.context_builder import assemble_context
+from app.services.snapshot import publish_snapshot
 from app.services.schemas import (
+    QueryFilters,
     QueryRequest,
     QueryResponse,
-    UploadResponse,
+    BatchQuestion,
+    BatchQueryRequest,
+    BatchQueryResponse,
+    IngestionJobResponse,
     DeleteResponse,
+    DocumentInfo,
+    BackfillResponse,
     DocumentMetadata,
+    PageReference,
     QueryResultItem,
 )
 from app.services.gemini_service import GeminiService
-from typing import List
+from typing import List, Optional, Union
 from app.services.document_manager import DocumentManager
 
 
-app = FastAPI(title="PDF Semantic Search API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Misconfiguration still fails the boot; everything slow happens after the port opens
+    settings.validate()
+    startup_state.update(status="starting", error=None, seconds=None)
+    startup = asyncio.create_task(initialize_services())
+    yield
+    startup.cancel()
+    await asyncio.gather(startup, *background_tasks, return_exceptions=True)
+    if ingestion_queue.initialized:
+        await ingestion_queue.stop()
+    WriterLock.get_instance().release()
+    shutdown_executors()
+
+app = FastAPI(title="PDF Semantic Search API", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -32,50 +76,251 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-document_manager = DocumentManager()
+@app.middleware("http")
+async def add_server_timing(request: Request, call_next):
+    """Attach per-stage durations as a Server-Timing header"""
+    timings = begin_request_timings()
+    response = await call_next(request)
+    if settings.SERVER_TIMING_ENABLED and timings:
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
 
 # Mount static files for PDF access
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 pdf_processor = PDFProcessor()
-vector_service = VectorService()
+# Services are built on first use or by initialize_services, so importing
+# the app never opens Chroma or configures Gemini.
+# One long-lived Gemini service; its shared client bounds and paces all calls
+gemini_service = Lazy(GeminiService)
+vector_service = Lazy(lambda: VectorService(gemini=gemini_service.get(), pdf_processor=pdf_processor))
+document_manager = Lazy(lambda: DocumentManager(vector_service.get()))
+answer_cache = AnswerCache.get_instance()
+page_cache = Lazy(PageCache.get_instance)
+
+ingestion_queue = Lazy(lambda: IngestionQueue(pdf_processor, vector_service.get()))
+
+# Reported by /readyz: "starting" -> "ready", or "failed" with the error;
+# role is "writer", "reader" (server mode) or "replica"
+startup_state = {"status": "starting", "error": None, "seconds": None, "role": None}
+background_tasks: List[asyncio.Task] = []
+snapshot_lock = asyncio.Lock()
+
+async def initialize_services():
+    """
+    Open the stores, reconcile the derived indexes with Chroma and start the
+    ingestion workers, then (WARMUP_ENABLED) load the vector index, prime
+    caches with WARMUP_QUERIES and spawn the PDF worker processes.
+
+    Of the processes sharing the data volume only the one holding the writer
+    lock reconciles indexes, runs ingestion and publishes snapshots.
+    """
+    start = time.perf_counter()
+    try:
+        with stage("startup_init"):
+            writer = settings.STORE_MODE != "replica" and await run_in_thread(WriterLock.get_instance().acquire)
+            if not writer and settings.STORE_MODE == "embedded":
+                logger.error(
+                    "Another process holds the writer lock; STORE_MODE=embedded supports one process. "
+                    "Use STORE_MODE=server for several workers. Serving reads only."
+                )
+            startup_state["role"] = "writer" if writer else settings.STORE_MODE.replace("server", "reader")
+            # Constructors block (SQLite, Chroma); build them off the event loop
+            await run_in_thread(vector_service.get)
+            await run_in_thread(document_manager.get)
+            await run_in_thread(ingestion_queue.get)
+            await run_in_thread(page_cache.get)
+            if writer:
+                await vector_service.sync_document_registry()
+                await vector_service.sync_lexical_index()
+                await vector_service.sync_quantized_store()
+            await vector_service.check_embedding_dimensions()
+            if settings.STORE_MODE != "replica":
+                await ingestion_queue.start(writer=writer)
+            if writer and settings.SNAPSHOT_PUBLISH_ENABLED:
+                background_tasks.append(asyncio.create_task(publish_snapshots()))
+        if settings.WARMUP_ENABLED:
+            with stage("startup_warmup"):
+                await vector_service.warm_up(settings.WARMUP_QUERIES)
+                await pdf_processor.warm_up()
+        startup_state.update(status="ready", seconds=round(time.perf_counter() - start, 3))
+        logger.info("Service ready in %.2fs", time.perf_counter() - start)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        startup_state.update(status="failed", error=str(e))
+        logger.error(f"Startup failed: {str(e)}", exc_info=True)
+
+async def publish_current_snapshot() -> dict:
+    """Export the collection as a new snapshot version for read-only replicas"""
+    async with snapshot_lock:
+        version = await run_in_thread(StoreVersion.get_instance().read)
+        with stage("snapshot_publish"):
+            return await run_in_thread(
+                publish_snapshot, vector_service.collection,
+                collection_name=settings.CHROMA_COLLECTION, llm_backend=settings.LLM_BACKEND, store_version=version,
+            )
+
+async def publish_snapshots():
+    """Writer: publish a snapshot every SNAPSHOT_PUBLISH_INTERVAL_SECONDS when the corpus changed"""
+    published = -1  # always publish once at startup
+    while True:
+        version = await run_in_thread(StoreVersion.get_instance().read)
+        if version != published:
+            try:
+                await publish_current_snapshot()
+                published = version
+            except Exception as e:
+                logger.error(f"Snapshot publish failed: {str(e)}", exc_info=True)
+        await asyncio.sleep(max(1.0, settings.SNAPSHOT_PUBLISH_INTERVAL_SECONDS))
+
+def require_writable():
+    if settings.STORE_MODE == "replica":
+        raise HTTPException(409, "This is a read-only replica; send writes to the writer")
+
+def require_ready():
+    """
+    Data endpoints answer 503 until startup finishes rather than touch the
+    lazy services, whose first use would block the event loop behind the
+    build running in initialize_services
+    """
+    if startup_state["status"] != "ready":
+        raise HTTPException(503, f"Service is {startup_state['status']}, retry shortly")
 
-@app.post("/upload", response_model=UploadResponse)
-async def upload_pdf(file: UploadFile = File(...)):
+async def sync_store():
+    """Pick up corpus changes made by other processes before answering from cache"""
+    if vector_service.initialized:
+        await vector_service.sync_with_writer()
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving HTTP"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: 200 once services are initialized and warm, 503 until then or if startup failed"""
+    return JSONResponse(startup_state, status_code=200 if startup_state["status"] == "ready" else 503)
+
+def to_job_response(job: dict) -> IngestionJobResponse:
+    return IngestionJobResponse(**{k: v for k, v in job.items() if k in IngestionJobResponse.model_fields})
+
+@app.post("/upload", response_model=IngestionJobResponse, status_code=202)
+async def upload_pdf(file: UploadFile = File(...), update: bool = False):
+    """
+    Queue a PDF for background ingestion
+    - Spools the file to disk in chunks, then returns a job id immediately
+    - With ?update=true and an existing document of the same filename, only
+      changed chunks are re-embedded and vanished ones deleted; the job
+      reports chunks_added / chunks_removed / chunks_unchanged
+    - The file is staged and replaces the served PDF only when the job
+      completes; 409 while the same document already has a job in progress
+    - Poll /jobs/{job_id} for progress
+    """
     if not file.filename.endswith(".pdf"):
         raise HTTPException(400, "Only PDF files allowed")
+    require_writable()
+    require_ready()
+    if not ingestion_queue.running:
+        raise HTTPException(503, "Ingestion is stopping, retry shortly")
     
+    staged_path = str(staging_pdf_path(file.filename))
     try:
-        file_content = await file.read()
-        file_path = save_pdf(file_content, file.filename)
-
-        # EXTRACT WITH CLEANING
-        pages = pdf_processor.extract_text_with_pages(file_content)
-        documents = pdf_processor.split_pages(pages, {
-            "source": file_path,
-            "filename": file.filename
-        })
-        
-        # SANITY CHECK: Skip empty documents
-        valid_documents = [doc for doc in documents if len(doc["content"]) > 20]
-        
-        if not valid_documents:
-            return UploadResponse(
-                document_id=None,
-                filename=file.filename,
-                chunks_created=0
-            )
-        
-        doc_ids = await vector_service.add_documents(valid_documents)
-        first_doc_id = doc_ids[0] if doc_ids else None
-        return UploadResponse(
-            document_id=first_doc_id.split("_")[0] if first_doc_id else None,
-            filename=file.filename,
-            chunks_created=len(documents)
+        exists = update and await run_in_thread(vector_service.registry.exists, file.filename)
+        with stage("pdf_save"):
+            source = await save_pdf_stream(file, file.filename, file_path=staged_path)
+        job = await ingestion_queue.submit(
+            file.filename, source, staged_path, mode="update" if exists else "full"
         )
+        return to_job_response(job)
+    except ValueError as ve:
+        await run_in_thread(discard_staged_pdf, staged_path, file.filename)
+        raise HTTPException(409, str(ve))
     except Exception as e:
+        await run_in_thread(discard_staged_pdf, staged_path, file.filename)
         raise HTTPException(500, f"Processing failed: {str(e)}")
 
+@app.get("/jobs", response_model=List[IngestionJobResponse])
+async def list_jobs(limit: int = 100):
+    require_ready()
+    jobs = await run_in_thread(ingestion_queue.store.list, limit)
+    return [to_job_response(job) for job in jobs]
+
+@app.get("/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_job(job_id: str):
+    require_ready()
+    job = await run_in_thread(ingestion_queue.store.get, job_id)
+    if job is None:
+        raise HTTPException(404, f"Job not found: {job_id}")
+    return to_job_response(job)
+
+@app.delete("/jobs/{job_id}", response_model=IngestionJobResponse)
+async def cancel_job(job_id: str):
+    """Cancel a queued or running ingestion job and discard its partial output"""
+    require_writable()
+    require_ready()
+    try:
+        job = await ingestion_queue.cancel(job_id)
+        return to_job_response(job)
+    except KeyError:
+        raise HTTPException(404, f"Job not found: {job_id}")
+    except ValueError as ve:
+        raise HTTPException(409, str(ve))
+
+@app.get("/documents", response_model=List[DocumentInfo])
+async def list_documents():
+    """List ingested documents from the registry"""
+    require_ready()
+    documents = await run_in_thread(vector_service.registry.list)
+    return [DocumentInfo(**{k: v for k, v in doc.items() if k in DocumentInfo.model_fields}) for doc in documents]
+
+def parse_page_range(pages: str):
+    """"7" or "7-9" -> (first, last), 1-based and inclusive"""
+    first, _, last = pages.partition("-")
+    try:
+        first, last = int(first), int(last or first)
+    except ValueError:
+        raise HTTPException(400, f"Invalid page range: {pages}")
+    if first < 1 or last < first:
+        raise HTTPException(400, f"Invalid page range: {pages}")
+    if last - first + 1 > settings.PAGE_RANGE_MAX_PAGES:
+        raise HTTPException(400, f"At most {settings.PAGE_RANGE_MAX_PAGES} pages per request")
+    return first, last
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+@app.get("/document/{filename}/pages/{pages}")
+async def get_document_pages(filename: str, pages: str, request: Request):
+    """
+    Serve one page ("7") or a short range ("7-9") of a stored PDF as its own PDF
+    - Extracts are cut on first request and kept in an LRU disk cache
+    - ETag / If-None-Match revalidation (304) and Range / If-Range requests
+    """
+    first, last = parse_page_range(pages)
+    try:
+        path, key = await page_cache.fetch(filename, first, last)
+    except FileNotFoundError:
+        raise HTTPException(404, f"Document not found: {filename}")
+    except ValueError as ve:
+        raise HTTPException(404, str(ve))
+    etag = f'"{key}"'
+    # Links stay the same across re-uploads, so clients revalidate rather than cache blindly
+    headers = {"etag": etag, "cache-control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    stem = Path(filename).stem
+    return FileResponse(
+        path,
+        media_type="application/pdf",
+        headers=headers,
+        filename=f"{stem}-p{pages}.pdf",
+        content_disposition_type="inline",
+    )
+
 @app.delete("/document/{filename}", response_model=DeleteResponse)
 async def delete_document(filename: str):
     """
@@ -84,9 +329,12 @@ async def delete_document(filename: str):
     - Then deletes physical file
     - Verifies complete removal from vector database
     """
+    require_writable()
+    require_ready()
     try:
         # Atomic deletion with verification
-        result = document_manager.delete_document(filename)
+        result = await document_manager.delete_document(filename)
+        await run_in_thread(page_cache.discard, filename)
         
         return DeleteResponse(
             success=True,
@@ -115,9 +363,12 @@ async def delete_all_documents():
     - Deletes all vectorized data from the vector database
     - Deletes all files from static/documents directory
     """
+    require_writable()
+    require_ready()
     try:
         # Delete all from vector database
-        vector_result = vector_service.delete_all()
+        vector_result = await vector_service.delete_all()
+        await run_in_thread(page_cache.clear)
         
         # Delete all files from static/documents directory
         documents_dir = Path(settings.UPLOAD_DIR)
@@ -142,89 +393,393 @@ async def delete_all_documents():
             detail=f"Delete all failed: {str(e)}"
         )
 
-@app.post("/query", response_model=QueryResponse)
-async def query_documents(request: QueryRequest):
-    try:
-        # Normalize question by adding space-separated variant for better matching
-        normalized_question = request.question
-        # Add common compound word patterns
-        if any(term in request.question.lower() for term in ['mix', 'set', 'motor', 'control']):
-            # Create both versions for embedding search
-            normalized_question = f"{request.question} {' '.join(request.question.split())}"
-        
-        results = await vector_service.query(normalized_question, request.top_k)
-        
-        if not results["ids"] or len(results["ids"][0]) == 0:
-            return QueryResponse(results=[], answer="Not found")
-        
-        gemini = GeminiService()
-        
-        # Calculate similarity scores and filter by threshold
+SIMILARITY_THRESHOLD = 0.7  # minimum 1 / (1 + distance) for a chunk to be used
+
+def page_link(metadata: dict) -> str:
+    """Link for a cited page: the page endpoint, or the full PDF with a #page= fragment"""
+    if settings.PAGE_LINKS_ENABLED and metadata.get("filename"):
+        return f"/document/{quote(metadata['filename'])}/pages/{metadata.get('page_number')}"
+    return f"{metadata.get('source', '')}#page={metadata.get('page_number')}"
+
+def check_filters(filters: Optional[QueryFilters]):
+    if filters is None:
+        return
+    if filters.page_from is not None and filters.page_to is not None and filters.page_from > filters.page_to:
+        raise HTTPException(400, "page_from is after page_to")
+    if filters.filenames is not None and not filters.filenames:
+        raise HTTPException(400, "filenames must not be empty")
+
+async def resolve_filters(filters: Optional[QueryFilters]) -> Optional[dict]:
+    """Search scope for the request filters, or None to search the whole corpus"""
+    if filters is None:
+        return None
+    return await vector_service.resolve_scope(**filters.model_dump())
+
+async def retrieve_batch(
+    questions: List[str], top_k: Union[int, List[int]], query_embeddings: List[List[float]] = None,
+    scope: dict = None, thresholds: List[float] = None,
+) -> List[List[dict]]:
+    """
+    Retrieve and threshold-filter chunks for several questions, in order
+    - `top_k` and `thresholds` may be given per question; the search runs
+      once at the largest top_k and each result is cut to its own
+    """
+    top_ks = top_k if isinstance(top_k, list) else [top_k] * len(questions)
+    # Compound words and part numbers are matched by the hybrid BM25 index
+    batch = await vector_service.query_batch(
+        questions, max(top_ks, default=1), query_embeddings=query_embeddings, scope=scope
+    )
+    batch = [
+        {key: [value[0][:k]] if value and value[0] is not None else value for key, value in results.items()}
+        for results, k in zip(batch, top_ks)
+    ]
+    
+    # Pages whose near-duplicate copies were folded into these chunks at ingest
+    references = {}
+    if vector_service.dedup_index is not None:
+        all_ids = list(dict.fromkeys(chunk_id for results in batch for chunk_id in results["ids"][0]))
+        if all_ids:
+            references = await run_in_thread(vector_service.dedup_index.references, all_ids)
+    
+    # Similarity scores and the threshold, for the whole batch at once
+    width = max((len(results["ids"][0]) for results in batch), default=0)
+    distances = np.ones((len(batch), width), dtype=np.float64)
+    for row, results in enumerate(batch):
+        found = (results.get("distances") or [[]])[0]
+        distances[row, :len(found)] = found
+    if thresholds is None:
+        thresholds = [SIMILARITY_THRESHOLD] * len(batch)
+    keep = 1 / (1 + distances) >= np.asarray(thresholds, dtype=np.float64)[:, None]
+    
+    filtered_batch = []
+    for row, results in enumerate(batch):
         filtered_results = []
+        metadatas_list = results.get("metadatas", [[]])[0]
+        documents_list = results.get("documents", [[]])[0]
+        embeddings_list = (results.get("embeddings") or [[]])[0]
         for idx in range(len(results["ids"][0])):
-            metadatas_list = results.get("metadatas", [[]])[0]
-            documents_list = results.get("documents", [[]])[0]
-            distances_list = results.get("distances", [[]])[0]
-            
             if idx >= len(metadatas_list) or idx >= len(documents_list):
                 continue
                 
             metadata = metadatas_list[idx] or {}
-            content = documents_list[idx] or ""
+            # Prefer text cleaned at ingest time; fall back to the raw chunk
+            content = metadata.get("cleaned_text") or documents_list[idx] or ""
             
             # Skip if critical metadata is missing
             if not all(k in metadata for k in ["page_number", "source", "filename"]):
                 continue
             
-            # Calculate similarity score from distance
-            distance = distances_list[idx] if idx < len(distances_list) else 1.0
-            similarity_score = 1 / (1 + distance)
-            
-            # Filter by threshold (0.7 = 70% similarity)
-            if similarity_score < 0.7:
+            THRESHOLD_CANDIDATES.inc()
+            if not keep[row, idx]:
+                THRESHOLD_DROPPED.inc()
                 continue
             
-            # Clean text using Gemini
-            cleaned_content = await gemini.clean_extracted_text(content)
-            
+            pages = [metadata, *references.get(results["ids"][0][idx], [])]
+            if scope is not None and scope["filenames"] is not None:
+                # A chunk found through a folded duplicate is cited at the in-scope page
+                in_scope = [
+                    i for i, page in enumerate(pages)
+                    if page.get("filename") in scope["filenames"]
+                    and (scope["page_from"] is None or (page.get("page_number") or 0) >= scope["page_from"])
+                    and (scope["page_to"] is None or (page.get("page_number") or 0) <= scope["page_to"])
+                ]
+                if in_scope and in_scope[0] != 0:
+                    pages.insert(0, pages.pop(in_scope[0]))
+            cited = pages[0]
             filtered_results.append({
-                "content": cleaned_content,
-                "page_number": metadata["page_number"],
-                "pdf_link": f"{metadata['source']}#page={metadata['page_number']}",
-                "filename": metadata["filename"]
+                "content": content,
+                "page_number": cited["page_number"],
+                "pdf_link": page_link(cited),
+                "filename": cited["filename"],
+                "chunk_index": cited.get("chunk_index"),
+                "distance": float(distances[row, idx]),
+                "embedding": embeddings_list[idx] if idx < len(embeddings_list) else None,
+                "references": [
+                    {
+                        "filename": ref.get("filename", ""),
+                        "page_number": ref.get("page_number"),
+                        "pdf_link": page_link(ref),
+                    }
+                    for ref in pages[1:]
+                ],
             })
-        
-        # If no results pass the threshold, return "Not found" with empty results
-        if not filtered_results:
-            return QueryResponse(results=[], answer="Not found")
-        
-        # Combine context for AI answer
-        context = "\n\n".join([r['content'] for r in filtered_results[:3]])
-        
-        # Get AI-generated answer
-        answer = await gemini.answer_question(request.question, context)
-        
-        # If AI returns "Not found", return empty results
-        if answer == "Not found":
-            return QueryResponse(results=[], answer="Not found")
-        
-        # Format results for response only if answer is found
-        formatted_results = [
-            QueryResultItem(
-                content=r["content"],
-                page_number=r["page_number"],
-                pdf_link=r["pdf_link"],
-                filename=r["filename"]
-            )
-            for r in filtered_results
-        ]
-        
-        return QueryResponse(results=formatted_results, answer=answer)
+        filtered_batch.append(filtered_results)
+    return filtered_batch
+
+async def retrieve_results(
+    question: str, top_k: int, query_embedding: List[float] = None, scope: dict = None
+) -> List[dict]:
+    """Retrieve and threshold-filter chunks for one question"""
+    embeddings = [query_embedding] if query_embedding is not None else None
+    return (await retrieve_batch([question], top_k, embeddings, scope))[0]
+
+def build_context(filtered_results: List[dict]) -> str:
+    # Combine context for AI answer: diverse chunks (MMR) packed into a token budget
+    with stage("context_assembly"):
+        context, _ = assemble_context(filtered_results)
+    return context
+
+def format_results(filtered_results: List[dict]) -> List[QueryResultItem]:
+    return [
+        QueryResultItem(
+            content=r["content"],
+            page_number=r["page_number"],
+            pdf_link=r["pdf_link"],
+            filename=r["filename"],
+            references=[PageReference(**ref) for ref in r.get("references", [])]
+        )
+        for r in filtered_results
+    ]
+
+async def answer_query(
+    question: str, top_k: int, query_embedding: List[float] = None, scope: dict = None
+) -> QueryResponse:
+    """Retrieve, threshold-filter and answer one question"""
+    filtered_results = await retrieve_results(question, top_k, query_embedding, scope)
+    return await answer_from_results(question, filtered_results)
+
+async def answer_from_results(question: str, filtered_results: List[dict]) -> QueryResponse:
+    """Answer one question from its threshold-filtered chunks"""
+    # If no results pass the threshold, return "Not found" with empty results
+    if not filtered_results:
+        return QueryResponse(results=[], answer="Not found")
+    
+    context = build_context(filtered_results)
+    
+    # Get AI-generated answer
+    answer = await gemini_service.answer_question(question, context)
+    
+    # If AI returns "Not found", return empty results
+    if answer == "Not found":
+        return QueryResponse(results=[], answer="Not found")
+    
+    # Format results for response only if answer is found
+    return QueryResponse(results=format_results(filtered_results), answer=answer)
+
+@app.post("/query", response_model=QueryResponse)
+async def query_documents(request: QueryRequest):
+    """
+    Answer a question from the most similar chunks
+    - Optional filters (filenames, page range, ingest time window) are pushed
+      down into the search, so only in-scope chunks are scored
+    """
+    require_ready()
+    check_filters(request.filters)
+    try:
+        await sync_store()
+        scope = await resolve_filters(request.filters)
+        # The answer cache is keyed by question only; scoped queries bypass it
+        if not settings.ANSWER_CACHE_ENABLED or scope is not None:
+            return await answer_query(request.question, request.top_k, scope=scope)
+
+        # Level 1: exact normalized question for the current corpus version
+        cached = answer_cache.get_exact(request.question, request.top_k)
+        if cached is not None:
+            return cached
+
+        # Level 2: a previously answered question with a near-identical embedding
+        version = answer_cache.version
+        with stage("query_embedding"):
+            query_embedding = (await vector_service.embed([request.question]))[0]
+        cached = answer_cache.get_semantic(query_embedding, request.top_k)
+        if cached is None:
+            cached = await answer_query(request.question, request.top_k, query_embedding)
+        answer_cache.put(request.question, request.top_k, query_embedding, cached, version=version)
+        return cached
         
     except Exception as e:
         logger.error(f"Query failed: {str(e)}", exc_info=True)
         raise HTTPException(500, f"Search failed: {str(e)}")
 
+@app.post("/query/batch", response_model=BatchQueryResponse)
+async def query_documents_batch(request: BatchQueryRequest):
+    """
+    Answer many questions in one request; responses are in question order
+    - A question may be a BatchQuestion with its own top_k and threshold;
+      questions with their own threshold bypass the answer cache
+    - Cache misses are embedded in one call and searched in one multi-query search
+    - Answers are generated concurrently, at most QUERY_BATCH_ANSWER_CONCURRENCY at a time
+    """
+    require_ready()
+    if not request.questions:
+        raise HTTPException(400, "No questions given")
+    if len(request.questions) > settings.QUERY_BATCH_MAX_QUESTIONS:
+        raise HTTPException(400, f"At most {settings.QUERY_BATCH_MAX_QUESTIONS} questions per batch")
+    check_filters(request.filters)
+    items = [item if isinstance(item, BatchQuestion) else BatchQuestion(question=item) for item in request.questions]
+    if any((request.top_k if item.top_k is None else item.top_k) < 1 for item in items):
+        raise HTTPException(400, "top_k must be at least 1")
+    if any(item.threshold is not None and not 0 <= item.threshold <= 1 for item in items):
+        raise HTTPException(400, "threshold must be between 0 and 1")
+    try:
+        await sync_store()
+        scope = await resolve_filters(request.filters)
+        questions = [item.question for item in items]
+        top_ks = [request.top_k if item.top_k is None else item.top_k for item in items]
+        thresholds = [SIMILARITY_THRESHOLD if item.threshold is None else item.threshold for item in items]
+        # The answer cache only holds answers made at the server threshold
+        cacheable = [
+            settings.ANSWER_CACHE_ENABLED and scope is None and item.threshold is None for item in items
+        ]
+        responses: List[QueryResponse] = [None] * len(questions)
+        version = answer_cache.version
+        pending = list(range(len(questions)))
+        for i in pending:
+            if cacheable[i]:
+                responses[i] = answer_cache.get_exact(questions[i], top_ks[i])
+        pending = [i for i in pending if responses[i] is None]
+
+        embeddings = {}
+        if pending:
+            with stage("query_embedding"):
+                vectors = await vector_service.embed([questions[i] for i in pending])
+            embeddings = dict(zip(pending, vectors))
+        for i in pending:
+            if cacheable[i]:
+                responses[i] = answer_cache.get_semantic(embeddings[i], top_ks[i])
+        pending = [i for i in pending if responses[i] is None]
+
+        if pending:
+            filtered_batch = await retrieve_batch(
+                [questions[i] for i in pending], [top_ks[i] for i in pending], [embeddings[i] for i in pending],
+                scope, [thresholds[i] for i in pending],
+            )
+            semaphore = asyncio.Semaphore(max(1, settings.QUERY_BATCH_ANSWER_CONCURRENCY))
+
+            async def answer(i: int, filtered_results: List[dict]) -> None:
+                async with semaphore:
+                    responses[i] = await answer_from_results(questions[i], filtered_results)
+
+            await asyncio.gather(*(answer(i, results) for i, results in zip(pending, filtered_batch)))
+
+        for i in range(len(questions)):
+            if cacheable[i] and i in embeddings:
+                answer_cache.put(questions[i], top_ks[i], embeddings[i], responses[i], version=version)
+        return BatchQueryResponse(responses=responses)
+        
+    except Exception as e:
+        logger.error(f"Batch query failed: {str(e)}", exc_info=True)
+        raise HTTPException(500, f"Batch search failed: {str(e)}")
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/query/stream")
+async def query_documents_stream(request: QueryRequest):
+    """
+    Server-sent events variant of /query
+    - "results": retrieved items as soon as the vector search returns
+    - "token": answer text as Gemini streams it
+    - "done": the final QueryResponse; results are empty when the answer is "Not found"
+    """
+    require_ready()
+    check_filters(request.filters)
+
+    async def events():
+        try:
+            await sync_store()
+            scope = await resolve_filters(request.filters)
+            use_cache = settings.ANSWER_CACHE_ENABLED and scope is None
+            if use_cache:
+                cached = answer_cache.get_exact(request.question, request.top_k)
+                if cached is not None:
+                    yield sse_event("results", [r.model_dump() for r in cached.results])
+                    yield sse_event("done", cached.model_dump())
+                    return
+
+            version = answer_cache.version
+            with stage("query_embedding"):
+                query_embedding = (await vector_service.embed([request.question]))[0]
+            if use_cache:
+                cached = answer_cache.get_semantic(query_embedding, request.top_k)
+                if cached is not None:
+                    yield sse_event("results", [r.model_dump() for r in cached.results])
+                    yield sse_event("done", cached.model_dump())
+                    return
+
+            filtered_results = await retrieve_results(request.question, request.top_k, query_embedding, scope)
+            formatted_results = format_results(filtered_results)
+            yield sse_event("results", [r.model_dump() for r in formatted_results])
+
+            answer = "Not found"
+            if filtered_results:
+                parts = []
+                async for text in gemini_service.stream_answer(request.question, build_context(filtered_results)):
+                    parts.append(text)
+                    yield sse_event("token", {"text": text})
+                answer = gemini_service.normalize_answer("".join(parts))
+
+            response = QueryResponse(
+                results=formatted_results if answer != "Not found" else [],
+                answer=answer
+            )
+            if use_cache:
+                answer_cache.put(request.question, request.top_k, query_embedding, response, version=version)
+            yield sse_event("done", response.model_dump())
+        except Exception as e:
+            logger.error(f"Streaming query failed: {str(e)}", exc_info=True)
+            yield sse_event("error", {"detail": f"Search failed: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus exposition of stage latency, LLM, Chroma and cache metrics"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit rates for the answer, embedding and page caches, near-duplicate folding and quantized vector storage"""
+    require_ready()
+    embedding_cache = vector_service.embedding_cache
+    dedup_index = vector_service.dedup_index
+    return {
+        "answer_cache": answer_cache.stats(),
+        "embedding_cache": await run_in_thread(embedding_cache.stats) if embedding_cache else None,
+        "dedup_index": await run_in_thread(dedup_index.stats) if dedup_index else None,
+        "vector_store": await run_in_thread(vector_service.vector_store.stats) if vector_service.vector_store else None,
+        "page_cache": await run_in_thread(page_cache.stats),
+    }
+
+@app.post("/maintenance/backfill-cleaned-text", response_model=BackfillResponse)
+async def backfill_cleaned_text():
+    """
+    Clean and store text for chunks ingested before ingest-time cleaning
+    - Skips chunks that already carry cleaned text or whose text is already clean
+    """
+    require_writable()
+    require_ready()
+    try:
+        result = await vector_service.backfill_cleaned_text()
+        return BackfillResponse(**result)
+    except Exception as e:
+        logger.error(f"Backfill failed: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Backfill failed: {str(e)}"
+        )
+
+@app.post("/maintenance/publish-snapshot")
+async def publish_snapshot_endpoint():
+    """
+    Publish the current collection as a snapshot for read-only replicas now
+    - Replicas switch to it within STORE_SYNC_INTERVAL_SECONDS of their next query
+    """
+    require_writable()
+    require_ready()
+    try:
+        return await publish_current_snapshot()
+    except Exception as e:
+        logger.error(f"Snapshot publish failed: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Snapshot publish failed: {str(e)}"
+        )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Migrate an existing collection to the configured compact vector settings.
+
+- Truncates stored embeddings to --dimensions (Matryoshka truncation with
+  re-normalization; no re-embedding) by copying the collection, then
+  swapping it in under the configured name
+- Rebuilds the quantized vector store (--quantization float16 | int8)
+
+Run with the server stopped and the same environment it uses, then start
+it with matching EMBEDDING_DIMENSIONS / VECTOR_QUANTIZATION:
+
+    python -m app.migrate_vectors --dimensions 768 --quantization int8
+"""
+import argparse
+import json
+import os
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dimensions", type=int, help="target width (default: EMBEDDING_DIMENSIONS)")
+    parser.add_argument(
+        "--quantization", choices=["none", "float16", "int8"], help="default: VECTOR_QUANTIZATION"
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    # Settings are read at import time
+    if args.dimensions is not None:
+        os.environ["EMBEDDING_DIMENSIONS"] = str(args.dimensions)
+    if args.quantization is not None:
+        os.environ["VECTOR_QUANTIZATION"] = args.quantization
+
+    from app.core.config import settings, logger
+    from app.core.database import get_collection, recover_collection_swap, swap_collection
+    from app.services.quantized_store import QuantizedVectorStore, truncate_embeddings
+
+    # A swap interrupted by an earlier run is finished or undone before anything else
+    recover_collection_swap()
+    collection = get_collection()
+    report = {"chunks": collection.count(), "dimensions": None, "quantization": settings.VECTOR_QUANTIZATION}
+    start = time.perf_counter()
+
+    sample = collection.get(include=["embeddings"], limit=1)
+    width = len(sample["embeddings"][0]) if sample["ids"] else 0
+    report["dimensions"] = {"from": width, "to": width}
+    target = settings.EMBEDDING_DIMENSIONS
+    if width and target and target != width:
+        if target > width:
+            raise SystemExit(
+                f"Stored embeddings are {width} wide; widening to {target} needs re-embedding "
+                f"(delete and re-upload the documents)"
+            )
+
+        def truncate_into(staging) -> None:
+            offset = 0
+            while True:
+                batch = collection.get(
+                    include=["documents", "metadatas", "embeddings"], limit=args.batch_size, offset=offset
+                )
+                if not batch["ids"]:
+                    break
+                offset += len(batch["ids"])
+                staging.add(
+                    ids=batch["ids"],
+                    embeddings=truncate_embeddings(batch["embeddings"], target),
+                    documents=batch["documents"],
+                    metadatas=batch["metadatas"],
+                )
+                logger.info("Truncated %d/%d chunks to %d dimensions", offset, report["chunks"], target)
+
+        swap_collection(truncate_into)
+        collection = get_collection()
+        report["dimensions"]["to"] = target
+
+    if settings.VECTOR_QUANTIZATION != "none":
+        store = QuantizedVectorStore()
+        store.clear()
+        offset = 0
+        while True:
+            batch = collection.get(include=["embeddings"], limit=args.batch_size, offset=offset)
+            if not batch["ids"]:
+                break
+            offset += len(batch["ids"])
+            store.add(batch["ids"], batch["embeddings"])
+        report["vector_store"] = store.stats()
+
+    report["seconds"] = round(time.perf_counter() - start, 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
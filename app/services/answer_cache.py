@@ -0,0 +1,200 @@
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings, logger
+from app.core.metrics import CACHE_LOOKUPS
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(re.sub(r"[^\w\s-]", " ", question.lower()).split())
+
+
+class _Entry:
+    __slots__ = ("value", "embedding", "top_k", "expires_at")
+
+    def __init__(self, value: Any, embedding: Optional[np.ndarray], top_k: int, expires_at: float):
+        self.value = value
+        self.embedding = embedding
+        self.top_k = top_k
+        self.expires_at = expires_at
+
+
+class AnswerCache:
+    """
+    Two-level cache in front of /query:
+    - Exact: normalized question + top_k + corpus version
+    - Semantic: reuse an answer whose question embedding is within
+      `max_distance` cosine distance of the new one
+    Entries expire after `ttl` seconds and are evicted LRU beyond `max_entries`.
+    Any corpus change bumps the version and clears the cache.
+    The semantic matrix grows by appending rows on put; evicted rows are
+    marked stale and compacted away once they outnumber the live ones.
+    """
+
+    _instance = None
+
+    def __init__(
+        self,
+        max_entries: int = settings.ANSWER_CACHE_MAX_ENTRIES,
+        ttl: float = settings.ANSWER_CACHE_TTL_SECONDS,
+        max_distance: float = settings.SEMANTIC_CACHE_MAX_DISTANCE,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.version = 0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Rows past len(self._matrix_keys) are spare capacity; a None key marks a stale row
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[Optional[str]] = []
+        self._matrix_rows: Dict[str, int] = {}
+        self._stale_rows = 0
+
+    @classmethod
+    def get_instance(cls) -> "AnswerCache":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def _key(self, question: str, top_k: int) -> str:
+        return f"{self.version}:{top_k}:{normalize_question(question)}"
+
+    def get_exact(self, question: str, top_k: int) -> Optional[Any]:
+        key = self._key(question, top_k)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < time.time():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        self.exact_hits += 1
+        CACHE_LOOKUPS.labels(cache="answer", result="exact_hit").inc()
+        return entry.value
+
+    def get_semantic(self, embedding: List[float], top_k: int) -> Optional[Any]:
+        """Nearest cached question by cosine distance; counts a miss when none is close enough."""
+        if self.max_distance > 0 and self._entries:
+            if self._matrix is None:
+                self._rebuild_matrix()
+            if self._matrix_keys:
+                query = np.asarray(embedding, dtype=np.float32)
+                query /= np.linalg.norm(query) or 1.0
+                distances = 1.0 - self._matrix[:len(self._matrix_keys)] @ query
+                now = time.time()
+                for idx in np.argsort(distances):
+                    if distances[idx] > self.max_distance:
+                        break
+                    key = self._matrix_keys[idx]
+                    entry = self._entries.get(key) if key is not None else None
+                    if entry is None or entry.top_k != top_k or entry.expires_at < now:
+                        continue
+                    self._entries.move_to_end(key)
+                    self.semantic_hits += 1
+                    CACHE_LOOKUPS.labels(cache="answer", result="semantic_hit").inc()
+                    return entry.value
+        self.misses += 1
+        CACHE_LOOKUPS.labels(cache="answer", result="miss").inc()
+        return None
+
+    def put(
+        self, question: str, top_k: int, embedding: Optional[List[float]], value: Any, version: int = None
+    ) -> None:
+        """Store an answer; skipped if the corpus changed since `version` was read."""
+        if version is not None and version != self.version:
+            return
+        key = self._key(question, top_k)
+        vector = None
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            vector /= np.linalg.norm(vector) or 1.0
+        self._entries[key] = _Entry(value, vector, top_k, time.time() + self.ttl)
+        self._entries.move_to_end(key)
+        self._set_row(key, vector)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._clear_row(evicted)
+        if self._stale_rows > len(self._matrix_rows):
+            self._compact_matrix()
+
+    def invalidate(self) -> None:
+        """Called whenever the corpus changes."""
+        self.version += 1
+        self._entries.clear()
+        self._reset_matrix()
+        logger.debug("Answer cache invalidated (corpus version %d)", self.version)
+
+    def _drop(self, key: str) -> None:
+        self._entries.pop(key, None)
+        self._reset_matrix()
+
+    def _reset_matrix(self) -> None:
+        """Forget the matrix; get_semantic rebuilds it from the entries."""
+        self._matrix = None
+        self._matrix_keys = []
+        self._matrix_rows = {}
+        self._stale_rows = 0
+
+    def _rebuild_matrix(self) -> None:
+        keys = [key for key, entry in self._entries.items() if entry.embedding is not None]
+        self._matrix_keys = keys
+        self._matrix_rows = {key: row for row, key in enumerate(keys)}
+        self._stale_rows = 0
+        self._matrix = (
+            np.stack([self._entries[key].embedding for key in keys])
+            if keys else np.empty((0, 0), dtype=np.float32)
+        )
+
+    def _set_row(self, key: str, vector: Optional[np.ndarray]) -> None:
+        """Write an entry's embedding into the matrix, appending a row for a new key."""
+        if self._matrix is None:
+            return
+        if vector is None:
+            self._clear_row(key)
+            return
+        if self._matrix.shape[1] != len(vector):
+            # First vector (or a new embedding width): rebuild on the next lookup
+            self._reset_matrix()
+            return
+        row = self._matrix_rows.get(key)
+        if row is None:
+            row = len(self._matrix_keys)
+            if row == len(self._matrix):
+                grown = np.empty((max(16, 2 * row), self._matrix.shape[1]), dtype=np.float32)
+                grown[:row] = self._matrix[:row]
+                self._matrix = grown
+            self._matrix_keys.append(key)
+            self._matrix_rows[key] = row
+        self._matrix[row] = vector
+
+    def _clear_row(self, key: str) -> None:
+        row = self._matrix_rows.pop(key, None)
+        if row is not None:
+            self._matrix_keys[row] = None
+            self._stale_rows += 1
+
+    def _compact_matrix(self) -> None:
+        live = [row for row, key in enumerate(self._matrix_keys) if key is not None]
+        self._matrix = self._matrix[live]
+        self._matrix_keys = [self._matrix_keys[row] for row in live]
+        self._matrix_rows = {key: row for row, key in enumerate(self._matrix_keys)}
+        self._stale_rows = 0
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "corpus_version": self.version,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+        }
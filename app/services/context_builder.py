@@ -0,0 +1,117 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import CONTEXT_CHUNKS, CONTEXT_TOKENS, CONTEXT_TOKENS_SAVED
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English prose)."""
+    return max(1, len(text) // 4)
+
+
+def mmr_order(relevance: np.ndarray, embeddings: np.ndarray, lambda_: float = settings.MMR_LAMBDA) -> List[int]:
+    """
+    Maximal marginal relevance ordering of all candidates: each step picks
+    the one maximizing lambda * relevance - (1 - lambda) * max similarity
+    to anything already picked.
+    """
+    n = len(relevance)
+    if n == 0:
+        return []
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    unit = embeddings / np.where(norms == 0, 1.0, norms)
+    similarity = unit @ unit.T
+
+    order = [int(np.argmax(relevance))]
+    chosen = np.zeros(n, dtype=bool)
+    chosen[order[0]] = True
+    # Highest similarity of every candidate to the picked set, updated incrementally
+    redundancy = similarity[order[0]].copy()
+    while len(order) < n:
+        scores = lambda_ * relevance - (1 - lambda_) * redundancy
+        scores[chosen] = -np.inf
+        best = int(np.argmax(scores))
+        order.append(best)
+        chosen[best] = True
+        np.maximum(redundancy, similarity[best], out=redundancy)
+    return order
+
+
+def _merge_overlap(left: str, right: str, max_overlap: int = 200) -> str:
+    """Join consecutive chunks, dropping the splitter overlap repeated at the seam."""
+    for size in range(min(max_overlap, len(left), len(right)), 0, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return f"{left} {right}"
+
+
+def assemble_context(
+    results: List[Dict],
+    token_budget: int = settings.CONTEXT_TOKEN_BUDGET,
+    max_chunks: int = settings.CONTEXT_MAX_CHUNKS,
+) -> Tuple[str, List[Dict]]:
+    """
+    Build the answer prompt context from threshold-filtered results:
+    1. Order candidates by MMR over their embeddings (relevance = 1 - distance)
+    2. Take chunks in that order while they fit in `token_budget`
+    3. Merge chunks that are adjacent on the same page into one passage
+    Returns the context and the chunks it used.
+    """
+    if not results:
+        return "", []
+
+    with_embeddings = all(r.get("embedding") is not None for r in results)
+    if with_embeddings and len(results) > 1:
+        relevance = np.array([1.0 - r.get("distance", 0.0) for r in results], dtype=np.float32)
+        embeddings = np.array([r["embedding"] for r in results], dtype=np.float32)
+        order = mmr_order(relevance, embeddings)
+    else:
+        order = list(range(len(results)))
+
+    selected: List[Dict] = []
+    used_tokens = 0
+    for idx in order:
+        if len(selected) >= max_chunks:
+            break
+        tokens = estimate_tokens(results[idx]["content"])
+        if used_tokens + tokens > token_budget and selected:
+            continue
+        selected.append(results[idx])
+        used_tokens += tokens
+
+    # Group adjacent chunks of the same page, keeping MMR order between passages
+    passages: List[List[Dict]] = []
+    by_page: Dict[Tuple[str, int], List[List[Dict]]] = {}
+    for result in sorted(selected, key=lambda r: (r["filename"], r["page_number"], r.get("chunk_index") or 0)):
+        runs = by_page.setdefault((result["filename"], result["page_number"]), [])
+        previous: Optional[Dict] = runs[-1][-1] if runs else None
+        if (
+            previous is not None
+            and result.get("chunk_index") is not None
+            and previous.get("chunk_index") is not None
+            and result["chunk_index"] == previous["chunk_index"] + 1
+        ):
+            runs[-1].append(result)
+        else:
+            runs.append([result])
+    rank = {id(result): position for position, result in enumerate(selected)}
+    for runs in by_page.values():
+        passages.extend(runs)
+    passages.sort(key=lambda run: min(rank[id(r)] for r in run))
+
+    texts = []
+    for run in passages:
+        text = run[0]["content"]
+        for result in run[1:]:
+            text = _merge_overlap(text, result["content"])
+        texts.append(text)
+    context = "\n\n".join(texts)
+
+    sent_tokens = estimate_tokens(context)
+    naive_tokens = sum(estimate_tokens(r["content"]) for r in results)
+    CONTEXT_CHUNKS.observe(len(selected))
+    CONTEXT_TOKENS.observe(sent_tokens)
+    CONTEXT_TOKENS_SAVED.inc(max(0, naive_tokens - sent_tokens))
+    return context, selected
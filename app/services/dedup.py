@@ -0,0 +1,321 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+SHINGLE_WORDS = 3
+_MERSENNE_PRIME = (1 << 31) - 1
+_WORD = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> List[str]:
+    """Overlapping word n-grams of the lowercased text; short texts yield one shingle."""
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return [" ".join(words)]
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+class MinHasher:
+    """MinHash signatures from `num_perm` universal hash functions over word shingles."""
+
+    def __init__(self, num_perm: int = settings.DEDUP_NUM_PERM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashed = np.array(
+            [
+                int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") % _MERSENNE_PRIME
+                for s in set(shingles(text))
+            ],
+            dtype=np.uint64,
+        )
+        # (a * x + b) mod p stays below 2**62, so uint64 cannot overflow
+        permuted = (np.outer(hashed, self._a) + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+def numbers_fingerprint(text: str) -> str:
+    """
+    Hash of the numeric tokens in a chunk. Near-duplicates must agree on
+    these: in a manual, "torque 45 Nm" and "torque 53 Nm" are different facts.
+    """
+    numbers = sorted({token for token in _WORD.findall(text.lower()) if any(ch.isdigit() for ch in token)})
+    return hashlib.blake2b(" ".join(numbers).encode(), digest_size=8).hexdigest()
+
+
+# MinHash signature, numbers fingerprint and LSH band keys of one chunk
+Signature = Tuple[np.ndarray, str, List[str]]
+
+
+def estimated_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash LSH index of canonical chunks, shared across documents.
+    - Signatures are split into `bands`; chunks sharing any band bucket are
+      candidates, confirmed by estimated Jaccard similarity >= `threshold`
+      and identical numeric tokens
+    - A chunk judged a near-duplicate is not stored in Chroma; instead a
+      reference row records its own id, document, page and metadata
+      against the canonical chunk's id
+    """
+
+    _instance = None
+
+    def __init__(
+        self,
+        path: str = settings.DEDUP_INDEX_PATH,
+        threshold: float = settings.DEDUP_THRESHOLD,
+        num_perm: int = settings.DEDUP_NUM_PERM,
+        bands: int = settings.DEDUP_BANDS,
+    ):
+        if num_perm % bands:
+            raise ValueError("DEDUP_NUM_PERM must be a multiple of DEDUP_BANDS")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS signatures (
+                chunk_id TEXT PRIMARY KEY,
+                signature BLOB NOT NULL,
+                numbers TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS lsh_buckets (
+                band INTEGER NOT NULL,
+                bucket TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                PRIMARY KEY (band, bucket, chunk_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_lsh_buckets_chunk ON lsh_buckets(chunk_id);
+            CREATE TABLE IF NOT EXISTS duplicate_refs (
+                chunk_id TEXT PRIMARY KEY,
+                canonical_id TEXT NOT NULL,
+                doc_key TEXT NOT NULL,
+                page_number INTEGER,
+                content_hash TEXT,
+                metadata TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_duplicate_refs_canonical ON duplicate_refs(canonical_id);
+            CREATE INDEX IF NOT EXISTS idx_duplicate_refs_doc ON duplicate_refs(doc_key);
+            """
+        )
+        self._conn.commit()
+
+    @classmethod
+    def get_instance(cls) -> "NearDuplicateIndex":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def _band_keys(self, signature: np.ndarray) -> List[str]:
+        return [
+            hashlib.blake2b(signature[i * self.rows:(i + 1) * self.rows].tobytes(), digest_size=8).hexdigest()
+            for i in range(self.bands)
+        ]
+
+    def sign(self, text: str) -> Signature:
+        signature = self.hasher.signature(text)
+        return signature, numbers_fingerprint(text), self._band_keys(signature)
+
+    def find(self, chunk_id: str, signed: Signature, pending: Dict[str, Signature] = None) -> Optional[str]:
+        """
+        Canonical id a signed chunk near-duplicates, among indexed chunks and
+        `pending` ones (same batch, not yet added), or None if it is new. A
+        chunk already indexed as canonical is never its own duplicate.
+        """
+        signature, numbers, band_keys = signed
+        if pending and chunk_id in pending:
+            return None
+        best, best_score = None, self.threshold
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM signatures WHERE chunk_id = ?", (chunk_id,)).fetchone():
+                return None
+            candidates = {
+                row[0] for band, key in enumerate(band_keys)
+                for row in self._conn.execute(
+                    "SELECT chunk_id FROM lsh_buckets WHERE band = ? AND bucket = ?", (band, key)
+                )
+            }
+            for candidate in candidates:
+                row = self._conn.execute(
+                    "SELECT signature FROM signatures WHERE chunk_id = ? AND numbers = ?", (candidate, numbers)
+                ).fetchone()
+                if row is None:
+                    continue
+                score = estimated_jaccard(signature, np.frombuffer(row[0], dtype=np.uint32))
+                if score >= best_score:
+                    best, best_score = candidate, score
+        for candidate, (other, other_numbers, other_keys) in (pending or {}).items():
+            if other_numbers != numbers or not any(a == b for a, b in zip(band_keys, other_keys)):
+                continue
+            score = estimated_jaccard(signature, other)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def add(self, signed: Dict[str, Signature]) -> None:
+        """Index chunks as canonical; call once they are stored, so nothing folds into a missing chunk."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO signatures (chunk_id, signature, numbers) VALUES (?, ?, ?)",
+                [(chunk_id, signature.tobytes(), numbers) for chunk_id, (signature, numbers, _) in signed.items()],
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO lsh_buckets (band, bucket, chunk_id) VALUES (?, ?, ?)",
+                [
+                    (band, key, chunk_id)
+                    for chunk_id, (_, _, band_keys) in signed.items()
+                    for band, key in enumerate(band_keys)
+                ],
+            )
+            self._conn.commit()
+
+    def add_references(self, references: List[Tuple[str, str, str, str, Dict]]) -> None:
+        """Record (chunk_id, canonical_id, doc_key, content_hash, metadata) rows for folded chunks."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO duplicate_refs "
+                "(chunk_id, canonical_id, doc_key, page_number, content_hash, metadata) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (chunk_id, canonical_id, doc_key, metadata.get("page_number"), content_hash, json.dumps(metadata))
+                    for chunk_id, canonical_id, doc_key, content_hash, metadata in references
+                ],
+            )
+            self._conn.commit()
+
+    def references(self, canonical_ids: List[str]) -> Dict[str, List[Dict]]:
+        """Metadata of every duplicate folded into each canonical chunk."""
+        found: Dict[str, List[Dict]] = {}
+        with self._lock:
+            for start in range(0, len(canonical_ids), 500):
+                part = canonical_ids[start:start + 500]
+                for canonical_id, metadata in self._conn.execute(
+                    f"SELECT canonical_id, metadata FROM duplicate_refs "
+                    f"WHERE canonical_id IN ({','.join('?' * len(part))}) ORDER BY rowid",
+                    part,
+                ):
+                    found.setdefault(canonical_id, []).append(json.loads(metadata))
+        return found
+
+    def document_duplicates(self, doc_key: str) -> List[Tuple[str, Optional[int], Optional[str]]]:
+        """(chunk_id, page_number, content_hash) of a document's chunks folded into others."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT chunk_id, page_number, content_hash FROM duplicate_refs WHERE doc_key = ?", (doc_key,)
+            ).fetchall()
+
+    def canonical_ids(self, doc_key: str, page_from: int = None, page_to: int = None) -> List[str]:
+        """Canonical chunks that a document's folded duplicates, optionally within a page range, point at."""
+        query = "SELECT DISTINCT canonical_id FROM duplicate_refs WHERE doc_key = ?"
+        params: list = [doc_key]
+        if page_from is not None:
+            query += " AND page_number >= ?"
+            params.append(page_from)
+        if page_to is not None:
+            query += " AND page_number <= ?"
+            params.append(page_to)
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query, params)]
+
+    def release(self, ids: List[str]) -> Tuple[List[str], Dict[str, Tuple[str, Dict]]]:
+        """
+        Forget `ids`, which are about to be deleted. Returns the ids that are
+        real Chroma rows, and for canonical chunks that other references
+        still point at, a canonical_id -> (successor_id, successor metadata)
+        map: the first surviving reference is promoted and every other
+        reference re-pointed to it.
+        """
+        with self._lock:
+            duplicate_ids = set()
+            for start in range(0, len(ids), 500):
+                part = ids[start:start + 500]
+                marks = ",".join("?" * len(part))
+                duplicate_ids.update(row[0] for row in self._conn.execute(
+                    f"SELECT chunk_id FROM duplicate_refs WHERE chunk_id IN ({marks})", part
+                ))
+                self._conn.execute(f"DELETE FROM duplicate_refs WHERE chunk_id IN ({marks})", part)
+
+            stored = [chunk_id for chunk_id in ids if chunk_id not in duplicate_ids]
+            promotions: Dict[str, Tuple[str, Dict]] = {}
+            for canonical_id in stored:
+                row = self._conn.execute(
+                    "SELECT chunk_id, metadata FROM duplicate_refs WHERE canonical_id = ? ORDER BY rowid LIMIT 1",
+                    (canonical_id,),
+                ).fetchone()
+                if row is not None:
+                    successor_id = row[0]
+                    promotions[canonical_id] = (successor_id, json.loads(row[1]))
+                    self._conn.execute("DELETE FROM duplicate_refs WHERE chunk_id = ?", (successor_id,))
+                    self._conn.execute(
+                        "UPDATE duplicate_refs SET canonical_id = ? WHERE canonical_id = ?",
+                        (successor_id, canonical_id),
+                    )
+                    self._conn.execute(
+                        "UPDATE signatures SET chunk_id = ? WHERE chunk_id = ?", (successor_id, canonical_id)
+                    )
+                    self._conn.execute(
+                        "UPDATE lsh_buckets SET chunk_id = ? WHERE chunk_id = ?", (successor_id, canonical_id)
+                    )
+                else:
+                    self._conn.execute("DELETE FROM signatures WHERE chunk_id = ?", (canonical_id,))
+                    self._conn.execute("DELETE FROM lsh_buckets WHERE chunk_id = ?", (canonical_id,))
+            self._conn.commit()
+        return stored, promotions
+
+    def export(self) -> Tuple[List[Tuple[str, np.ndarray, str]], List[Tuple[str, str, str, str, Dict]]]:
+        """
+        Every indexed (chunk_id, signature, numbers) and every reference in
+        add_references' row shape, for snapshots.
+        """
+        with self._lock:
+            signatures = [
+                (chunk_id, np.frombuffer(signature, dtype=np.uint32), numbers)
+                for chunk_id, signature, numbers in self._conn.execute(
+                    "SELECT chunk_id, signature, numbers FROM signatures ORDER BY rowid"
+                )
+            ]
+            references = [
+                (chunk_id, canonical_id, doc_key, content_hash, json.loads(metadata))
+                for chunk_id, canonical_id, doc_key, content_hash, metadata in self._conn.execute(
+                    "SELECT chunk_id, canonical_id, doc_key, content_hash, metadata FROM duplicate_refs ORDER BY rowid"
+                )
+            ]
+        return signatures, references
+
+    def add_signatures(self, signatures: List[Tuple[str, np.ndarray, str]]) -> None:
+        """Index exported (chunk_id, signature, numbers) rows; band keys follow this index's DEDUP_BANDS."""
+        self.add({
+            chunk_id: (signature, numbers, self._band_keys(signature)) for chunk_id, signature, numbers in signatures
+        })
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM duplicate_refs")
+            self._conn.execute("DELETE FROM lsh_buckets")
+            self._conn.execute("DELETE FROM signatures")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            canonical = self._conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+            duplicates = self._conn.execute("SELECT COUNT(*) FROM duplicate_refs").fetchone()[0]
+        return {"canonical_chunks": canonical, "duplicate_chunks": duplicates}
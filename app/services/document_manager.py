@@ -1,52 +1,49 @@
 import logging
-from pathlib import Path
-from app.core.database import get_collection
 from app.services.file_manager import delete_pdf
 from app.core.config import settings
+from app.core.executors import run_in_thread
+from app.services.vector_service import VectorService
 
 logger = logging.getLogger("document-manager")
 
 class DocumentManager:
-    def __init__(self):
-        self.collection = get_collection()
+    def __init__(self, vector_service: VectorService):
+        self.vector_service = vector_service
+        self.collection = vector_service.collection
+        self.registry = vector_service.registry
     
-    def get_document_source(self, filename: str) -> str:
-        """Get normalized source path matching upload logic"""
-        # Use SAME normalization as in main.py upload endpoint
-        safe_filename = filename.replace(" ", "_").lower()
-        return f"/static/documents/{Path(safe_filename).name}"
-    
-    def delete_document(self, filename: str) -> dict:
+    async def delete_document(self, filename: str) -> dict:
         """Atomic document deletion with verification"""
-        source_path = self.get_document_source(filename)
-        
-        # 1. Verify document exists in vector DB
-        existing = self.collection.get(
-            where={"source": source_path},
-            include=["metadatas"]
-        )
-        
-        if not existing["ids"]:
+        # 1. Look the document up in the registry (no collection scan)
+        document = await run_in_thread(self.registry.get, filename)
+        if document is None:
             raise ValueError(f"Document not found in vector database: {filename}")
+        ids = await self.vector_service.document_chunk_ids(filename)
         
-        # 2. Delete from vector DB FIRST
+        # 2. Delete from vector DB FIRST, by id in bounded batches
         try:
-            self.collection.delete(ids=existing["ids"])
+            await self.vector_service.delete_chunks(ids)
         except Exception as e:
             raise RuntimeError(f"Vector database deletion failed: {str(e)}")
         
-        # 3. Verify deletion succeeded
-        verification = self.collection.get(
-            where={"source": source_path},
-            include=[]
-        )
-        if verification["ids"]:
+        # 3. Verify deletion succeeded (id lookup, not a metadata scan)
+        remaining = 0
+        batch_size = max(1, settings.DELETE_BATCH_SIZE)
+        for start in range(0, len(ids), batch_size):
+            verification = await run_in_thread(
+                self.collection.get,
+                ids=ids[start:start + batch_size],
+                include=[]
+            )
+            remaining += len(verification["ids"])
+        if remaining:
             raise RuntimeError(
-                f"Deletion verification failed: {len(verification['ids'])} chunks remain"
+                f"Deletion verification failed: {remaining} chunks remain"
             )
+        await run_in_thread(self.registry.remove, filename)
         
         # 4. Delete physical file
-        file_deleted = delete_pdf(filename)
+        file_deleted = await run_in_thread(delete_pdf, filename)
         if not file_deleted:
             logger.warning(
                 f"Physical file deletion failed for {filename}, "
@@ -54,8 +51,8 @@ class DocumentManager:
             )
         
         return {
-            "chunks_deleted": len(existing["ids"]),
+            "chunks_deleted": len(ids),
             "file_deleted": file_deleted,
-            "source_path": source_path,
+            "source_path": document["source"],
             "filename": filename
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,242 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.embedding_cache import text_hash
+from app.services.file_manager import safe_filename
+
+DOCUMENT_FIELDS = [
+    "doc_key", "filename", "source", "file_hash", "size_bytes", "page_count", "chunk_count",
+    "ingested_at", "updated_at",
+]
+# (chunk_id, page_number, content_hash)
+ChunkRow = Tuple[str, Optional[int], Optional[str]]
+
+
+def document_key(metadata: Dict) -> str:
+    """Registry key of the document a chunk belongs to: its stored PDF name."""
+    return safe_filename(document_name(metadata))
+
+
+def document_name(metadata: Dict) -> str:
+    return metadata.get("filename") or os.path.basename(str(metadata.get("source", "")))
+
+
+def group_chunks(
+    ids: List[str], metadatas: List[Dict], contents: Optional[List[str]] = None
+) -> Tuple[Dict[str, List[ChunkRow]], Dict[str, Tuple[str, str]]]:
+    """
+    Group (chunk_id, page_number, content_hash) rows by document key, with
+    each document's (filename, source).
+    """
+    chunks: Dict[str, List[ChunkRow]] = {}
+    names: Dict[str, Tuple[str, str]] = {}
+    contents = contents if contents is not None else [None] * len(ids)
+    for chunk_id, metadata, content in zip(ids, metadatas, contents):
+        metadata = metadata or {}
+        key = document_key(metadata)
+        content_hash = text_hash(content) if content is not None else None
+        chunks.setdefault(key, []).append((chunk_id, metadata.get("page_number"), content_hash))
+        names.setdefault(key, (document_name(metadata), metadata.get("source", key)))
+    return chunks, names
+
+
+class DocumentRegistry:
+    """
+    Persistent index of ingested documents and the Chroma ids of their chunks.
+    - Keyed by the stored PDF name, so lookups never scan the collection
+    - Chunk ids are recorded before they are written to Chroma, so after a
+      crash the registry may list ids Chroma never got, but never misses one;
+      deleting by id is idempotent either way
+    """
+
+    _instance = None
+
+    def __init__(self, path: str = settings.DOCUMENT_REGISTRY_PATH):
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_key TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                source TEXT NOT NULL,
+                file_hash TEXT,
+                size_bytes INTEGER NOT NULL DEFAULT 0,
+                page_count INTEGER NOT NULL DEFAULT 0,
+                chunk_count INTEGER NOT NULL DEFAULT 0,
+                ingested_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS document_chunks (
+                chunk_id TEXT PRIMARY KEY,
+                doc_key TEXT NOT NULL REFERENCES documents(doc_key) ON DELETE CASCADE
+            );
+            CREATE INDEX IF NOT EXISTS idx_document_chunks_doc ON document_chunks(doc_key);
+            CREATE TABLE IF NOT EXISTS document_pages (
+                doc_key TEXT NOT NULL REFERENCES documents(doc_key) ON DELETE CASCADE,
+                page_number INTEGER NOT NULL,
+                text_hash TEXT NOT NULL,
+                PRIMARY KEY (doc_key, page_number)
+            );
+            """
+        )
+        # Page/content hashes drive incremental re-ingestion; older registries lack them
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(document_chunks)")}
+        if "page_number" not in columns:
+            self._conn.execute("ALTER TABLE document_chunks ADD COLUMN page_number INTEGER")
+        if "content_hash" not in columns:
+            self._conn.execute("ALTER TABLE document_chunks ADD COLUMN content_hash TEXT")
+        self._conn.commit()
+
+    @classmethod
+    def get_instance(cls) -> "DocumentRegistry":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def upsert(self, filename: str, source: str, **fields) -> Dict:
+        """Create or update a document row; extra fields are file_hash, size_bytes, page_count."""
+        doc_key = safe_filename(filename)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO documents (doc_key, filename, source, ingested_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(doc_key) DO UPDATE SET filename = excluded.filename, "
+                "source = excluded.source, updated_at = excluded.updated_at",
+                (doc_key, filename, source, now, now),
+            )
+            if fields:
+                assignments = ", ".join(f"{name} = ?" for name in fields)
+                self._conn.execute(
+                    f"UPDATE documents SET {assignments} WHERE doc_key = ?", [*fields.values(), doc_key]
+                )
+            self._conn.commit()
+        return self.get(filename)
+
+    def get(self, filename: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(DOCUMENT_FIELDS)} FROM documents WHERE doc_key = ?",
+                (safe_filename(filename),),
+            ).fetchone()
+        return dict(zip(DOCUMENT_FIELDS, row)) if row else None
+
+    def get_by_source(self, source: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(DOCUMENT_FIELDS)} FROM documents WHERE source = ?", (source,)
+            ).fetchone()
+        return dict(zip(DOCUMENT_FIELDS, row)) if row else None
+
+    def exists(self, filename: str) -> bool:
+        return self.get(filename) is not None
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(DOCUMENT_FIELDS)} FROM documents ORDER BY ingested_at DESC"
+            ).fetchall()
+        return [dict(zip(DOCUMENT_FIELDS, row)) for row in rows]
+
+    def add_chunks(self, chunks: Dict[str, List[ChunkRow]], names: Dict[str, Tuple[str, str]] = None) -> None:
+        """
+        Record chunk rows per document key. Documents not registered yet (e.g.
+        chunks added outside an ingestion job) get a minimal row named from
+        `names`, a doc_key -> (filename, source) map.
+        """
+        names = names or {}
+        now = time.time()
+        with self._lock:
+            for doc_key, rows in chunks.items():
+                filename, source = names.get(doc_key, (doc_key, doc_key))
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO documents (doc_key, filename, source, ingested_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (doc_key, filename, source, now, now),
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO document_chunks (chunk_id, doc_key, page_number, content_hash) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(chunk_id, doc_key, page_number, content_hash) for chunk_id, page_number, content_hash in rows],
+                )
+                self._update_chunk_count(doc_key, now)
+            self._conn.commit()
+
+    def chunk_ids(self, filename: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM document_chunks WHERE doc_key = ?", (safe_filename(filename),)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def chunks(self, filename: str) -> List[ChunkRow]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT chunk_id, page_number, content_hash FROM document_chunks WHERE doc_key = ?",
+                (safe_filename(filename),),
+            ).fetchall()
+
+    def page_hashes(self, filename: str) -> Dict[int, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page_number, text_hash FROM document_pages WHERE doc_key = ?",
+                (safe_filename(filename),),
+            ).fetchall()
+        return dict(rows)
+
+    def set_page_hashes(self, filename: str, hashes: Dict[int, str]) -> None:
+        """Replace the recorded text hash of every page of a document."""
+        doc_key = safe_filename(filename)
+        with self._lock:
+            self._conn.execute("DELETE FROM document_pages WHERE doc_key = ?", (doc_key,))
+            self._conn.executemany(
+                "INSERT INTO document_pages (doc_key, page_number, text_hash) VALUES (?, ?, ?)",
+                [(doc_key, page_number, h) for page_number, h in hashes.items()],
+            )
+            self._conn.commit()
+
+    def remove_chunks(self, ids: List[str]) -> None:
+        with self._lock:
+            doc_keys = set()
+            for start in range(0, len(ids), 500):
+                part = ids[start:start + 500]
+                marks = ",".join("?" * len(part))
+                doc_keys.update(row[0] for row in self._conn.execute(
+                    f"SELECT DISTINCT doc_key FROM document_chunks WHERE chunk_id IN ({marks})", part
+                ))
+                self._conn.execute(f"DELETE FROM document_chunks WHERE chunk_id IN ({marks})", part)
+            now = time.time()
+            for doc_key in doc_keys:
+                self._update_chunk_count(doc_key, now)
+            self._conn.commit()
+
+    def remove(self, filename: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM documents WHERE doc_key = ?", (safe_filename(filename),))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM document_pages")
+            self._conn.execute("DELETE FROM document_chunks")
+            self._conn.execute("DELETE FROM documents")
+            self._conn.commit()
+
+    def total_chunks(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM document_chunks").fetchone()[0]
+
+    def _update_chunk_count(self, doc_key: str, now: float) -> None:
+        self._conn.execute(
+            "UPDATE documents SET chunk_count = "
+            "(SELECT COUNT(*) FROM document_chunks WHERE doc_key = ?), updated_at = ? WHERE doc_key = ?",
+            (doc_key, now, doc_key),
+        )
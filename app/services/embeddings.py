@@ -1,6 +1,11 @@
 import hashlib
 
-def generate_document_id(source: str, page_number: int, chunk_index: int) -> str:
-    """Generate deterministic ID using source, page, and chunk"""
-    unique_str = f"{source}_{page_number}_{chunk_index}"
-    return hashlib.sha256(unique_str.encode()).hexdigest()[:20]
\ No newline at end of file
+def generate_document_id(source: str, page_number: int, chunk_index: int, content: str = "") -> str:
+    """
+    Generate deterministic ID using source, page, page-global chunk ordinal
+    and a hash of the chunk text, so re-ingesting identical content maps
+    onto the same id and edited content gets a new one
+    """
+    content_hash = hashlib.sha256(content.encode()).hexdigest()
+    unique_str = f"{source}_{page_number}_{chunk_index}_{content_hash}"
+    return hashlib.sha256(unique_str.encode()).hexdigest()[:20]
@@ -1,23 +1,81 @@
+import hashlib
 import os
 import shutil
+import uuid
 from pathlib import Path
+from typing import Optional
 from app.core.config import settings
+from app.core.executors import run_in_thread
 
-def save_pdf(file_data: bytes, filename: str) -> str:
-    """Save PDF to static directory and return relative path"""
+def safe_filename(filename: str) -> str:
+    """Name a PDF is stored under in the upload directory"""
+    return filename.replace(" ", "_").lower()
+
+async def save_pdf_stream(
+    upload, filename: str, chunk_size: int = settings.UPLOAD_CHUNK_SIZE, file_path: Optional[str] = None
+) -> str:
+    """
+    Spool an upload to the static directory chunk by chunk, so memory stays
+    bounded by chunk_size whatever the file size. Writes to `file_path`
+    (e.g. a staging_pdf_path) or else the live path; returns the live
+    path relative to the app either way.
+    """
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-    safe_filename = filename.replace(" ", "_").lower()
-    file_path = os.path.join(settings.UPLOAD_DIR, safe_filename)
-    
-    with open(file_path, "wb") as f:
-        f.write(file_data)
-    
+    stored_name = safe_filename(filename)
+    file_path = str(file_path or os.path.join(settings.UPLOAD_DIR, stored_name))
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    partial_path = file_path + ".part"
+
+    f = await run_in_thread(open, partial_path, "wb")
+    try:
+        while True:
+            data = await upload.read(chunk_size)
+            if not data:
+                break
+            await run_in_thread(f.write, data)
+    except BaseException:
+        await run_in_thread(f.close)
+        os.remove(partial_path)
+        raise
+    await run_in_thread(f.close)
+    # Readers never see a half-written file
+    os.replace(partial_path, file_path)
+
     # Use settings.UPLOAD_DIR so return stays accurate if config changes
-    return f"/{settings.UPLOAD_DIR}/{safe_filename}"
+    return f"/{settings.UPLOAD_DIR}/{stored_name}"
+
+def get_pdf_path(filename: str) -> Path:
+    """Local disk path of a stored PDF"""
+    return Path(settings.UPLOAD_DIR) / safe_filename(filename)
+
+def staging_pdf_path(filename: str) -> Path:
+    """
+    Unique path an upload waits at until its ingestion job completes, so the
+    live PDF always matches the stored chunks. Inside UPLOAD_DIR, so
+    promote_pdf is a same-filesystem rename.
+    """
+    return Path(settings.UPLOAD_DIR) / ".staging" / f"{uuid.uuid4().hex}-{safe_filename(filename)}"
+
+def promote_pdf(staged_path: str, filename: str) -> None:
+    """Atomically replace the live PDF with a staged upload"""
+    os.replace(staged_path, get_pdf_path(filename))
+
+def discard_staged_pdf(staged_path: str, filename: str) -> None:
+    """Delete a staged upload; never the live PDF"""
+    if Path(staged_path) != get_pdf_path(filename) and os.path.exists(staged_path):
+        os.remove(staged_path)
+
+def file_sha256(file_path: str, chunk_size: int = settings.UPLOAD_CHUNK_SIZE) -> str:
+    """Content hash of a stored file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
 def delete_pdf(filename: str) -> bool:
     """Delete PDF file from storage"""
-    file_path = Path(settings.UPLOAD_DIR) / filename.replace(" ", "_").lower()
+    file_path = get_pdf_path(filename)
     if file_path.exists():
         os.remove(file_path)
         return True
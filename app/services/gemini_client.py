@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import random
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from google.api_core import exceptions as google_exceptions
+
+from app.core.config import settings, logger
+from app.core.metrics import LLM_CALLS
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Async token bucket: refills `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def is_retryable(error: Exception) -> bool:
+    """429 and 5xx responses from the Gemini API are worth retrying."""
+    if isinstance(error, google_exceptions.GoogleAPICallError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError))
+
+
+class GeminiClient:
+    """
+    Shared, long-lived gateway for all Gemini calls:
+    - Bounds in-flight calls with a semaphore
+    - Paces calls with a token-bucket rate limiter
+    - Retries 429/5xx with jittered exponential backoff
+    - Coalesces identical in-flight requests (single-flight)
+    """
+
+    _instance = None
+
+    def __init__(
+        self,
+        max_concurrency: int = settings.GEMINI_MAX_CONCURRENCY,
+        rate_per_second: float = settings.GEMINI_RATE_LIMIT_RPS,
+        burst: int = settings.GEMINI_RATE_BURST,
+        max_retries: int = settings.GEMINI_MAX_RETRIES,
+        backoff_base: float = settings.GEMINI_BACKOFF_BASE,
+        backoff_max: float = settings.GEMINI_BACKOFF_MAX,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def get_instance(cls) -> "GeminiClient":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Stable key for single-flight coalescing of identical requests."""
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def call(self, key: str, func: Callable[[], Awaitable[Any]], kind: str = "other") -> Any:
+        """Run `func` once per identical in-flight `key`; all callers share the result."""
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._call_with_retry(func, kind))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shield so one cancelled caller does not cancel the shared call
+        return await asyncio.shield(task)
+
+    async def _call_with_retry(self, func: Callable[[], Awaitable[Any]], kind: str) -> Any:
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            try:
+                async with self.semaphore:
+                    result = await func()
+                LLM_CALLS.labels(kind=kind, status="ok").inc()
+                return result
+            except Exception as e:
+                LLM_CALLS.labels(kind=kind, status="error").inc()
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                # Full jitter keeps retries from synchronising across callers
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                attempt += 1
+                logger.warning(
+                    "Gemini call failed (%s), retry %d/%d in %.2fs",
+                    str(e), attempt, self.max_retries, delay,
+                )
+                await asyncio.sleep(delay)
+
+    async def stream(self, func: Callable[[], Awaitable[Any]], kind: str = "other") -> AsyncIterator[Any]:
+        """
+        Yield chunks of a streaming call under the same limits. Streams are not
+        coalesced, and retries only happen before the first chunk arrives.
+        """
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            started = False
+            try:
+                async with self.semaphore:
+                    response = await func()
+                    async for chunk in response:
+                        started = True
+                        yield chunk
+                LLM_CALLS.labels(kind=kind, status="ok").inc()
+                return
+            except Exception as e:
+                LLM_CALLS.labels(kind=kind, status="error").inc()
+                if started or attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                attempt += 1
+                logger.warning(
+                    "Gemini stream failed (%s), retry %d/%d in %.2fs",
+                    str(e), attempt, self.max_retries, delay,
+                )
+                await asyncio.sleep(delay)
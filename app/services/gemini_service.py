@@ -1,22 +1,23 @@
-import google.generativeai as genai
-from app.core.config import settings
-from typing import List, Dict
-
-genai.configure(api_key=settings.GEMINI_API_KEY)
+from app.core.metrics import stage, record_llm_usage
+from app.services.gemini_client import GeminiClient
+from app.services.llm_backends import LLMBackend, get_backend
+from typing import AsyncIterator, List, Dict
 
 class GeminiService:
-    def __init__(self):
-        self.embedding_model = "gemini-embedding-001"
-        self.generation_model = genai.GenerativeModel('gemini-2.5-flash-lite')
+    def __init__(self, backend: LLMBackend = None):
+        # Gemini by default; LLM_BACKEND=fake swaps in the deterministic local stand-in
+        self.backend = backend or get_backend()
+        self.embedding_model = self.backend.embedding_model
+        self.generation_model_name = self.backend.generation_model_name
+        self.client = GeminiClient.get_instance()
     
-    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+    async def get_embeddings(self, texts: List[str], task_type: str = "retrieval_document") -> List[List[float]]:
         """Generate embeddings for multiple texts"""
-        result = genai.embed_content(
-            model=self.embedding_model,
-            content=texts,
-            task_type="retrieval_document"
-        )
-        return result['embedding']
+        key = self.client.make_key("embed", self.embedding_model, task_type, tuple(texts))
+        with stage("gemini_embed"):
+            return await self.client.call(
+                key, lambda: self.backend.embed(texts, task_type), kind="embed"
+            )
     
     async def clean_extracted_text(self, text: str) -> str:
         """
@@ -47,28 +48,28 @@ class GeminiService:
         """
         
 
-        response = await self.generation_model.generate_content_async(
-                prompt,
-                generation_config={
-                    "temperature": 0.0,  # Deterministic output
-                    "max_output_tokens": 2000,
-                    "top_p": 0.95
-                },
-                safety_settings={
-                    "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
-                    "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE"
-                }
+        with stage("llm_clean"):
+            response = await self.client.call(
+                self.client.make_key("clean", self.generation_model_name, prompt),
+                lambda: self.backend.generate(
+                    prompt,
+                    generation_config={
+                        "temperature": 0.0,  # Deterministic output
+                        "max_output_tokens": 2000,
+                        "top_p": 0.95
+                    },
+                    safety_settings={
+                        "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
+                        "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE"
+                    }
+                ),
+                kind="clean"
             )
+        record_llm_usage("clean", response)
         return response.text.strip()
     
-    async def answer_question(self, question: str, retrieved_context: str) -> str:
-        """
-        Answer questions ONLY based on retrieved context
-        """
-        if not retrieved_context.strip():
-            return "Not found"
-        
-        prompt = f"""
+    def build_answer_prompt(self, question: str, retrieved_context: str) -> str:
+        return f"""
         You are a helpful assistant that answers questions STRICTLY based on the provided context.
         
         CRITICAL RULES:
@@ -88,20 +89,69 @@ class GeminiService:
         
         Answer (or "Not found" if context is irrelevant):
         """
-        
-        response = await self.generation_model.generate_content_async(
-            prompt,
-            generation_config={
-                "temperature": 0.1,  # Low temperature for consistency
-                "max_output_tokens": 500,
-            }
-        )
-        
-        answer = response.text.strip()
-        
+
+    @staticmethod
+    def normalize_answer(answer: str) -> str:
+        answer = answer.strip()
         # Additional safety check
         if "not found" in answer.lower() or "no information" in answer.lower():
             return "Not found"
-        
         return answer
 
+    async def answer_question(self, question: str, retrieved_context: str) -> str:
+        """
+        Answer questions ONLY based on retrieved context
+        """
+        if not retrieved_context.strip():
+            return "Not found"
+        
+        prompt = self.build_answer_prompt(question, retrieved_context)
+        
+        with stage("llm_answer"):
+            response = await self.client.call(
+                self.client.make_key("answer", self.generation_model_name, prompt),
+                lambda: self.backend.generate(
+                    prompt,
+                    generation_config={
+                        "temperature": 0.1,  # Low temperature for consistency
+                        "max_output_tokens": 500,
+                    }
+                ),
+                kind="answer"
+            )
+        record_llm_usage("answer", response)
+        
+        return self.normalize_answer(response.text)
+
+    async def stream_answer(self, question: str, retrieved_context: str) -> AsyncIterator[str]:
+        """
+        Stream answer text as Gemini produces it.
+        Callers apply normalize_answer to the joined text for "Not found".
+        """
+        if not retrieved_context.strip():
+            yield "Not found"
+            return
+
+        prompt = self.build_answer_prompt(question, retrieved_context)
+        last_chunk = None
+        async for chunk in self.client.stream(
+            lambda: self.backend.generate_stream(
+                prompt,
+                generation_config={
+                    "temperature": 0.1,
+                    "max_output_tokens": 500,
+                },
+            ),
+            kind="answer_stream"
+        ):
+            last_chunk = chunk
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. safety or finish metadata)
+                continue
+            if text:
+                yield text
+        # The final chunk carries usage for the whole stream
+        if last_chunk is not None:
+            record_llm_usage("answer_stream", last_chunk)
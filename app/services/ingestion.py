@@ -0,0 +1,413 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import aclosing
+from typing import Dict, List, Optional, Set
+
+from app.core.config import settings, logger
+from app.core.executors import run_in_thread
+from app.core.metrics import stage
+from app.services.embedding_cache import text_hash
+from app.services.file_manager import discard_staged_pdf, file_sha256, promote_pdf, safe_filename
+from app.services.pdf_processor import PDFProcessor
+from app.services.vector_service import VectorService, chunk_id
+
+JOB_FIELDS = [
+    "job_id", "filename", "source", "file_path", "mode", "status", "pages_parsed", "chunks_total",
+    "chunks_embedded", "chunks_written", "chunks_added", "chunks_removed", "chunks_unchanged",
+    "document_id", "error", "created_at", "updated_at",
+]
+COUNTERS = ("pages_parsed", "chunks_total", "chunks_embedded", "chunks_written", "chunks_added")
+FINISHED_STATUSES = {"completed", "failed", "cancelled"}
+
+
+class JobStore:
+    """Small SQLite-backed store so ingestion jobs survive process restarts."""
+
+    def __init__(self, path: str = settings.JOB_STORE_PATH):
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                source TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                status TEXT NOT NULL,
+                pages_parsed INTEGER NOT NULL DEFAULT 0,
+                chunks_total INTEGER NOT NULL DEFAULT 0,
+                chunks_embedded INTEGER NOT NULL DEFAULT 0,
+                chunks_written INTEGER NOT NULL DEFAULT 0,
+                document_id TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        # Columns added for incremental re-ingestion
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, definition in (
+            ("mode", "TEXT NOT NULL DEFAULT 'full'"),
+            ("chunks_added", "INTEGER NOT NULL DEFAULT 0"),
+            ("chunks_removed", "INTEGER NOT NULL DEFAULT 0"),
+            ("chunks_unchanged", "INTEGER NOT NULL DEFAULT 0"),
+            ("doc_key", "TEXT"),
+        ):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+        self._conn.commit()
+
+    def create(self, filename: str, source: str, file_path: str, mode: str = "full") -> Dict:
+        """
+        Record a queued job. Raises ValueError if the document already has a
+        queued or running job; the check and insert are one statement, so
+        this holds across processes sharing the store.
+        """
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        doc_key = safe_filename(filename)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (job_id, filename, doc_key, source, file_path, mode, status, created_at, updated_at) "
+                "SELECT ?, ?, ?, ?, ?, ?, 'queued', ?, ? WHERE NOT EXISTS ("
+                "SELECT 1 FROM jobs WHERE doc_key = ? AND status IN ('queued', 'running'))",
+                (job_id, filename, doc_key, source, file_path, mode, now, now, doc_key),
+            )
+            self._conn.commit()
+        if cursor.rowcount == 0:
+            raise ValueError(f"{filename} already has an ingestion job in progress")
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return dict(zip(JOB_FIELDS, row)) if row else None
+
+    def list(self, limit: int = 100) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(JOB_FIELDS)} FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(zip(JOB_FIELDS, row)) for row in rows]
+
+    def unfinished(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE status IN ('queued', 'running') "
+                "ORDER BY created_at ASC"
+            ).fetchall()
+        return [dict(zip(JOB_FIELDS, row)) for row in rows]
+
+    def update(self, job_id: str, **fields) -> None:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE job_id = ?", [*fields.values(), job_id]
+            )
+            self._conn.commit()
+
+    def claim(self, job_id: str) -> bool:
+        """Move a queued job to running; False if it is no longer queued (e.g. cancelled meanwhile)."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'running', updated_at = ? WHERE job_id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def increment(self, job_id: str, field: str, amount: int) -> None:
+        if field not in COUNTERS:
+            raise ValueError(f"Unknown progress counter: {field}")
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {field} = {field} + ?, updated_at = ? WHERE job_id = ?",
+                (amount, time.time(), job_id),
+            )
+            self._conn.commit()
+
+
+class IngestionQueue:
+    """
+    Background ingestion: uploads are queued as jobs and a pool of worker
+    tasks runs the PDFProcessor -> VectorService pipeline for each one.
+
+    With several processes on one job store only the elected writer runs
+    workers; the others just record jobs, and the writer polls the store
+    for them (and for cancellations) every INGEST_POLL_SECONDS.
+    """
+
+    def __init__(self, pdf_processor: PDFProcessor, vector_service: VectorService, store: JobStore = None):
+        self.pdf_processor = pdf_processor
+        self.vector_service = vector_service
+        self.store = store or JobStore()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._enqueued: Set[str] = set()
+        # Chunk ids each running job's document had when it started, for rollback
+        self._previous: Dict[str, Set[str]] = {}
+        self._stopping = False
+        self.writer = True
+
+    @property
+    def running(self) -> bool:
+        return self._queue is not None and not self._stopping
+
+    async def start(self, workers: int = settings.INGEST_WORKERS, writer: bool = True) -> None:
+        self._stopping = False
+        self._queue = asyncio.Queue()
+        self.writer = writer
+        if not writer:
+            return
+        # Resume anything left queued or half-done by a previous process
+        for job in await run_in_thread(self.store.unfinished):
+            await run_in_thread(
+                self.store.update, job["job_id"], status="queued", **{counter: 0 for counter in COUNTERS},
+            )
+            self._enqueue(job["job_id"])
+            logger.info("Re-queued ingestion job %s (%s)", job["job_id"], job["filename"])
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(max(1, workers))]
+        if settings.STORE_MODE != "embedded":
+            self._workers.append(asyncio.create_task(self._poll()))
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, filename: str, source: str, file_path: str, mode: str = "full") -> Dict:
+        """
+        Queue a job for a PDF staged at file_path; it replaces the live PDF
+        only once the job completes. mode is "full", or "update" to
+        re-ingest only what changed. Raises ValueError while another job
+        for the same document is unfinished.
+        """
+        job = await run_in_thread(self.store.create, filename, source, file_path, mode)
+        if self.writer:
+            self._enqueue(job["job_id"])
+        return job
+
+    def _enqueue(self, job_id: str) -> None:
+        if job_id not in self._enqueued:
+            self._enqueued.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    async def _poll(self) -> None:
+        """Writer only: pick up jobs submitted and cancelled through other processes."""
+        while True:
+            await asyncio.sleep(max(0.1, settings.INGEST_POLL_SECONDS))
+            try:
+                for job in await run_in_thread(self.store.unfinished):
+                    if job["status"] == "queued":
+                        self._enqueue(job["job_id"])
+                for job_id, task in list(self._running.items()):
+                    job = await run_in_thread(self.store.get, job_id)
+                    if job is not None and job["status"] == "cancelled":
+                        task.cancel()
+            except Exception as e:
+                logger.warning("Polling the job store failed: %s", str(e))
+
+    async def cancel(self, job_id: str) -> Dict:
+        """Cancel a queued or running job and discard anything it already wrote."""
+        job = await run_in_thread(self.store.get, job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job["status"] in FINISHED_STATUSES:
+            raise ValueError(f"Job {job_id} already {job['status']}")
+
+        await run_in_thread(self.store.update, job_id, status="cancelled")
+        task = self._running.get(job_id)
+        if task is not None:
+            # The worker discards partial output once the task unwinds
+            task.cancel()
+        elif self.writer or job["status"] == "queued":
+            # A job running in the writer process is cancelled by its poll loop
+            await self._discard(job)
+        return await run_in_thread(self.store.get, job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = await run_in_thread(self.store.get, job_id)
+                if job is None or job["status"] != "queued":
+                    continue
+                task = asyncio.ensure_future(self._process(job))
+                self._running[job_id] = task
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    if self._stopping:
+                        # Leave the job "running" so the next start resumes it
+                        raise
+                    await self._discard(job)
+                    logger.info("Ingestion job %s cancelled", job_id)
+                except Exception as e:
+                    logger.error("Ingestion job %s failed: %s", job_id, str(e), exc_info=True)
+                    # A failed job leaves nothing half-written searchable, as a cancelled
+                    # one; it is reported failed once that cleanup is done
+                    await self._discard(job)
+                    await run_in_thread(self.store.update, job_id, status="failed", error=str(e))
+                finally:
+                    self._running.pop(job_id, None)
+                    self._previous.pop(job_id, None)
+            finally:
+                self._enqueued.discard(job_id)
+                self._queue.task_done()
+
+    async def _process(self, job: Dict) -> None:
+        """
+        Stream the PDF through the pipeline one page range at a time: while
+        a range is split, cleaned and embedded, later ranges are already
+        being parsed in the process pool.
+
+        In "update" mode the document's previous revision stays in place:
+        pages whose text hash is unchanged are skipped and only chunks with
+        new ids are embedded. In either mode, chunks of an earlier revision
+        that were not rewritten or kept are deleted at the end.
+        """
+        job_id = job["job_id"]
+        # Conditional, so a cancel that landed after the worker read the job wins
+        if not await run_in_thread(self.store.claim, job_id):
+            logger.info("Ingestion job %s no longer queued; skipping", job_id)
+            return
+        update = job["mode"] == "update"
+
+        registry = self.vector_service.registry
+        previous_pages: Dict[int, str] = {}
+        previous_hashes: Dict[str, Optional[str]] = {}
+        previous_by_page: Dict[int, List[str]] = {}
+        # Chunks of any earlier revision; whatever is not rewritten or kept is deleted at the end
+        previous_chunks = await run_in_thread(registry.chunks, job["filename"])
+        if self.vector_service.dedup_index is not None:
+            previous_chunks += await run_in_thread(
+                self.vector_service.dedup_index.document_duplicates, safe_filename(job["filename"])
+            )
+        for doc_id, page_number, content_hash in previous_chunks:
+            previous_hashes[doc_id] = content_hash
+            previous_by_page.setdefault(page_number, []).append(doc_id)
+        self._previous[job_id] = set(previous_hashes)
+        if update:
+            previous_pages = await run_in_thread(registry.page_hashes, job["filename"])
+        file_hash = await run_in_thread(file_sha256, job["file_path"])
+        size_bytes = await run_in_thread(os.path.getsize, job["file_path"])
+
+        async def progress(stage_name: str, count: int) -> None:
+            await run_in_thread(self.store.increment, job_id, f"chunks_{stage_name}", count)
+
+        doc_ids: List[str] = []
+        kept_ids: Set[str] = set()
+        folded_ids: Set[str] = set()
+        page_hashes: Dict[int, str] = {}
+        pages_stream = self.pdf_processor.iter_pages_async(job["file_path"])
+        async with aclosing(pages_stream):
+            while True:
+                with stage("pdf_extraction"):
+                    pages = await anext(pages_stream, None)
+                if pages is None:
+                    break
+                await run_in_thread(self.store.increment, job_id, "pages_parsed", len(pages))
+
+                changed_pages = []
+                for page in pages:
+                    page_hash = text_hash(page["text"])
+                    page_hashes[page["page_number"]] = page_hash
+                    if update and previous_pages.get(page["page_number"]) == page_hash:
+                        kept_ids.update(previous_by_page.get(page["page_number"], []))
+                    else:
+                        changed_pages.append(page)
+
+                with stage("pdf_split"):
+                    documents = await run_in_thread(self.pdf_processor.split_pages, changed_pages, {
+                        "source": job["source"],
+                        "filename": job["filename"]
+                    })
+
+                # SANITY CHECK: Skip empty documents
+                valid_documents = [doc for doc in documents if len(doc["content"]) > 20]
+                if update:
+                    # A changed page can still contain chunks that did not change;
+                    # ids are content-derived, so a known id means identical text
+                    new_documents = []
+                    for doc in valid_documents:
+                        doc_id = chunk_id(doc["metadata"], doc["content"])
+                        if doc_id in previous_hashes:
+                            kept_ids.add(doc_id)
+                        else:
+                            new_documents.append(doc)
+                    valid_documents = new_documents
+                # Repeated warnings and boilerplate become references to one stored chunk
+                valid_documents, folded = await self.vector_service.deduplicate(valid_documents)
+                if valid_documents:
+                    await run_in_thread(self.store.increment, job_id, "chunks_total", len(valid_documents))
+                    await run_in_thread(self.store.increment, job_id, "chunks_added", len(valid_documents))
+
+                    if settings.CLEAN_ON_INGEST:
+                        with stage("ingest_cleaning"):
+                            valid_documents = await self.vector_service.clean_documents(valid_documents)
+
+                    doc_ids += await self.vector_service.add_documents(
+                        valid_documents,
+                        progress=progress,
+                    )
+                # Only now that the canonical chunks are stored may later chunks fold into them
+                folded_ids.update(await self.vector_service.commit_dedup(folded))
+
+        written = set(doc_ids) | folded_ids
+        unchanged = kept_ids - written
+        removed = [doc_id for doc_id in previous_hashes if doc_id not in unchanged and doc_id not in written]
+        if removed:
+            with stage("chroma_delete"):
+                await self.vector_service.delete_chunks(removed)
+        await run_in_thread(registry.set_page_hashes, job["filename"], page_hashes)
+        # The live PDF is swapped only now, so it always matches the stored chunks
+        await run_in_thread(promote_pdf, job["file_path"], job["filename"])
+        # Recorded only on completion: a failed or cancelled job leaves the
+        # previous revision's row (or none) rather than one for a file never ingested
+        await run_in_thread(
+            registry.upsert, job["filename"], job["source"],
+            file_hash=file_hash, size_bytes=size_bytes, page_count=len(page_hashes),
+        )
+
+        first_doc_id = doc_ids[0] if doc_ids else next(iter(sorted(unchanged)), None)
+        await run_in_thread(
+            self.store.update,
+            job_id,
+            status="completed",
+            chunks_removed=len(removed),
+            chunks_unchanged=len(unchanged),
+            document_id=first_doc_id.split("_")[0] if first_doc_id else None,
+        )
+
+    async def _discard(self, job: Dict) -> None:
+        """
+        Roll back a job that stopped early: delete the chunks it wrote and its
+        staged PDF. The previous revision, if any, stays live with its PDF.
+        """
+        try:
+            previous = self._previous.get(job["job_id"])
+            if previous is not None:
+                written = [
+                    doc_id for doc_id in await self.vector_service.document_chunk_ids(job["filename"])
+                    if doc_id not in previous
+                ]
+                if written:
+                    await self.vector_service.delete_chunks(written)
+                if not previous:
+                    await run_in_thread(self.vector_service.registry.remove, job["filename"])
+            await run_in_thread(discard_staged_pdf, job["file_path"], job["filename"])
+        except Exception as e:
+            logger.warning("Cleanup after cancelling job %s failed: %s", job["job_id"], str(e))
@@ -0,0 +1,169 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "do", "does", "for", "from", "how", "i",
+    "if", "in", "is", "it", "of", "on", "or", "that", "the", "this", "to", "what", "when",
+    "where", "which", "with", "you", "your",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lexical terms for BM25:
+    - Part numbers stay whole ("m-123a") and also yield their pieces and
+      separator-free form ("m", "123a", "m123a")
+    - Adjacent words also yield their joined compound ("set point" -> "setpoint"),
+      so spaced and unspaced spellings meet on both index and query side
+    """
+    terms = []
+    words = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        parts = re.split(r"[-_./]", token)
+        if len(parts) > 1:
+            terms.append(token)
+            terms.append("".join(parts))
+        for part in parts:
+            if part in STOPWORDS:
+                words.append(None)
+                continue
+            terms.append(part)
+            words.append(part)
+    for left, right in zip(words, words[1:]):
+        if left and right and left.isalpha() and right.isalpha():
+            terms.append(left + right)
+    return terms
+
+
+class LexicalIndex:
+    """
+    Persistent BM25 inverted index kept alongside the Chroma collection.
+    Postings live in SQLite; corpus statistics are cached in memory.
+    """
+
+    _instance = None
+
+    def __init__(self, path: str = settings.BM25_INDEX_PATH, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                length INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, chunk_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_postings_chunk ON postings(chunk_id);
+            """
+        )
+        self._conn.commit()
+        self._refresh_stats()
+
+    @classmethod
+    def get_instance(cls) -> "LexicalIndex":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def _refresh_stats(self) -> None:
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks"
+        ).fetchone()
+        self.doc_count = count
+        self.avg_length = (total / count) if count else 0.0
+
+    def count(self) -> int:
+        return self.doc_count
+
+    def reload(self) -> None:
+        """Re-read corpus statistics after another process wrote to the index."""
+        with self._lock:
+            self._refresh_stats()
+
+    def add(self, ids: List[str], texts: List[str]) -> None:
+        chunk_rows, posting_rows = [], []
+        for chunk_id, text in zip(ids, texts):
+            counts = Counter(tokenize(text))
+            chunk_rows.append((chunk_id, sum(counts.values())))
+            posting_rows.extend((term, chunk_id, tf) for term, tf in counts.items())
+        with self._lock:
+            self._delete_locked(ids)
+            self._conn.executemany("INSERT INTO chunks (chunk_id, length) VALUES (?, ?)", chunk_rows)
+            self._conn.executemany("INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)", posting_rows)
+            self._conn.commit()
+            self._refresh_stats()
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            self._delete_locked(ids)
+            self._conn.commit()
+            self._refresh_stats()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.commit()
+            self._refresh_stats()
+
+    def _delete_locked(self, ids: List[str]) -> None:
+        for start in range(0, len(ids), 500):
+            part = ids[start:start + 500]
+            marks = ",".join("?" * len(part))
+            self._conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({marks})", part)
+            self._conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({marks})", part)
+
+    def search(self, query: str, top_k: int = 10, ids: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """Return (chunk_id, bm25 score) pairs, best first; with `ids`, only among those chunks."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.doc_count:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT p.term, p.chunk_id, p.tf, c.length FROM postings p "
+                f"JOIN chunks c ON c.chunk_id = p.chunk_id WHERE p.term IN ({','.join('?' * len(terms))})",
+                terms,
+            ).fetchall()
+            doc_count, avg_length = self.doc_count, self.avg_length or 1.0
+
+        postings: Dict[str, List[Tuple[str, int, int]]] = {}
+        for term, chunk_id, tf, length in rows:
+            postings.setdefault(term, []).append((chunk_id, tf, length))
+
+        # Document frequencies stay corpus-wide, so scoped scores rank like global ones
+        scores: Dict[str, float] = {}
+        for term, hits in postings.items():
+            idf = math.log(1 + (doc_count - len(hits) + 0.5) / (len(hits) + 0.5))
+            for chunk_id, tf, length in hits:
+                if ids is not None and chunk_id not in ids:
+                    continue
+                norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[str]:
+    """Fuse ranked id lists; ids ranked high in any list float to the top."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
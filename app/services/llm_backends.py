@@ -0,0 +1,161 @@
+import abc
+import asyncio
+import hashlib
+import math
+import re
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.executors import run_in_thread
+
+
+class LLMBackend(abc.ABC):
+    """
+    Embedding/generation backend behind GeminiService.
+    Responses expose `.text` and, when available, `.usage_metadata`.
+    """
+
+    embedding_model: str
+    generation_model_name: str
+
+    @abc.abstractmethod
+    async def embed(self, texts: List[str], task_type: str) -> List[List[float]]:
+        ...
+
+    @abc.abstractmethod
+    async def generate(
+        self, prompt: str, generation_config: Dict, safety_settings: Optional[Dict] = None
+    ) -> Any:
+        ...
+
+    @abc.abstractmethod
+    async def generate_stream(self, prompt: str, generation_config: Dict) -> AsyncIterator[Any]:
+        ...
+
+
+class GeminiBackend(LLMBackend):
+    def __init__(self):
+        settings.validate()
+        import google.generativeai as genai
+
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        self._genai = genai
+        self.embedding_model = "gemini-embedding-001"
+        self.generation_model_name = 'gemini-2.5-flash-lite'
+        self.generation_model = genai.GenerativeModel(self.generation_model_name)
+
+    async def embed(self, texts: List[str], task_type: str) -> List[List[float]]:
+        # embed_content is synchronous; keep it off the event loop
+        result = await run_in_thread(
+            self._genai.embed_content,
+            model=self.embedding_model,
+            content=texts,
+            task_type=task_type
+        )
+        return result['embedding']
+
+    async def generate(
+        self, prompt: str, generation_config: Dict, safety_settings: Optional[Dict] = None
+    ) -> Any:
+        return await self.generation_model.generate_content_async(
+            prompt,
+            generation_config=generation_config,
+            safety_settings=safety_settings
+        )
+
+    async def generate_stream(self, prompt: str, generation_config: Dict) -> AsyncIterator[Any]:
+        return await self.generation_model.generate_content_async(
+            prompt,
+            generation_config=generation_config,
+            stream=True
+        )
+
+
+class FakeBackend(LLMBackend):
+    """
+    Deterministic local stand-in for Gemini, for benchmarks and offline runs:
+    - Embeddings: hashed word and character-trigram features, L2-normalized
+    - Cleaning: echoes the original text
+    - Answers: the context sentence sharing most terms with the question,
+      or "Not found" when nothing overlaps
+    Latencies are simulated with FAKE_EMBED_LATENCY_MS / FAKE_LLM_LATENCY_MS.
+    """
+
+    WORD_PATTERN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+    def __init__(
+        self,
+        dimensions: int = settings.FAKE_EMBEDDING_DIM,
+        embed_latency_ms: float = settings.FAKE_EMBED_LATENCY_MS,
+        llm_latency_ms: float = settings.FAKE_LLM_LATENCY_MS,
+    ):
+        self.dimensions = dimensions
+        self.embed_latency = embed_latency_ms / 1000
+        self.llm_latency = llm_latency_ms / 1000
+        self.embedding_model = f"fake-hash-ngram-{dimensions}"
+        self.generation_model_name = "fake-template"
+
+    def embed_text(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        lowered = text.lower()
+        features = self.WORD_PATTERN.findall(lowered)
+        compact = re.sub(r"\s+", " ", lowered)
+        features += [compact[i:i + 3] for i in range(len(compact) - 2)]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    async def embed(self, texts: List[str], task_type: str) -> List[List[float]]:
+        if self.embed_latency:
+            await asyncio.sleep(self.embed_latency)
+        return [self.embed_text(text) for text in texts]
+
+    def _respond(self, prompt: str) -> str:
+        if "Original text:" in prompt:
+            return prompt.split("Original text:", 1)[1].strip()
+
+        context = prompt.split("Context:", 1)[-1].split("Question:", 1)[0]
+        question = prompt.split("Question:", 1)[-1].split("Answer (", 1)[0]
+        question_terms = set(self.WORD_PATTERN.findall(question.lower()))
+        best, best_overlap = "Not found", 0
+        for sentence in re.split(r"(?<=[.!?])\s+", context.strip()):
+            overlap = len(question_terms & set(self.WORD_PATTERN.findall(sentence.lower())))
+            if overlap > best_overlap:
+                best, best_overlap = sentence.strip(), overlap
+        return best
+
+    def _response(self, prompt: str, text: str) -> SimpleNamespace:
+        usage = SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    async def generate(
+        self, prompt: str, generation_config: Dict, safety_settings: Optional[Dict] = None
+    ) -> Any:
+        if self.llm_latency:
+            await asyncio.sleep(self.llm_latency)
+        return self._response(prompt, self._respond(prompt))
+
+    async def generate_stream(self, prompt: str, generation_config: Dict) -> AsyncIterator[Any]:
+        text = self._respond(prompt)
+        words = text.split(" ")
+
+        async def chunks():
+            for i, word in enumerate(words):
+                if self.llm_latency:
+                    await asyncio.sleep(self.llm_latency / len(words))
+                piece = word if i == len(words) - 1 else word + " "
+                yield self._response(prompt, piece)
+
+        return chunks()
+
+
+def get_backend() -> LLMBackend:
+    if settings.LLM_BACKEND == "fake":
+        return FakeBackend()
+    if settings.LLM_BACKEND == "gemini":
+        return GeminiBackend()
+    raise ValueError(f"Unknown LLM_BACKEND: {settings.LLM_BACKEND}")
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional, Tuple
+
+from app.core.config import settings, logger
+from app.core.executors import run_in_process, run_in_thread
+from app.core.metrics import CACHE_LOOKUPS
+from app.services.file_manager import get_pdf_path, safe_filename
+from app.services.pdf_processor import write_page_subset
+
+# Extracts used this recently may still be about to be opened by a response; never evict them
+SERVE_GRACE_SECONDS = 10.0
+
+
+class PageCache:
+    """
+    Size-bounded disk cache of page extracts (single pages or short ranges)
+    cut from the stored PDFs, so viewing a cited page never ships the whole
+    manual.
+    - Keyed by stored file, its size and mtime, and the page range; the key
+      doubles as the response ETag, so a re-uploaded PDF gets new keys
+    - Extracts live as plain files next to a SQLite index of sizes and
+      last use; least-recently-used extracts are evicted beyond max_bytes,
+      except those used in the last SERVE_GRACE_SECONDS, which a response
+      may not have opened yet (the cache can briefly exceed max_bytes)
+    """
+
+    _instance = None
+
+    def __init__(self, path: str = settings.PAGE_CACHE_DIR, max_bytes: int = settings.PAGE_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(path, "pages.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                key TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_last_used ON pages(last_used)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_filename ON pages(filename)")
+        self._conn.commit()
+
+    @classmethod
+    def get_instance(cls) -> "PageCache":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.pdf")
+
+    def key(self, filename: str, first: int, last: int) -> str:
+        """Cache key (and ETag) of a page range; raises FileNotFoundError if the PDF is not stored."""
+        stat = os.stat(get_pdf_path(filename))
+        source = f"{safe_filename(filename)}:{stat.st_size}:{stat.st_mtime_ns}:{first}-{last}"
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()[:32]
+
+    def get(self, key: str) -> Optional[str]:
+        """Path of a cached extract, touched for LRU; None on a miss."""
+        with self._lock:
+            found = self._conn.execute("SELECT 1 FROM pages WHERE key = ?", (key,)).fetchone()
+            if found and os.path.exists(self._file(key)):
+                self._conn.execute("UPDATE pages SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+                self.hits += 1
+                CACHE_LOOKUPS.labels(cache="page", result="hit").inc()
+                return self._file(key)
+        self.misses += 1
+        CACHE_LOOKUPS.labels(cache="page", result="miss").inc()
+        return None
+
+    def put(self, key: str, filename: str, extract_path: str) -> str:
+        """Move a freshly written extract into the cache and evict down to max_bytes."""
+        path = self._file(key)
+        os.replace(extract_path, path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (key, filename, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, safe_filename(filename), os.path.getsize(path), time.time()),
+            )
+            self._evict(keep=key)
+            self._conn.commit()
+        return path
+
+    async def fetch(self, filename: str, first: int, last: int) -> Tuple[str, str]:
+        """
+        (path, key) of the extract for pages first..last, cutting it from the
+        stored PDF in the process pool on a miss. Raises FileNotFoundError for
+        an unknown document and ValueError for pages outside it.
+        """
+        key = await run_in_thread(self.key, filename, first, last)
+        path = await run_in_thread(self.get, key)
+        if path is None:
+            # Unique temp name: concurrent misses on one key each write their own file
+            partial_path = os.path.join(self.path, f"{key}.{uuid.uuid4().hex}.part")
+            try:
+                await run_in_process(write_page_subset, str(get_pdf_path(filename)), first, last, partial_path)
+            except BaseException:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+                raise
+            path = await run_in_thread(self.put, key, filename, partial_path)
+        return path, key
+
+    def _evict(self, keep: str) -> None:
+        """
+        Drop least-recently-used extracts (never `keep`, nor any used within
+        SERVE_GRACE_SECONDS) until the cache fits in max_bytes.
+        """
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed, doomed = 0, []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM pages WHERE last_used < ? ORDER BY last_used ASC",
+            (time.time() - SERVE_GRACE_SECONDS,),
+        ):
+            if key == keep:
+                continue
+            doomed.append(key)
+            freed += size
+            if freed >= excess:
+                break
+        self._remove(doomed)
+        logger.info("Page cache evicted %d extracts (%d bytes)", len(doomed), freed)
+
+    def _remove(self, keys) -> None:
+        self._conn.executemany("DELETE FROM pages WHERE key = ?", [(key,) for key in keys])
+        for key in keys:
+            try:
+                os.remove(self._file(key))
+            except FileNotFoundError:
+                pass
+
+    def discard(self, filename: str) -> int:
+        """Drop every extract of a document; returns how many were removed."""
+        with self._lock:
+            keys = [row[0] for row in self._conn.execute(
+                "SELECT key FROM pages WHERE filename = ?", (safe_filename(filename),)
+            )]
+            self._remove(keys)
+            self._conn.commit()
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            keys = [row[0] for row in self._conn.execute("SELECT key FROM pages")]
+            self._remove(keys)
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
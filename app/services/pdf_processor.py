@@ -1,45 +1,200 @@
+import asyncio
+import os
 import PyPDF2
 from io import BytesIO
-from typing import List, Dict, Optional
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from app.services.text_cleaner import clean_pdf_text
+from typing import AsyncIterator, BinaryIO, List, Dict, Optional, Set, Tuple
+from app.core.config import settings
+from app.core.executors import run_in_process
+from app.services.text_cleaner import (
+    build_vocabulary, clean_document_pages, clean_page_text, find_repeated_lines
+)
+
+
+def extract_text_with_pages(pdf_bytes: bytes) -> List[Dict]:
+    """Module-level so it can be shipped to a process pool."""
+    pdf_reader = PyPDF2.PdfReader(BytesIO(pdf_bytes))
+    raw_pages = []
+    
+    for i, page in enumerate(pdf_reader.pages):
+        raw_text = page.extract_text()
+        if raw_text:
+            raw_pages.append((i+1, raw_text))
+
+    # CRITICAL: Clean text before processing. Pages are cleaned together so
+    # headers/footers repeated across the document can be recognised.
+    cleaned_pages = clean_document_pages([text for _, text in raw_pages])
+    pages = []
+    for (page_number, _), cleaned_text in zip(raw_pages, cleaned_pages):
+        if cleaned_text.strip():  # Skip empty pages
+            pages.append({
+                "page_number": page_number,
+                "text": cleaned_text
+            })
+    return pages
+
+
+# Per-process reader, reused across the page ranges of one document so each
+# worker resolves the page tree once rather than once per range
+_open_reader: Optional[Tuple[Tuple[str, float], BinaryIO, PyPDF2.PdfReader]] = None
+
+
+def _get_reader(file_path: str) -> PyPDF2.PdfReader:
+    global _open_reader
+    key = (os.path.abspath(file_path), os.path.getmtime(file_path))
+    if _open_reader is None or _open_reader[0] != key:
+        if _open_reader is not None:
+            _open_reader[1].close()
+        f = open(file_path, "rb")
+        _open_reader = (key, f, PyPDF2.PdfReader(f))
+    return _open_reader[2]
+
+
+def count_pages(file_path: str) -> int:
+    return len(_get_reader(file_path).pages)
+
+
+def sample_boilerplate(file_path: str, sample_size: int = settings.PDF_BOILERPLATE_SAMPLE_PAGES) -> Set[str]:
+    """
+    Header/footer signatures from evenly spaced sample pages, so page
+    ranges can be cleaned independently without seeing the whole document.
+    """
+    reader = _get_reader(file_path)
+    total = len(reader.pages)
+    step = max(1, total / max(1, sample_size))
+    indexes = sorted({int(i * step) for i in range(min(total, sample_size))})
+    texts = [reader.pages[i].extract_text() or "" for i in indexes]
+    reader.resolved_objects.clear()
+    return find_repeated_lines([text for text in texts if text.strip()])
+
+
+def extract_page_range(file_path: str, start: int, end: int, boilerplate: Set[str]) -> List[Dict]:
+    """
+    Extract and clean pages [start, end) of a PDF on disk. Module-level so it
+    can be shipped to a process pool. The file is read lazily and parsed
+    objects are dropped after each range, so memory scales with the range
+    rather than the document.
+    """
+    reader = _get_reader(file_path)
+    raw_pages = []
+    for i in range(start, min(end, len(reader.pages))):
+        raw_text = reader.pages[i].extract_text()
+        if raw_text:
+            raw_pages.append((i+1, raw_text))
+    reader.resolved_objects.clear()
+
+    vocabulary = build_vocabulary([text for _, text in raw_pages])
+    pages = []
+    for page_number, raw_text in raw_pages:
+        cleaned_text = clean_page_text(raw_text, boilerplate, vocabulary)
+        if cleaned_text.strip():
+            pages.append({"page_number": page_number, "text": cleaned_text})
+    return pages
+
+
+def write_page_subset(file_path: str, first: int, last: int, out_path: str) -> int:
+    """
+    Write pages first..last (1-based, inclusive) of a PDF on disk as a new
+    PDF at out_path and return the document's page count. Module-level for
+    the process pool; reuses the per-process reader, so repeated pages of
+    one manual do not re-parse its page tree.
+    """
+    reader = _get_reader(file_path)
+    total = len(reader.pages)
+    if first < 1 or last > total:
+        raise ValueError(f"Pages {first}-{last} out of range; the document has {total} pages")
+    writer = PyPDF2.PdfWriter()
+    for i in range(first - 1, last):
+        writer.add_page(reader.pages[i])
+    with open(out_path, "wb") as f:
+        writer.write(f)
+    reader.resolved_objects.clear()
+    return total
+
+
+def warm_worker() -> int:
+    """No-op task; running it makes a pool worker import this module ahead of real work."""
+    return os.getpid()
 
 
 class PDFProcessor:
     def __init__(self, chunk_size: int = 800, chunk_overlap: int = 100):
-        # Optimized for technical manuals
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", ". ", "! ", "? ", "; ", ", ", " "],
-            is_separator_regex=False
-        )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self._text_splitter = None
+
+    @property
+    def text_splitter(self):
+        # Built on first use: importing langchain is a large share of startup time
+        if self._text_splitter is None:
+            from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+            # Optimized for technical manuals
+            self._text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap,
+                length_function=len,
+                separators=["\n\n", "\n", ". ", "! ", "? ", "; ", ", ", " "],
+                is_separator_regex=False
+            )
+        return self._text_splitter
     
+    async def warm_up(self, parallelism: int = settings.PDF_EXTRACT_PARALLELISM) -> int:
+        """Build the splitter and spawn the PDF worker processes; returns the worker count."""
+        self.text_splitter
+        pids = await asyncio.gather(*(run_in_process(warm_worker) for _ in range(max(1, parallelism))))
+        return len(set(pids))
+
     def extract_text_with_pages(self, pdf_bytes: bytes) -> List[Dict]:
-        pdf_reader = PyPDF2.PdfReader(BytesIO(pdf_bytes))
-        pages = []
-        
-        for i, page in enumerate(pdf_reader.pages):
-            raw_text = page.extract_text()
-            if not raw_text:
-                continue
-                
-            # CRITICAL: Clean text before processing
-            cleaned_text = clean_pdf_text(raw_text)
-            
-            if cleaned_text.strip():  # Skip empty pages
-                pages.append({
-                    "page_number": i+1,
-                    "text": cleaned_text
-                })
-        return pages
+        return extract_text_with_pages(pdf_bytes)
+
+    async def extract_text_with_pages_async(self, pdf_bytes: bytes) -> List[Dict]:
+        """Parse in the process pool so large PDFs do not stall the event loop."""
+        return await run_in_process(extract_text_with_pages, pdf_bytes)
+
+    async def iter_pages_async(
+        self,
+        file_path: str,
+        range_size: int = settings.PDF_PAGE_RANGE_SIZE,
+        parallelism: int = settings.PDF_EXTRACT_PARALLELISM,
+    ) -> AsyncIterator[List[Dict]]:
+        """
+        Yield cleaned pages range by range, in page order, while up to
+        `parallelism` later ranges are parsed in the process pool. Callers
+        can split and embed early pages while later ones are still parsing.
+        """
+        total = await run_in_process(count_pages, file_path)
+        boilerplate = await run_in_process(sample_boilerplate, file_path)
+        starts = iter(range(0, total, max(1, range_size)))
+        pending: List[asyncio.Future] = []
+
+        def schedule_next() -> None:
+            start = next(starts, None)
+            if start is not None:
+                pending.append(asyncio.ensure_future(
+                    run_in_process(extract_page_range, file_path, start, start + range_size, boilerplate)
+                ))
+
+        for _ in range(max(1, parallelism)):
+            schedule_next()
+        try:
+            while pending:
+                pages = await pending.pop(0)
+                schedule_next()
+                yield pages
+        finally:
+            for future in pending:
+                future.cancel()
     
     def split_pages(self, pages: List[Dict], metadata: Optional[Dict] = None) -> List[Dict]:
-        """Split pages into chunks and ensure metadata is always a dict."""
+        """
+        Split pages into chunks and ensure metadata is always a dict.
+        chunk_index counts chunks across the whole page (not per paragraph),
+        so together with the page number it identifies a chunk's position.
+        """
         metadata = metadata or {}
         chunks = []
         for page in pages:
+            page_chunks = []
             # Split by paragraphs first
             paragraphs = [p.strip() for p in page["text"].split('\n\n') if p.strip()]
             
@@ -49,17 +204,19 @@ class PDFProcessor:
                     
                 # Further split long paragraphs
                 para_chunks = self.text_splitter.split_text(para)
-                for idx, chunk in enumerate(para_chunks):
+                for chunk in para_chunks:
                     if len(chunk) < 30:  # Skip tiny fragments
                         continue
-                        
-                    chunks.append({
-                        "content": chunk.strip(),
-                        "metadata": {
-                            **metadata,
-                            "page_number": page["page_number"],
-                            "chunk_index": idx,
-                            "total_chunks": len(para_chunks)
-                        }
-                    })
-        return chunks
\ No newline at end of file
+                    page_chunks.append(chunk.strip())
+
+            for idx, chunk in enumerate(page_chunks):
+                chunks.append({
+                    "content": chunk,
+                    "metadata": {
+                        **metadata,
+                        "page_number": page["page_number"],
+                        "chunk_index": idx,
+                        "total_chunks": len(page_chunks)
+                    }
+                })
+        return chunks
@@ -0,0 +1,253 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+_SCAN_BLOCK = 65536
+
+
+def truncate_embeddings(vectors: List[List[float]], dimensions: int = settings.EMBEDDING_DIMENSIONS) -> List[List[float]]:
+    """
+    Matryoshka truncation: keep the leading `dimensions` components and
+    re-normalize to unit length. 0 (or a width at least the vector's) keeps
+    vectors as they are.
+    """
+    if len(vectors) == 0 or dimensions <= 0 or dimensions >= len(vectors[0]):
+        return vectors
+    array = np.asarray(vectors, dtype=np.float32)[:, :dimensions]
+    norms = np.linalg.norm(array, axis=1, keepdims=True)
+    return (array / np.where(norms == 0, 1.0, norms)).tolist()
+
+
+def quantize(vectors: np.ndarray, quantization: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encode float vectors as (codes, scales). int8 uses symmetric per-vector
+    scaling (x ~ code * scale); float16 codes carry a scale of 1.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if quantization == "float16":
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+    peaks = np.abs(vectors).max(axis=1)
+    scales = np.where(peaks == 0, 1.0, peaks / 127.0).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+class QuantizedVectorStore:
+    """
+    Compact on-disk copy of the collection's embeddings for the dense search
+    path, searched by brute force before a float re-scoring pass.
+    - Codes (int8 or float16) and per-vector scales live in .npy memmaps that
+      grow by doubling; only the pages a scan touches are resident
+    - Row <-> chunk id mapping lives in SQLite; deleted rows are reused
+    - Chroma stays the source of truth: this store is rebuilt from it when
+      their counts drift (see VectorService.sync_quantized_store)
+    """
+
+    _instance = None
+
+    def __init__(
+        self,
+        path: str = settings.QUANTIZED_STORE_PATH,
+        quantization: str = settings.VECTOR_QUANTIZATION,
+    ):
+        if quantization not in ("float16", "int8"):
+            raise ValueError(f"Unsupported VECTOR_QUANTIZATION for the quantized store: {quantization}")
+        self.path = path
+        self.quantization = quantization
+        self.dtype = np.float16 if quantization == "float16" else np.int8
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(path, "rows.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS rows (
+                row INTEGER PRIMARY KEY,
+                chunk_id TEXT NOT NULL UNIQUE
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+        self._load()
+
+    @classmethod
+    def get_instance(cls) -> "QuantizedVectorStore":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.{self.quantization}.npy")
+
+    def _load(self) -> None:
+        meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        self.dimensions = int(meta.get("dimensions", 0))
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._codes = self._scales = None
+        if self.dimensions and os.path.exists(self._file("codes")):
+            self._codes = np.load(self._file("codes"), mmap_mode="r+")
+            self._scales = np.load(self._file("scales"), mmap_mode="r+")
+            self._ids = [None] * len(self._codes)
+            for row, chunk_id in self._conn.execute("SELECT row, chunk_id FROM rows"):
+                if row < len(self._ids):
+                    self._ids[row] = chunk_id
+                    self._rows[chunk_id] = row
+        self._live = np.array([chunk_id is not None for chunk_id in self._ids], dtype=bool)
+        self._free = [row for row, chunk_id in enumerate(self._ids) if chunk_id is None]
+        self._size = max(self._rows.values(), default=-1) + 1
+
+    def _allocate(self, capacity: int) -> None:
+        """(Re)create the memmaps with room for `capacity` rows, keeping existing rows."""
+        codes = np.lib.format.open_memmap(
+            self._file("codes") + ".tmp", mode="w+", dtype=self.dtype, shape=(capacity, self.dimensions)
+        )
+        scales = np.lib.format.open_memmap(self._file("scales") + ".tmp", mode="w+", dtype=np.float32, shape=(capacity,))
+        if self._codes is not None:
+            codes[:len(self._codes)] = self._codes
+            scales[:len(self._scales)] = self._scales
+        codes.flush()
+        scales.flush()
+        del codes, scales
+        self._codes = self._scales = None
+        os.replace(self._file("codes") + ".tmp", self._file("codes"))
+        os.replace(self._file("scales") + ".tmp", self._file("scales"))
+        self._codes = np.load(self._file("codes"), mmap_mode="r+")
+        self._scales = np.load(self._file("scales"), mmap_mode="r+")
+        self._free.extend(range(len(self._ids), capacity))
+        self._free.sort(reverse=True)
+        self._ids.extend([None] * (capacity - len(self._ids)))
+        self._live = np.concatenate([self._live, np.zeros(capacity - len(self._live), dtype=bool)])
+
+    def count(self) -> int:
+        return len(self._rows)
+
+    def add(self, ids: List[str], embeddings: List[List[float]]) -> None:
+        """Insert or overwrite the vectors of `ids`."""
+        if not ids:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        codes, scales = quantize(vectors, self.quantization)
+        with self._lock:
+            if not self.dimensions:
+                self.dimensions = vectors.shape[1]
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('dimensions', ?)", (str(self.dimensions),)
+                )
+            elif vectors.shape[1] != self.dimensions:
+                raise ValueError(
+                    f"Embedding width {vectors.shape[1]} does not match the quantized store ({self.dimensions})"
+                )
+            new = sum(1 for chunk_id in dict.fromkeys(ids) if chunk_id not in self._rows)
+            if new > len(self._free):
+                self._allocate(max(1024, 2 * len(self._ids), len(self._ids) - len(self._free) + new))
+
+            self._free.sort(reverse=True)
+            rows = []
+            for chunk_id in ids:
+                row = self._rows.get(chunk_id)
+                if row is None:
+                    row = self._free.pop()
+                    self._rows[chunk_id] = row
+                    self._ids[row] = chunk_id
+                rows.append(row)
+            self._codes[rows] = codes
+            self._scales[rows] = scales
+            self._live[rows] = True
+            self._size = max(self._size, max(rows) + 1)
+            self._codes.flush()
+            self._scales.flush()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rows (row, chunk_id) VALUES (?, ?)",
+                [(row, chunk_id) for chunk_id, row in zip(ids, rows)],
+            )
+            self._conn.commit()
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            rows = [self._rows.pop(chunk_id) for chunk_id in ids if chunk_id in self._rows]
+            if not rows:
+                return
+            for row in rows:
+                self._ids[row] = None
+            self._live[rows] = False
+            self._free.extend(rows)
+            for start in range(0, len(rows), 500):
+                part = rows[start:start + 500]
+                self._conn.execute(f"DELETE FROM rows WHERE row IN ({','.join('?' * len(part))})", part)
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM rows")
+            self._conn.execute("DELETE FROM meta")
+            self._conn.commit()
+            self._codes = self._scales = None
+            for name in ("codes", "scales"):
+                if os.path.exists(self._file(name)):
+                    os.remove(self._file(name))
+            self._load()
+
+    def search(self, query: List[float], top_k: int, ids: Iterable[str] = None) -> List[Tuple[str, float]]:
+        return self.search_many([query], top_k, ids)[0]
+
+    def search_many(
+        self, queries: List[List[float]], top_k: int, ids: Iterable[str] = None
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Approximate (chunk_id, cosine similarity) pairs per query, best first,
+        from one blockwise scan of the quantized codes for the whole batch.
+        Stored vectors are unit length, so the dot product with the
+        normalized query is the cosine. With `ids`, only those rows are
+        scanned (a scoped query touches just its documents' vectors).
+        """
+        with self._lock:
+            if not self._rows or top_k <= 0:
+                return [[] for _ in queries]
+            q = np.asarray(queries, dtype=np.float32).reshape(len(queries), -1)
+            if q.shape[1] != self.dimensions:
+                raise ValueError(f"Query width {q.shape[1]} does not match the quantized store ({self.dimensions})")
+            norms = np.linalg.norm(q, axis=1, keepdims=True)
+            q = q / np.where(norms == 0, 1.0, norms)
+            if ids is None:
+                rows = np.flatnonzero(self._live[:self._size])
+            else:
+                rows = np.sort(np.fromiter((self._rows[i] for i in ids if i in self._rows), dtype=np.int64))
+            if not len(rows):
+                return [[] for _ in queries]
+            scores = np.empty((len(q), len(rows)), dtype=np.float32)
+            for start in range(0, len(rows), _SCAN_BLOCK):
+                part = rows[start:start + _SCAN_BLOCK]
+                if ids is None and part[-1] - part[0] == len(part) - 1:
+                    # Contiguous live rows: plain slices keep the memmap reads sequential
+                    codes, scales = self._codes[part[0]:part[-1] + 1], self._scales[part[0]:part[-1] + 1]
+                else:
+                    codes, scales = self._codes[part], self._scales[part]
+                scores[:, start:start + len(part)] = q @ (codes.astype(np.float32) * scales[:, None]).T
+            k = min(top_k, len(rows))
+            best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            found = []
+            for query_scores, picked in zip(scores, best):
+                picked = picked[np.argsort(-query_scores[picked])]
+                found.append([(self._ids[rows[i]], float(query_scores[i])) for i in picked])
+            return found
+
+    def stats(self) -> dict:
+        with self._lock:
+            resident = 0 if self._codes is None else self._codes[:self._size].nbytes + self._scales[:self._size].nbytes
+            return {
+                "quantization": self.quantization,
+                "dimensions": self.dimensions,
+                "vectors": len(self._rows),
+                "bytes": int(resident),
+                "float32_bytes": len(self._rows) * self.dimensions * 4,
+            }
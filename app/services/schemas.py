@@ -1,32 +1,91 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Union
 
 class UploadResponse(BaseModel):
     document_id: Optional[str]
     filename: str
     chunks_created: int
 
+class IngestionJobResponse(BaseModel):
+    job_id: str
+    filename: str
+    status: str
+    pages_parsed: int = 0
+    chunks_total: int = 0
+    chunks_embedded: int = 0
+    chunks_written: int = 0
+    mode: str = "full"
+    chunks_added: int = 0
+    chunks_removed: int = 0
+    chunks_unchanged: int = 0
+    document_id: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+
+class DocumentInfo(BaseModel):
+    filename: str
+    source: str
+    file_hash: Optional[str] = None
+    size_bytes: int = 0
+    page_count: int = 0
+    chunk_count: int = 0
+    ingested_at: float
+    updated_at: float
+
 class DeleteResponse(BaseModel):
     success: bool
     message: str
 
+class BackfillResponse(BaseModel):
+    updated: int
+    skipped: int
+
 class DocumentMetadata(BaseModel):
     source: str
     filename: str
     page_number: Optional[int]
     chunk_index: Optional[int]
     file_path: Optional[str]
+    cleaned_text: Optional[str] = None
+
+class PageReference(BaseModel):
+    filename: str
+    page_number: Optional[int]
+    pdf_link: str
 
 class QueryResultItem(BaseModel):
     content: str
     page_number: int
     pdf_link: str
     filename: str
+    references: List[PageReference] = []  # other pages repeating this chunk
 
 class QueryResponse(BaseModel):
     results: List[QueryResultItem]
     answer: str = None  # Add AI-generated answer field
 
+class QueryFilters(BaseModel):
+    filenames: Optional[List[str]] = None  # as listed by /documents
+    page_from: Optional[int] = None  # inclusive
+    page_to: Optional[int] = None  # inclusive
+    ingested_after: Optional[float] = None  # unix time, matched against DocumentInfo.ingested_at
+    ingested_before: Optional[float] = None
+
 class QueryRequest(BaseModel):
     question: str
-    top_k: int = 5
\ No newline at end of file
+    top_k: int = 5
+    filters: Optional[QueryFilters] = None
+
+class BatchQuestion(BaseModel):
+    question: str
+    top_k: Optional[int] = None  # defaults to the batch top_k
+    threshold: Optional[float] = None  # minimum similarity, 0..1; defaults to the server threshold
+
+class BatchQueryRequest(BaseModel):
+    questions: List[Union[str, BatchQuestion]]
+    top_k: int = 5
+    filters: Optional[QueryFilters] = None  # applied to every question
+
+class BatchQueryResponse(BaseModel):
+    responses: List[QueryResponse]  # one per question, in request order
\ No newline at end of file
@@ -0,0 +1,532 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.core.config import settings, logger
+
+SNAPSHOT_FORMAT = "pdf-search-snapshot"
+SNAPSHOT_FORMAT_VERSION = 1
+# Fixed room for the .npy header, so rows can be streamed before their count is known
+_NPY_HEADER_BYTES = 128
+_SCAN_BLOCK = 65536
+_READ_ONLY_METHODS = ("add", "upsert", "update", "delete", "modify")
+
+
+class ReadOnlyStoreError(RuntimeError):
+    """A write reached a read-only replica."""
+
+
+class StringColumnWriter:
+    """
+    Column of strings as one UTF-8 blob (`<name>.bin`) plus int64 row offsets
+    (`<name>.offsets.npy`), appended batch by batch.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._blob = open(f"{path}.bin", "wb")
+        self._offsets = array("q", [0])
+
+    def append(self, values: Iterable[str]) -> None:
+        for value in values:
+            encoded = value.encode()
+            self._blob.write(encoded)
+            self._offsets.append(self._offsets[-1] + len(encoded))
+
+    def close(self) -> None:
+        self._blob.close()
+        np.save(f"{self.path}.offsets.npy", np.frombuffer(self._offsets, dtype=np.int64))
+
+
+class StringColumn:
+    """Memory-mapped reader for a StringColumnWriter column; rows are decoded on access."""
+
+    def __init__(self, path: str):
+        self.offsets = np.load(f"{path}.offsets.npy", mmap_mode="r")
+        size = os.path.getsize(f"{path}.bin")
+        self.blob = np.memmap(f"{path}.bin", dtype=np.uint8, mode="r") if size else np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        return self.blob[self.offsets[row]:self.offsets[row + 1]].tobytes().decode()
+
+    def take(self, rows: Iterable[int]) -> List[str]:
+        return [self[row] for row in rows]
+
+    def slice(self, start: int, end: int) -> List[str]:
+        """Rows start..end-1, decoded from one contiguous read."""
+        bounds = np.asarray(self.offsets[start:end + 1]) - self.offsets[start]
+        data = self.blob[self.offsets[start]:self.offsets[end]].tobytes()
+        return [data[a:b].decode() for a, b in zip(bounds[:-1].tolist(), bounds[1:].tolist())]
+
+
+class VectorWriter:
+    """Streams float32 rows into a .npy file, writing its header once the row count is known."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.seek(_NPY_HEADER_BYTES)
+        self.rows = 0
+        self.dimensions = None
+
+    def append(self, vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype="<f4")
+        if self.dimensions is None:
+            self.dimensions = vectors.shape[1]
+        elif vectors.shape[1] != self.dimensions:
+            raise ValueError(f"Mixed embedding widths in snapshot: {vectors.shape[1]} vs {self.dimensions}")
+        self._file.write(vectors.tobytes())
+        self.rows += len(vectors)
+
+    def close(self) -> None:
+        self._file.seek(0)
+        header = {"descr": "<f4", "fortran_order": False, "shape": (self.rows, self.dimensions or 0)}
+        np.lib.format.write_array_header_1_0(self._file, header)
+        # numpy pads (N, D) float32 headers to one 64-byte-aligned block of this size
+        if self._file.tell() != _NPY_HEADER_BYTES:
+            raise ValueError("Snapshot vector header does not fit its reserved space")
+        self._file.close()
+
+
+def write_snapshot(collection, path: str, batch_size: int = 1000, dedup_index=None, **manifest_fields) -> Dict:
+    """
+    Write every row of a Chroma collection to the snapshot directory `path`:
+    - vectors.npy: float32 embeddings, one row per chunk, memory-mappable
+    - norms.npy: their L2 norms, so cosine search needs no second pass
+    - ids / documents / metadatas: string columns (UTF-8 blob + offsets),
+      metadata as JSON
+    - with a `dedup_index`, its signatures and duplicate references for the
+      exported rows (see _write_dedup), restored by load_dedup
+    - manifest.json: format version, row count, width and `manifest_fields`
+    The id list is taken up front and rows are then fetched by id, so a
+    snapshot taken during ingestion holds the rows present when it started,
+    less any deleted meanwhile; no row is skipped because others moved.
+    """
+    os.makedirs(path, exist_ok=True)
+    vectors = VectorWriter(os.path.join(path, "vectors.npy"))
+    columns = {name: StringColumnWriter(os.path.join(path, name)) for name in ("ids", "documents", "metadatas")}
+    norms: List[np.ndarray] = []
+    exported = set()
+    start = time.perf_counter()
+    all_ids = collection.get(include=[])["ids"]
+    for offset in range(0, len(all_ids), batch_size):
+        batch = collection.get(
+            ids=all_ids[offset:offset + batch_size], include=["documents", "metadatas", "embeddings"]
+        )
+        ids = batch.get("ids", [])
+        if not ids:
+            continue
+        embeddings = np.asarray(batch["embeddings"], dtype=np.float32)
+        vectors.append(embeddings)
+        norms.append(np.linalg.norm(embeddings, axis=1))
+        columns["ids"].append(ids)
+        exported.update(ids)
+        columns["documents"].append(document or "" for document in batch["documents"])
+        columns["metadatas"].append(json.dumps(metadata or {}) for metadata in batch["metadatas"])
+    vectors.close()
+    for column in columns.values():
+        column.close()
+    np.save(os.path.join(path, "norms.npy"), np.concatenate(norms) if norms else np.zeros(0, dtype=np.float32))
+    if dedup_index is not None:
+        manifest_fields["dedup"] = _write_dedup(dedup_index, exported, path)
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "count": vectors.rows,
+        "dimensions": vectors.dimensions or 0,
+        "dtype": "float32",
+        "created_at": time.time(),
+        "seconds": round(time.perf_counter() - start, 3),
+        **manifest_fields,
+        "files": _file_digests(path),
+    }
+    with open(os.path.join(path, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _write_dedup(dedup_index, exported: set, path: str) -> Dict:
+    """
+    Near-duplicate state of the exported rows: MinHash signatures of
+    canonical chunks (signatures.npy plus signature_ids / signature_numbers
+    columns) and the references folded into them (duplicate_refs column,
+    one JSON row each). Returns the manifest's "dedup" entry.
+    """
+    signatures, references = dedup_index.export()
+    signatures = [row for row in signatures if row[0] in exported]
+    references = [row for row in references if row[1] in exported]
+    width = len(signatures[0][1]) if signatures else 0
+    np.save(
+        os.path.join(path, "signatures.npy"),
+        np.asarray([row[1] for row in signatures], dtype=np.uint32).reshape(len(signatures), width),
+    )
+    for name, values in (
+        ("signature_ids", (row[0] for row in signatures)),
+        ("signature_numbers", (row[2] for row in signatures)),
+        ("duplicate_refs", (json.dumps(list(row)) for row in references)),
+    ):
+        column = StringColumnWriter(os.path.join(path, name))
+        column.append(values)
+        column.close()
+    return {"signatures": len(signatures), "duplicate_refs": len(references), "num_perm": width}
+
+
+def load_dedup(snapshot: "SnapshotCollection", dedup_index, batch_size: int = 5000) -> Dict:
+    """
+    Restore the near-duplicate state a snapshot carries into `dedup_index`.
+    Signatures are skipped (with a warning) if they were computed with a
+    different DEDUP_NUM_PERM; references are restored either way.
+    """
+    dedup = snapshot.manifest.get("dedup")
+    restored = {"signatures": 0, "duplicate_refs": 0}
+    if not dedup:
+        return restored
+    if dedup["signatures"] and dedup["num_perm"] != dedup_index.hasher.num_perm:
+        logger.warning(
+            "Snapshot signatures use %d permutations but DEDUP_NUM_PERM=%d; new chunks will not fold into imported ones",
+            dedup["num_perm"], dedup_index.hasher.num_perm,
+        )
+    elif dedup["signatures"]:
+        signatures = np.load(os.path.join(snapshot.path, "signatures.npy"), mmap_mode="r")
+        ids = StringColumn(os.path.join(snapshot.path, "signature_ids"))
+        numbers = StringColumn(os.path.join(snapshot.path, "signature_numbers"))
+        for start in range(0, len(ids), batch_size):
+            end = min(start + batch_size, len(ids))
+            dedup_index.add_signatures(
+                list(zip(ids.slice(start, end), np.asarray(signatures[start:end]), numbers.slice(start, end)))
+            )
+        restored["signatures"] = len(ids)
+    references = StringColumn(os.path.join(snapshot.path, "duplicate_refs"))
+    for start in range(0, len(references), batch_size):
+        end = min(start + batch_size, len(references))
+        dedup_index.add_references([tuple(json.loads(row)) for row in references.slice(start, end)])
+    restored["duplicate_refs"] = len(references)
+    return restored
+
+
+def _file_digests(path: str) -> Dict[str, Dict]:
+    """Size and SHA-256 of every data file, recorded in the manifest for verify_snapshot."""
+    digests = {}
+    for name in sorted(os.listdir(path)):
+        if name == "manifest.json":
+            continue
+        digest = hashlib.sha256()
+        with open(os.path.join(path, name), "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        digests[name] = {"bytes": os.path.getsize(os.path.join(path, name)), "sha256": digest.hexdigest()}
+    return digests
+
+
+def verify_snapshot(path: str) -> Dict:
+    """Check every data file against the manifest; raises ValueError on a missing or altered file."""
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    expected = manifest.get("files") or {}
+    actual = _file_digests(path)
+    for name, entry in expected.items():
+        if actual.get(name) != entry:
+            raise ValueError(f"Snapshot file {name} is missing or does not match its manifest checksum")
+    return manifest
+
+
+def load_snapshot(
+    snapshot: "SnapshotCollection",
+    collection,
+    batch_size: int = 5000,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    """
+    Bulk-load a snapshot into a Chroma collection, stored vectors included,
+    so nothing is re-embedded. Rows are upserted in large batches; the next
+    batch is decoded from the memory-mapped files while Chroma indexes the
+    current one.
+    """
+    total = snapshot.count()
+
+    def read(start: int) -> Dict:
+        end = min(start + batch_size, total)
+        return {
+            "ids": snapshot.ids.slice(start, end),
+            "embeddings": np.asarray(snapshot.vectors[start:end]),
+            "documents": snapshot.documents.slice(start, end),
+            # Chroma rejects empty metadata dicts
+            "metadatas": [json.loads(m) or None for m in snapshot.metadatas.slice(start, end)],
+        }
+
+    loaded = 0
+    with ThreadPoolExecutor(max_workers=1) as reader:
+        pending = reader.submit(read, 0) if total else None
+        while pending is not None:
+            batch = pending.result()
+            start = loaded + len(batch["ids"])
+            pending = reader.submit(read, start) if start < total else None
+            collection.upsert(**batch)
+            loaded = start
+            if progress:
+                progress(loaded, total)
+    return loaded
+
+
+class SnapshotCollection:
+    """
+    Read-only, Chroma-compatible view (count / get / query) of a snapshot.
+    Vectors and string columns are memory-mapped, so every process serving
+    the same snapshot shares one copy in the page cache. Search is an exact
+    blockwise cosine scan.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"{path} is not a {SNAPSHOT_FORMAT}")
+        if self.manifest.get("format_version", 0) > SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Snapshot format {self.manifest['format_version']} is newer than this build supports")
+        self.path = path
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.norms = np.load(os.path.join(path, "norms.npy"))
+        self.ids = StringColumn(os.path.join(path, "ids"))
+        self.documents = StringColumn(os.path.join(path, "documents"))
+        self.metadatas = StringColumn(os.path.join(path, "metadatas"))
+        self._rows: Optional[Dict[str, int]] = None
+        self._partitions: Optional[Dict[str, np.ndarray]] = None
+        self._pages: Optional[np.ndarray] = None
+
+    def _row_index(self) -> Dict[str, int]:
+        if self._rows is None:
+            self._rows = {self.ids[row]: row for row in range(len(self.ids))}
+        return self._rows
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def _read(column: StringColumn, rows: Iterable[int]) -> List[str]:
+        if isinstance(rows, range) and len(rows):
+            return column.slice(rows.start, rows.stop)
+        return column.take(rows)
+
+    def _rows_result(self, rows: Iterable[int], include) -> Dict:
+        result = {"ids": self._read(self.ids, rows)}
+        if "documents" in include:
+            result["documents"] = self._read(self.documents, rows)
+        if "metadatas" in include:
+            result["metadatas"] = [json.loads(m) for m in self._read(self.metadatas, rows)]
+        if "embeddings" in include:
+            result["embeddings"] = [np.array(self.vectors[row]) for row in rows]
+        return result
+
+    def get(self, ids: List[str] = None, include=("documents", "metadatas"), limit: int = None, offset: int = 0, **_):
+        if ids is not None:
+            index = self._row_index()
+            rows = [index[chunk_id] for chunk_id in ids if chunk_id in index]
+        else:
+            end = self.count() if limit is None else min(self.count(), (offset or 0) + limit)
+            rows = range(offset or 0, end)
+        return self._rows_result(rows, include)
+
+    def _load_partitions(self) -> None:
+        """Row lists per filename and a page-number column, built on the first scoped query."""
+        if self._partitions is not None:
+            return
+        partitions: Dict[str, List[int]] = {}
+        pages = np.full(self.count(), np.nan)
+        for row, raw in enumerate(self.metadatas.slice(0, self.count()) if self.count() else []):
+            metadata = json.loads(raw)
+            partitions.setdefault(metadata.get("filename"), []).append(row)
+            if metadata.get("page_number") is not None:
+                pages[row] = metadata["page_number"]
+        self._pages = pages
+        self._partitions = {name: np.asarray(rows, dtype=np.int64) for name, rows in partitions.items()}
+
+    def _where_mask(self, where: Dict) -> np.ndarray:
+        """
+        Rows matching a Chroma `where` clause over filename and page_number
+        ($and / $or, $eq / $ne / $in / $nin, and range operators). Filename
+        conditions are answered from the per-document partitions.
+        """
+        mask = np.ones(self.count(), dtype=bool)
+        for key, condition in where.items():
+            if key in ("$and", "$or"):
+                parts = [self._where_mask(part) for part in condition]
+                mask &= np.logical_and.reduce(parts) if key == "$and" else np.logical_or.reduce(parts)
+                continue
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, value in condition.items():
+                if key == "filename":
+                    if op not in ("$eq", "$in", "$ne", "$nin"):
+                        raise ValueError(f"Unsupported filename filter {op}")
+                    hit = np.zeros(self.count(), dtype=bool)
+                    for name in (value if op in ("$in", "$nin") else [value]):
+                        hit[self._partitions.get(name, np.zeros(0, dtype=np.int64))] = True
+                    mask &= ~hit if op in ("$ne", "$nin") else hit
+                elif key == "page_number":
+                    pages = self._pages
+                    compare = {
+                        "$eq": pages == value, "$ne": pages != value,
+                        "$gt": pages > value, "$gte": pages >= value, "$lt": pages < value, "$lte": pages <= value,
+                        "$in": np.isin(pages, value), "$nin": ~np.isin(pages, value),
+                    }
+                    if op not in compare:
+                        raise ValueError(f"Unsupported page_number filter {op}")
+                    mask &= compare[op]
+                else:
+                    raise ValueError(f"Snapshots filter on filename and page_number only, not {key}")
+        return mask
+
+    def query(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 10,
+        include=("documents", "metadatas", "distances"),
+        where: Dict = None,
+        **_,
+    ):
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        results = {key: [] for key in ["ids", *include]}
+        if where:
+            self._load_partitions()
+            candidates = np.flatnonzero(self._where_mask(where))
+        else:
+            candidates = None
+        total = self.count() if candidates is None else len(candidates)
+        if total == 0:
+            for key in results:
+                results[key] = [[] for _ in queries]
+            return results
+        query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(query_norms == 0, 1.0, query_norms)
+        similarity = np.empty((len(queries), total), dtype=np.float32)
+        for start in range(0, total, _SCAN_BLOCK):
+            end = min(start + _SCAN_BLOCK, total)
+            if candidates is None:
+                vectors, norms = self.vectors[start:end], self.norms[start:end]
+            else:
+                # Only the in-scope rows are read from the memory map
+                vectors, norms = self.vectors[candidates[start:end]], self.norms[candidates[start:end]]
+            similarity[:, start:end] = (queries @ vectors.T) / np.where(norms == 0, 1.0, norms)
+        k = min(n_results, total)
+        best = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        for scores, picked in zip(similarity, best):
+            picked = picked[np.argsort(-scores[picked])]
+            rows = picked.tolist() if candidates is None else candidates[picked].tolist()
+            found = self._rows_result(rows, include)
+            for key, values in found.items():
+                results[key].append(values)
+            if "distances" in include:
+                results["distances"].append([float(1.0 - scores[i]) for i in picked])
+        return results
+
+    def __getattr__(self, name: str):
+        if name in _READ_ONLY_METHODS:
+            raise ReadOnlyStoreError("Snapshots are read-only")
+        raise AttributeError(name)
+
+
+def current_snapshot(snapshot_dir: str = settings.SNAPSHOT_DIR) -> Optional[str]:
+    """Directory of the published snapshot CURRENT points at, if any."""
+    try:
+        with open(os.path.join(snapshot_dir, "CURRENT")) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(snapshot_dir, "versions", name) if name else None
+
+
+def publish_snapshot(
+    collection,
+    snapshot_dir: str = settings.SNAPSHOT_DIR,
+    keep: int = settings.SNAPSHOT_KEEP,
+    batch_size: int = 1000,
+    **manifest_fields,
+) -> Dict:
+    """
+    Write a new snapshot version next to the old ones, then atomically point
+    CURRENT at it. Replicas reload on their next sync; the oldest versions
+    beyond `keep` are removed (replicas still reading one keep their mapping).
+    """
+    versions = os.path.join(snapshot_dir, "versions")
+    os.makedirs(versions, exist_ok=True)
+    name = time.strftime("%Y%m%dT%H%M%S", time.gmtime()) + f"-{time.time_ns() % 1_000_000_000:09d}"
+    staging = os.path.join(versions, f".{name}.tmp")
+    manifest = write_snapshot(collection, staging, batch_size, version=name, **manifest_fields)
+    os.replace(staging, os.path.join(versions, name))
+
+    pointer = os.path.join(snapshot_dir, f".CURRENT.{os.getpid()}.tmp")
+    with open(pointer, "w") as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(snapshot_dir, "CURRENT"))
+
+    published = sorted(entry for entry in os.listdir(versions) if not entry.startswith("."))
+    for old in published[:-max(1, keep)]:
+        shutil.rmtree(os.path.join(versions, old), ignore_errors=True)
+    logger.info("Published snapshot %s (%d chunks)", name, manifest["count"])
+    return manifest
+
+
+class ReplicaCollection:
+    """
+    Collection for STORE_MODE=replica: serves reads from the latest
+    published snapshot and swaps to a newer one on `reload()`. Writes raise
+    ReadOnlyStoreError; before the first publish the collection is empty.
+    """
+
+    _instance = None
+
+    def __init__(self, snapshot_dir: str = settings.SNAPSHOT_DIR):
+        self.snapshot_dir = snapshot_dir
+        self.snapshot: Optional[SnapshotCollection] = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    @classmethod
+    def get_instance(cls) -> "ReplicaCollection":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.snapshot.manifest.get("version") if self.snapshot else None
+
+    def reload(self) -> bool:
+        """Switch to the published snapshot if it changed; returns whether it did."""
+        path = current_snapshot(self.snapshot_dir)
+        with self._lock:
+            if path is None or (self.snapshot is not None and self.snapshot.path == path):
+                return False
+            self.snapshot = SnapshotCollection(path)
+        logger.info("Replica serving snapshot %s (%d chunks)", self.version, self.snapshot.count())
+        return True
+
+    def count(self) -> int:
+        return self.snapshot.count() if self.snapshot else 0
+
+    def get(self, ids: List[str] = None, include=("documents", "metadatas"), **kwargs):
+        if self.snapshot is None:
+            return {"ids": [], **{key: [] for key in include}}
+        return self.snapshot.get(ids=ids, include=include, **kwargs)
+
+    def query(self, query_embeddings: List[List[float]], n_results: int = 10, include=("documents", "metadatas", "distances"), **kwargs):
+        if self.snapshot is None:
+            return {key: [[] for _ in query_embeddings] for key in ["ids", *include]}
+        return self.snapshot.query(query_embeddings, n_results=n_results, include=include, **kwargs)
+
+    def __getattr__(self, name: str):
+        if name in _READ_ONLY_METHODS:
+            raise ReadOnlyStoreError("This replica is read-only; send writes to the writer")
+        raise AttributeError(name)
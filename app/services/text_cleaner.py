@@ -1,4 +1,8 @@
+import math
 import re
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
 
 def clean_pdf_text(text: str) -> str:
     """
@@ -25,4 +29,194 @@ def clean_pdf_text(text: str) -> str:
     
     # Step 6: Trim leading/trailing whitespace per paragraph
     paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
-    return '\n\n'.join(paragraphs)
\ No newline at end of file
+    return '\n\n'.join(paragraphs)
+
+
+# ---------------------------------------------------------------------------
+# Single-pass local repair
+#
+# clean_pdf_text above collapses single newlines before it looks for
+# "word-\nword" splits, so its hyphen step never fires. The cleaner below
+# walks each page's lines once, drops boilerplate, rejoins hyphen splits,
+# and fixes letter-spaced words and spacing with one compiled regex each.
+# ---------------------------------------------------------------------------
+
+COMMON_WORDS = (
+    "a about above after all also an and any are as at be before below between both but by can "
+    "check clean control cover do does down each every for from fuel gauge has have high how if in "
+    "inside install into is it its level low make manual may mix motor must no not note of off oil on "
+    "once only or other out over part parts point power press pressure remove replace safety screw "
+    "service set should side speed step switch system that the then there these this to top turn "
+    "under unit up use valve voltage warning when which will with without wire your"
+).split()
+
+PAGE_NUMBER_LINE = re.compile(r"^\s*(?:page\s*)?\d{1,4}(?:\s*(?:of|/)?\s*\d{1,4})?\s*$", re.IGNORECASE)
+BREADCRUMB_LINE = re.compile(r"^\s*\|?(?:[^|]{1,40}\|){2,}[^|]{0,40}$")
+LETTER_SPACED_RUN = re.compile(r"\b(?:[A-Za-z] ){2,}[A-Za-z]\b")
+LETTER_RUN_MIN_LETTERS = 4  # shorter runs ("a b c") are left alone
+SPACING = re.compile(r"[ \t]{2,}| (?=[.,!?;:])")
+WORD = re.compile(r"[a-z]{2,}")
+DIGITS = re.compile(r"\d+")
+
+
+def _line_signature(line: str) -> str:
+    """
+    Lines that differ only in a single number (e.g. page counters) share a
+    signature. Lines with several numbers are usually content (part numbers,
+    torque values), so they must repeat verbatim.
+    """
+    line = " ".join(line.lower().split())
+    if len(DIGITS.findall(line)) > 1:
+        return line
+    return DIGITS.sub("#", line)
+
+
+def find_repeated_lines(
+    pages: List[str], edge_lines: int = 3, min_ratio: float = 0.5, max_length: int = 120
+) -> Set[str]:
+    """
+    Signatures of header/footer lines: short lines near the top or bottom
+    of a page that recur on at least `min_ratio` of the document's pages.
+    """
+    if len(pages) < 3:
+        return set()
+    counts: Counter = Counter()
+    for text in pages:
+        lines = [line for line in text.splitlines() if line.strip()]
+        # Short pages: only the very first/last lines can be running heads
+        edge = min(edge_lines, max(1, len(lines) // 3))
+        edges = lines[:edge] + lines[-edge:]
+        counts.update({_line_signature(line) for line in edges if len(line.strip()) <= max_length})
+    threshold = max(2, int(len(pages) * min_ratio))
+    return {signature for signature, count in counts.items() if count >= threshold}
+
+
+def build_vocabulary(texts: List[str]) -> Dict[str, int]:
+    """Word frequencies from the document itself plus a small built-in list."""
+    vocabulary: Counter = Counter(COMMON_WORDS)
+    for text in texts:
+        vocabulary.update(WORD.findall(text.lower()))
+    return dict(vocabulary)
+
+
+def _segment(letters: str, vocabulary: Dict[str, int]) -> Optional[List[str]]:
+    """Split a run of letters into known words, preferring frequent words; None if impossible."""
+    total = sum(vocabulary.values()) or 1
+    n = len(letters)
+    best: List[Optional[Tuple[float, List[str]]]] = [None] * (n + 1)
+    best[0] = (0.0, [])
+    for end in range(1, n + 1):
+        for start in range(max(0, end - 20), end):
+            if best[start] is None:
+                continue
+            word = letters[start:end]
+            count = vocabulary.get(word)
+            if not count or (len(word) == 1 and word not in ("a", "i")):
+                continue
+            cost = best[start][0] - math.log(count / total)
+            if best[end] is None or cost < best[end][0]:
+                best[end] = (cost, best[start][1] + [word])
+    return best[n][1] if best[n] else None
+
+
+def _is_list_labels(letters: str) -> bool:
+    """"a b c d" / "A B C": consecutive alphabet letters are list labels, not a spaced-out word."""
+    lowered = letters.lower()
+    return all(ord(b) - ord(a) == 1 for a, b in zip(lowered, lowered[1:]))
+
+
+def _join_letter_run(match: re.Match, vocabulary: Dict[str, int]) -> str:
+    """Join a letter-spaced run only when it spells known words."""
+    run = match.group()
+    letters = run.replace(" ", "")
+    lowered = letters.lower()
+    if len(letters) < LETTER_RUN_MIN_LETTERS or _is_list_labels(letters):
+        return run
+    if lowered in vocabulary:
+        return letters
+    words = _segment(lowered, vocabulary)
+    if words and len(words) > 1:
+        # Re-apply the run's original casing to the segmented words
+        out, pos = [], 0
+        for word in words:
+            out.append(letters[pos:pos + len(word)])
+            pos += len(word)
+        return " ".join(out)
+    return run
+
+
+def _is_hyphen_split(current: str, next_line: str) -> bool:
+    head = current[:-1].rsplit(" ", 1)[-1]
+    tail = next_line.split(" ", 1)[0]
+    if not head.isalpha() or not tail[:1].isalpha():
+        return False
+    return tail[:1].islower() or (head.isupper() and tail.rstrip(".,;:!?").isupper())
+
+
+def clean_page_text(text: str, boilerplate: Set[str] = frozenset(), vocabulary: Optional[Dict[str, int]] = None) -> str:
+    """Repair one page in a single pass over its lines."""
+    vocabulary = vocabulary if vocabulary is not None else build_vocabulary([text])
+    paragraphs: List[str] = []
+    current = ""
+    lines = text.splitlines()
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    # Page numbers and breadcrumbs only sit on a page's first or last line;
+    # elsewhere the same shapes are table rows ("25 30", "M-123A | 240V | 15 A")
+    edges = {filled[0], filled[-1]} if filled else set()
+    for i, raw_line in enumerate(lines):
+        line = raw_line.strip()
+        if not line:
+            if current:
+                paragraphs.append(current)
+                current = ""
+            continue
+        if _line_signature(line) in boilerplate or (
+            i in edges and (PAGE_NUMBER_LINE.match(line) or BREADCRUMB_LINE.match(line))
+        ):
+            continue
+        if not current:
+            current = line
+        elif current.endswith("-") and _is_hyphen_split(current, line):
+            # "main-" + "tenance" -> "maintenance", "WARN-" + "ING" -> "WARNING"
+            current = current[:-1] + line
+        else:
+            current = f"{current} {line}"
+    if current:
+        paragraphs.append(current)
+
+    cleaned = []
+    for paragraph in paragraphs:
+        paragraph = LETTER_SPACED_RUN.sub(lambda m: _join_letter_run(m, vocabulary), paragraph)
+        paragraph = SPACING.sub(lambda m: "" if m.group() == " " else " ", paragraph)
+        cleaned.append(paragraph.strip())
+    return "\n\n".join(p for p in cleaned if p)
+
+
+def clean_document_pages(pages: List[str]) -> List[str]:
+    """Clean every page of one PDF, stripping headers/footers repeated across its pages."""
+    boilerplate = find_repeated_lines(pages)
+    vocabulary = build_vocabulary(pages)
+    return [clean_page_text(text, boilerplate, vocabulary) for text in pages]
+
+
+def dirtiness_score(text: str) -> float:
+    """
+    0..1 estimate of leftover extraction damage. Chunks scoring at or above
+    CLEAN_DIRTY_THRESHOLD still go to the LLM cleaner.
+    """
+    tokens = text.split()
+    if not tokens:
+        return 0.0
+    stray_letters = sum(1 for t in tokens if len(t) == 1 and t.isalpha() and t.lower() not in ("a", "i"))
+    mashed = sum(1 for t in tokens if len(t) > 25 and t.isalpha())
+    dangling_hyphens = sum(1 for t in tokens if len(t) > 2 and t.endswith("-") and t[-2].isalpha())
+    pipes = text.count("|")
+    odd_chars = sum(1 for ch in text if not (ch.isprintable() or ch in "\n\t"))
+    score = (
+        2 * stray_letters / len(tokens)
+        + 3 * mashed / len(tokens)
+        + 2 * dangling_hyphens / len(tokens)
+        + min(pipes, 10) * 0.02
+        + 5 * odd_chars / max(1, len(text))
+    )
+    return min(1.0, score)
@@ -1,113 +1,812 @@
+import asyncio
+import time
 import uuid
-from typing import List, Dict
+from pathlib import Path
+from typing import Awaitable, Callable, List, Dict, Optional, Tuple
+import numpy as np
 from app.core.database import get_collection
-from app.core.config import logger
+from app.core.config import settings, logger
+from app.core.coordination import StoreVersion
+from app.core.executors import run_in_thread
+from app.core.metrics import CHROMA_RESULTS, CLEANED_CHUNKS, DEDUP_CHUNKS, stage, timed
 from app.services.gemini_service import GeminiService
 from app.services.pdf_processor import PDFProcessor
 from app.services.embeddings import generate_document_id
+from app.services.embedding_cache import EmbeddingCache, text_hash
+from app.services.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from app.services.answer_cache import AnswerCache
+from app.services.dedup import NearDuplicateIndex
+from app.services.document_registry import DocumentRegistry, document_key, group_chunks
+from app.services.file_manager import safe_filename
+from app.services.quantized_store import QuantizedVectorStore, truncate_embeddings
+from app.services.text_cleaner import dirtiness_score
+
+
+def lexical_text(content: str, metadata: Optional[Dict]) -> str:
+    """Index the ingest-time cleaned text when available."""
+    return (metadata or {}).get("cleaned_text") or content or ""
+
+
+def chunk_id(metadata: Dict, content: str) -> str:
+    """Chroma id of a chunk, derived from its source, position and text."""
+    return generate_document_id(
+        metadata["source"],
+        metadata.get("page_number"),
+        metadata.get("chunk_index"),
+        content,
+    )
+
+
+def scope_where(filenames: List[str] = None, page_from: int = None, page_to: int = None) -> Optional[Dict]:
+    """Chroma `where` clause restricting a search to documents and a page range; None searches everything."""
+    conditions = []
+    if filenames is not None:
+        conditions.append({"filename": {"$in": list(filenames)}})
+    if page_from is not None:
+        conditions.append({"page_number": {"$gte": page_from}})
+    if page_to is not None:
+        conditions.append({"page_number": {"$lte": page_to}})
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def cosine_distance(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = (sum(x * x for x in a) ** 0.5) * (sum(y * y for y in b) ** 0.5)
+    return 1.0 - (dot / norm if norm else 0.0)
 
 
 class VectorService:
-    def __init__(self):
+    def __init__(self, gemini: GeminiService = None, pdf_processor: PDFProcessor = None):
         self.collection = get_collection()
-        self.gemini = GeminiService()
-        self.pdf_processor = PDFProcessor()
+        self.gemini = gemini or GeminiService()
+        self.pdf_processor = pdf_processor or PDFProcessor()
+        self.embedding_cache = EmbeddingCache.get_instance() if settings.EMBEDDING_CACHE_ENABLED else None
+        self.lexical_index = LexicalIndex.get_instance() if settings.HYBRID_SEARCH_ENABLED else None
+        self.answer_cache = AnswerCache.get_instance()
+        self.registry = DocumentRegistry.get_instance()
+        self.dedup_index = NearDuplicateIndex.get_instance() if settings.DEDUP_ENABLED else None
+        self.vector_store = None
+        if settings.VECTOR_QUANTIZATION != "none":
+            if settings.STORE_MODE == "embedded":
+                self.vector_store = QuantizedVectorStore.get_instance()
+            else:
+                # Its memmaps are per process and would go stale under another writer
+                logger.warning("VECTOR_QUANTIZATION is only used with STORE_MODE=embedded; ignoring it")
+        self.store_version = StoreVersion.get_instance()
+        self._synced_stamp = self._store_stamp()
+        self._synced_at = time.monotonic()
+
+    def _store_stamp(self) -> tuple:
+        replica_version = getattr(self.collection, "version", None) if settings.STORE_MODE == "replica" else None
+        return self.store_version.read(), replica_version
+
+    def _mark_written(self) -> None:
+        """Drop cached answers here and tell other processes the corpus changed."""
+        self.answer_cache.invalidate()
+        self.store_version.bump()
+        self._synced_stamp = self._store_stamp()
+
+    async def sync_with_writer(self, force: bool = False) -> bool:
+        """
+        Pick up writes made by other processes (STORE_MODE server/replica):
+        at most every STORE_SYNC_INTERVAL_SECONDS, swap to a newly published
+        snapshot, reload BM25 statistics and drop cached answers when the
+        shared store version moved. Returns whether anything changed.
+        """
+        if settings.STORE_MODE == "embedded":
+            return False
+        now = time.monotonic()
+        if not force and now - self._synced_at < settings.STORE_SYNC_INTERVAL_SECONDS:
+            return False
+        self._synced_at = now
+        if settings.STORE_MODE == "replica":
+            await run_in_thread(self.collection.reload)
+        stamp = await run_in_thread(self._store_stamp)
+        if stamp == self._synced_stamp:
+            return False
+        self._synced_stamp = stamp
+        if self.lexical_index is not None:
+            await run_in_thread(self.lexical_index.reload)
+        self.answer_cache.invalidate()
+        logger.info("Store changed in another process (version %s, snapshot %s)", *stamp)
+        return True
+
+    async def embed(self, texts: List[str], task_type: str = "retrieval_document") -> List[List[float]]:
+        """
+        Embed texts, serving repeats from the persistent cache and calling Gemini only for misses.
+        The cache keeps full-width vectors; EMBEDDING_DIMENSIONS truncation is applied on the way out.
+        """
+        if self.embedding_cache is None:
+            return truncate_embeddings(await self.gemini.get_embeddings(texts, task_type=task_type))
+
+        model = self.gemini.embedding_model
+        vectors = await run_in_thread(self.embedding_cache.get_many, model, task_type, texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        logger.info(
+            "Embedding cache: %d hits, %d misses (%s)",
+            len(texts) - len(missing), len(missing), task_type,
+        )
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            fresh = await self.gemini.get_embeddings(missing_texts, task_type=task_type)
+            if len(fresh) != len(missing_texts):
+                raise ValueError("Embedding service returned unexpected number of vectors")
+            await run_in_thread(self.embedding_cache.put_many, model, task_type, missing_texts, fresh)
+            for i, vector in zip(missing, fresh):
+                vectors[i] = vector
+        return truncate_embeddings(vectors)
 
-    async def add_documents(self, documents: List[Dict]) -> List[str]:
-        """Add pre-processed documents to vector DB. Validates inputs & embedding lengths."""
+    async def add_documents(
+        self, documents: List[Dict], progress: Optional[Callable[[str, int], Awaitable[None]]] = None
+    ) -> List[str]:
+        """
+        Add pre-processed documents to vector DB. Validates inputs & embedding lengths.
+        `progress` is awaited with ("embedded" | "written", chunk count) per batch.
+        """
         if not documents:
             logger.debug("add_documents called with empty documents list")
             return []
 
-        ids = [
-            generate_document_id(
-                doc["metadata"]["source"],
-                doc["metadata"].get("page_number"),
-                doc["metadata"].get("chunk_index"),
-            )
-            for doc in documents
+        # Ids are content-derived, so a chunk listed twice is the same chunk
+        unique: Dict[str, Dict] = {}
+        for doc in documents:
+            unique.setdefault(chunk_id(doc["metadata"], doc["content"]), doc)
+        if len(unique) < len(documents):
+            logger.info("Dropped %d duplicate chunks before embedding", len(documents) - len(unique))
+
+        ids = list(unique)
+        contents = [doc["content"] for doc in unique.values()]
+        metadatas = [doc["metadata"] for doc in unique.values()]
+
+        # Register ids before writing them, so a crash can leave the registry
+        # ahead of Chroma but never behind it
+        await run_in_thread(self.registry.add_chunks, *group_chunks(ids, metadatas, contents))
+
+        # Embed and write in bounded, concurrent batches so one oversized
+        # request cannot exceed API limits and a failure only retries its batch
+        batch_size = max(1, settings.EMBEDDING_BATCH_SIZE)
+        semaphore = asyncio.Semaphore(settings.EMBEDDING_BATCH_CONCURRENCY)
+
+        async def run_batch(start: int) -> None:
+            end = start + batch_size
+            async with semaphore:
+                await self._add_batch(ids[start:end], contents[start:end], metadatas[start:end], progress)
+
+        await asyncio.gather(*(run_batch(start) for start in range(0, len(ids), batch_size)))
+        return ids
+
+    async def _add_batch(
+        self,
+        ids: List[str],
+        contents: List[str],
+        metadatas: List[Dict],
+        progress: Optional[Callable[[str, int], Awaitable[None]]] = None,
+    ) -> None:
+        """
+        Embed one batch and upsert it into Chroma, retrying just this batch on
+        failure. Chunks already stored under the same content-derived id
+        (re-uploads, retried jobs) are skipped without an embedding call.
+        """
+        existing = set((await run_in_thread(self.collection.get, ids=ids, include=[]))["ids"])
+        if existing:
+            if progress:
+                await progress("embedded", len(existing))
+                await progress("written", len(existing))
+            keep = [i for i, doc_id in enumerate(ids) if doc_id not in existing]
+            if not keep:
+                return
+            ids = [ids[i] for i in keep]
+            contents = [contents[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+
+        attempt = 0
+        while True:
+            try:
+                with stage("ingest_embedding"):
+                    embeddings = await self.embed(contents)
+                if len(embeddings) != len(contents):
+                    logger.error(
+                        "Embedding count mismatch: %d embeddings for %d documents",
+                        len(embeddings),
+                        len(contents),
+                    )
+                    raise ValueError("Embedding service returned unexpected number of vectors")
+                if progress:
+                    await progress("embedded", len(ids))
+
+                # Chroma is synchronous; run it in the I/O pool. Upsert keeps
+                # a retried batch idempotent if an earlier attempt half-landed
+                with stage("chroma_add"):
+                    await run_in_thread(
+                        self.collection.upsert, ids=ids, embeddings=embeddings, documents=contents, metadatas=metadatas
+                    )
+                if self.vector_store is not None:
+                    with stage("quantized_add"):
+                        await run_in_thread(self.vector_store.add, ids, embeddings)
+                if self.lexical_index is not None:
+                    with stage("lexical_add"):
+                        await run_in_thread(
+                            self.lexical_index.add, ids, [lexical_text(c, m) for c, m in zip(contents, metadatas)]
+                        )
+                self._mark_written()
+                if progress:
+                    await progress("written", len(ids))
+                return
+            except Exception as e:
+                if attempt >= settings.EMBEDDING_BATCH_RETRIES:
+                    logger.error("Embedding batch of %d chunks failed: %s", len(ids), str(e), exc_info=True)
+                    raise
+                attempt += 1
+                logger.warning(
+                    "Embedding batch of %d chunks failed (%s), retry %d/%d",
+                    len(ids), str(e), attempt, settings.EMBEDDING_BATCH_RETRIES,
+                )
+
+    async def clean_documents(self, documents: List[Dict]) -> List[Dict]:
+        """
+        Attach cleaned text to each chunk so it is stored next to the raw chunk.
+        Chunks the local cleaner already left tidy keep their text as-is; only
+        those still scoring as dirty are sent to the LLM. cleaned_text is only
+        stored where it differs from the content; readers fall back to it.
+        """
+        dirty = [
+            doc for doc in documents
+            if dirtiness_score(doc["content"]) >= settings.CLEAN_DIRTY_THRESHOLD
         ]
+        results = await asyncio.gather(
+            *(self.gemini.clean_extracted_text(doc["content"]) for doc in dirty),
+            return_exceptions=True,
+        )
+        cleaned_by_doc = {id(doc): cleaned for doc, cleaned in zip(dirty, results)}
+        for doc in documents:
+            cleaned = cleaned_by_doc.get(id(doc), doc["content"])
+            if isinstance(cleaned, Exception):
+                logger.warning("Chunk cleaning failed, storing raw text: %s", str(cleaned))
+                cleaned = doc["content"]
+            if cleaned and cleaned != doc["content"]:
+                doc["metadata"]["cleaned_text"] = cleaned
 
-        contents = [doc["content"] for doc in documents]
-        metadatas = [doc["metadata"] for doc in documents]
+        CLEANED_CHUNKS.labels(cleaner="llm").inc(len(dirty))
+        CLEANED_CHUNKS.labels(cleaner="local").inc(len(documents) - len(dirty))
+        logger.info("Cleaned %d chunks: %d sent to the LLM", len(documents), len(dirty))
+        return documents
 
-        try:
-            embeddings = await self.gemini.get_embeddings(contents)
-        except Exception as e:
-            logger.error("Failed to get embeddings: %s", str(e), exc_info=True)
-            raise
+    async def backfill_cleaned_text(self, batch_size: int = 100) -> dict:
+        """Clean and store text for chunks ingested before ingest-time cleaning."""
+        updated, skipped, offset = 0, 0, 0
+        while True:
+            batch = await run_in_thread(
+                self.collection.get,
+                include=["documents", "metadatas"], limit=batch_size, offset=offset
+            )
+            ids = batch.get("ids", [])
+            if not ids:
+                break
+            offset += len(ids)
 
-        if len(embeddings) != len(contents):
-            logger.error(
-                "Embedding count mismatch: %d embeddings for %d documents",
-                len(embeddings),
-                len(contents),
+            pending = [
+                {"id": doc_id, "content": content or "", "metadata": dict(metadata or {})}
+                for doc_id, content, metadata in zip(ids, batch["documents"], batch["metadatas"])
+                if not (metadata or {}).get("cleaned_text")
+            ]
+            skipped += len(ids) - len(pending)
+            if not pending:
+                continue
+
+            await self.clean_documents(pending)
+            # Chunks whose text was already clean get no cleaned_text and stay as they are
+            cleaned = [doc for doc in pending if "cleaned_text" in doc["metadata"]]
+            skipped += len(pending) - len(cleaned)
+            if not cleaned:
+                continue
+            await run_in_thread(
+                self.collection.update,
+                ids=[doc["id"] for doc in cleaned],
+                metadatas=[doc["metadata"] for doc in cleaned],
             )
-            raise ValueError("Embedding service returned unexpected number of vectors")
+            if self.lexical_index is not None:
+                await run_in_thread(
+                    self.lexical_index.add,
+                    [doc["id"] for doc in cleaned],
+                    [lexical_text(doc["content"], doc["metadata"]) for doc in cleaned],
+                )
+            self._mark_written()
+            updated += len(cleaned)
 
-        # Add to Chroma (synchronous)
-        self.collection.add(ids=ids, embeddings=embeddings, documents=contents, metadatas=metadatas)
-        return ids
+        return {"updated": updated, "skipped": skipped}
 
     async def process_and_add_pdf(self, file_path: str, file_name: str) -> List[str]:
         """Process PDF file and add chunks to vector DB"""
         try:
-            with open(file_path, "rb") as f:
-                pdf_bytes = f.read()
+            pdf_bytes = await run_in_thread(Path(file_path).read_bytes)
 
-            pages = self.pdf_processor.extract_text_with_pages(pdf_bytes)
+            pages = await self.pdf_processor.extract_text_with_pages_async(pdf_bytes)
             base_metadata = {"source": file_name, "file_path": file_path}
             chunks = self.pdf_processor.split_pages(pages, metadata=base_metadata)
+            if settings.CLEAN_ON_INGEST:
+                chunks = await self.clean_documents(chunks)
 
             return await self.add_documents(chunks)
         except Exception as e:
             logger.error("Failed to process and add PDF: %s", str(e), exc_info=True)
             raise
 
-    def delete_document(self, source: str) -> dict:
-        """Delete all chunks of a document by source filename and return deletion summary."""
-        results = self.collection.get(where={"source": source}, include=["metadatas", "ids"])
-        ids = results.get("ids", [])
+    async def deduplicate(self, documents: List[Dict]) -> Tuple[List[Dict], Dict]:
+        """
+        Fold near-duplicate chunks into the canonical chunk they repeat, across
+        all documents. Returns the chunks still to be stored and the pending
+        fold, which commit_dedup records once those chunks are written.
+        """
+        folded = {"canonical": {}, "references": []}
+        if self.dedup_index is None or not documents:
+            return documents, folded
+
+        def fold() -> List[Dict]:
+            unique = []
+            for doc in documents:
+                doc_id = chunk_id(doc["metadata"], doc["content"])
+                signed = self.dedup_index.sign(doc["content"])
+                canonical_id = self.dedup_index.find(doc_id, signed, folded["canonical"])
+                if canonical_id is None:
+                    folded["canonical"][doc_id] = signed
+                    unique.append(doc)
+                    continue
+                folded["references"].append(
+                    (doc_id, canonical_id, document_key(doc["metadata"]), text_hash(doc["content"]), doc["metadata"])
+                )
+            return unique
+
+        with stage("dedup"):
+            unique = await run_in_thread(fold)
+        DEDUP_CHUNKS.labels(result="unique").inc(len(unique))
+        DEDUP_CHUNKS.labels(result="duplicate").inc(len(folded["references"]))
+        return unique, folded
+
+    async def commit_dedup(self, folded: Dict) -> List[str]:
+        """
+        Index the canonical chunks of a fold and record its references, after
+        add_documents stored them; a failed or cancelled write leaves no
+        signature pointing at a chunk that was never stored. Returns the
+        folded chunk ids.
+        """
+        if self.dedup_index is None:
+            return []
+        await run_in_thread(self.dedup_index.add, folded["canonical"])
+        if folded["references"]:
+            await run_in_thread(self.dedup_index.add_references, folded["references"])
+            logger.info("Folded %d near-duplicate chunks into existing ones", len(folded["references"]))
+            self._mark_written()
+        return [reference[0] for reference in folded["references"]]
+
+    async def document_chunk_ids(self, filename: str) -> List[str]:
+        """Stored chunk ids of a document plus the ids of its chunks folded into others."""
+        ids = await run_in_thread(self.registry.chunk_ids, filename)
+        if self.dedup_index is not None:
+            ids += [row[0] for row in await run_in_thread(self.dedup_index.document_duplicates, safe_filename(filename))]
+        return ids
+
+    async def _promote(self, canonical_id: str, successor_id: str, metadata: Dict) -> None:
+        """Re-store a canonical chunk that is being deleted under a surviving duplicate's id."""
+        row = await run_in_thread(
+            self.collection.get, ids=[canonical_id], include=["documents", "metadatas", "embeddings"]
+        )
+        if not row["ids"]:
+            return
+        document = row["documents"][0]
+        metadata = {**(row["metadatas"][0] or {}), **metadata}
+        await run_in_thread(self.registry.add_chunks, *group_chunks([successor_id], [metadata], [document]))
+        await run_in_thread(
+            self.collection.upsert,
+            ids=[successor_id], embeddings=[row["embeddings"][0]], documents=[document], metadatas=[metadata],
+        )
+        if self.lexical_index is not None:
+            await run_in_thread(self.lexical_index.add, [successor_id], [lexical_text(document, metadata)])
+        if self.vector_store is not None:
+            await run_in_thread(self.vector_store.add, [successor_id], [row["embeddings"][0]])
 
-        # Handle nested list shape that Chroma may return
-        if ids and isinstance(ids[0], list):
-            ids = ids[0]
+    async def delete_chunks(self, ids: List[str]) -> None:
+        """
+        Delete chunks by id in bounded batches from Chroma, the lexical index and the registry.
+        A canonical chunk that other documents' duplicates still point at is
+        first re-stored under one of those duplicates.
+        """
+        if self.dedup_index is not None:
+            ids, promotions = await run_in_thread(self.dedup_index.release, ids)
+            for canonical_id, (successor_id, metadata) in promotions.items():
+                await self._promote(canonical_id, successor_id, metadata)
+        batch_size = max(1, settings.DELETE_BATCH_SIZE)
+        for start in range(0, len(ids), batch_size):
+            part = ids[start:start + batch_size]
+            await run_in_thread(self.collection.delete, ids=part)
+            if self.lexical_index is not None:
+                await run_in_thread(self.lexical_index.delete, part)
+            if self.vector_store is not None:
+                await run_in_thread(self.vector_store.delete, part)
+        await run_in_thread(self.registry.remove_chunks, ids)
+        self._mark_written()
 
-        if not ids:
+    async def delete_document(self, source: str) -> dict:
+        """Delete all chunks of a document by source, looked up in the registry, and return deletion summary."""
+        document = await run_in_thread(self.registry.get_by_source, source)
+        if document is None:
             return {"chunks_deleted": 0, "ids": []}
 
-        self.collection.delete(ids=ids)
+        ids = await self.document_chunk_ids(document["doc_key"])
+        await self.delete_chunks(ids)
+        await run_in_thread(self.registry.remove, document["doc_key"])
         return {"chunks_deleted": len(ids), "ids": ids}
 
-    def delete_all(self) -> dict:
-        """Delete all documents and embeddings from vector database."""
+    async def delete_all(self) -> dict:
+        """Delete all documents and embeddings from vector database, in bounded batches."""
         try:
-            total_count = self.collection.count()
-            if total_count > 0:
-                # Get all IDs and delete them
-                all_data = self.collection.get(include=[])
-                all_ids = all_data.get("ids", [])
-                if all_ids:
-                    self.collection.delete(ids=all_ids)
+            total_count = await run_in_thread(self.collection.count)
+            batch_size = max(1, settings.DELETE_BATCH_SIZE)
+            while True:
+                batch = await run_in_thread(self.collection.get, include=[], limit=batch_size)
+                ids = batch.get("ids", [])
+                if not ids:
+                    break
+                await run_in_thread(self.collection.delete, ids=ids)
+            if self.lexical_index is not None:
+                await run_in_thread(self.lexical_index.clear)
+            if self.vector_store is not None:
+                await run_in_thread(self.vector_store.clear)
+            await run_in_thread(self.registry.clear)
+            if self.dedup_index is not None:
+                await run_in_thread(self.dedup_index.clear)
+            self._mark_written()
             return {"total_deleted": total_count}
         except Exception as e:
             logger.error("Delete all from vector database failed: %s", str(e), exc_info=True)
             raise
 
-    async def query(self, query_text: str, top_k: int = 5) -> dict:
-        """Returns raw ChromaDB results with safety checks."""
-        try:
-            query_embedding = (await self.gemini.get_embeddings([query_text]))[0]
-            max_k = min(top_k, max(1, self.collection.count()))
+    async def sync_document_registry(self, batch_size: int = 500) -> int:
+        """Rebuild the document registry from Chroma when the two have drifted apart."""
+        total = await run_in_thread(self.collection.count)
+        if await run_in_thread(self.registry.total_chunks) == total:
+            return 0
 
-            return self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=max_k,
-                include=["documents", "metadatas", "distances"],
+        logger.info("Rebuilding document registry for %d chunks", total)
+        known = {doc["doc_key"]: doc for doc in await run_in_thread(self.registry.list)}
+        await run_in_thread(self.registry.clear)
+        offset = 0
+        while True:
+            batch = await run_in_thread(
+                self.collection.get, include=["documents", "metadatas"], limit=batch_size, offset=offset
             )
-        except Exception as e:
-            logger.error("Vector query failed: %s", str(e), exc_info=True)
-            return {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+            ids = batch.get("ids", [])
+            if not ids:
+                break
+            offset += len(ids)
+            await run_in_thread(
+                self.registry.add_chunks, *group_chunks(ids, batch["metadatas"], batch["documents"])
+            )
+
+        # Keep file details recorded at ingest for documents that are still present
+        for key, doc in known.items():
+            if await run_in_thread(self.registry.exists, key):
+                await run_in_thread(
+                    self.registry.upsert, doc["filename"], doc["source"],
+                    file_hash=doc["file_hash"], size_bytes=doc["size_bytes"],
+                    page_count=doc["page_count"], ingested_at=doc["ingested_at"],
+                )
+        return offset
+
+    async def sync_lexical_index(self, batch_size: int = 500) -> int:
+        """Rebuild the BM25 index from Chroma when the two have drifted apart."""
+        if self.lexical_index is None:
+            return 0
+        total = await run_in_thread(self.collection.count)
+        if self.lexical_index.count() == total:
+            return 0
+
+        logger.info("Rebuilding lexical index for %d chunks", total)
+        await run_in_thread(self.lexical_index.clear)
+        offset = 0
+        while True:
+            batch = await run_in_thread(
+                self.collection.get,
+                include=["documents", "metadatas"], limit=batch_size, offset=offset
+            )
+            ids = batch.get("ids", [])
+            if not ids:
+                break
+            offset += len(ids)
+            texts = [lexical_text(c, m) for c, m in zip(batch["documents"], batch["metadatas"])]
+            await run_in_thread(self.lexical_index.add, ids, texts)
+        return offset
+
+    async def sync_quantized_store(self, batch_size: int = 500) -> int:
+        """Rebuild the quantized vector store from Chroma when the two have drifted apart."""
+        if self.vector_store is None:
+            return 0
+        total = await run_in_thread(self.collection.count)
+        if self.vector_store.count() == total:
+            return 0
+
+        logger.info("Rebuilding %s vector store for %d chunks", self.vector_store.quantization, total)
+        await run_in_thread(self.vector_store.clear)
+        offset = 0
+        while True:
+            batch = await run_in_thread(self.collection.get, include=["embeddings"], limit=batch_size, offset=offset)
+            ids = batch.get("ids", [])
+            if not ids:
+                break
+            offset += len(ids)
+            await run_in_thread(self.vector_store.add, ids, batch["embeddings"])
+        return offset
+
+    async def check_embedding_dimensions(self) -> Optional[int]:
+        """Warn when stored vectors are wider or narrower than EMBEDDING_DIMENSIONS asks for."""
+        sample = await run_in_thread(self.collection.get, include=["embeddings"], limit=1)
+        if not sample["ids"]:
+            return None
+        width = len(sample["embeddings"][0])
+        if settings.EMBEDDING_DIMENSIONS and width != settings.EMBEDDING_DIMENSIONS:
+            logger.error(
+                "Stored embeddings are %d wide but EMBEDDING_DIMENSIONS=%d; run "
+                "`python -m app.migrate_vectors` before serving queries",
+                width, settings.EMBEDDING_DIMENSIONS,
+            )
+        return width
+
+    async def warm_up(self, queries: List[str] = ()) -> dict:
+        """
+        Pay first-query costs up front: a one-result search loads Chroma's
+        vector index (and pages in the quantized store), and running
+        `queries` primes the embedding cache and the Gemini connection.
+        """
+        sample = await run_in_thread(self.collection.get, include=["embeddings"], limit=1)
+        width = len(sample["embeddings"][0]) if sample["ids"] else None
+        if width:
+            with stage("warmup_index"):
+                await self._dense_query([[1.0] + [0.0] * (width - 1)], 1)
+        if queries:
+            try:
+                with stage("warmup_queries"):
+                    await self.query_batch(list(queries))
+            except Exception as e:
+                # Priming is best effort; the service works without it
+                logger.warning("Warmup queries failed: %s", str(e))
+        return {"dimensions": width, "queries": len(queries)}
+
+    async def resolve_scope(
+        self,
+        filenames: List[str] = None,
+        page_from: int = None,
+        page_to: int = None,
+        ingested_after: float = None,
+        ingested_before: float = None,
+    ) -> Optional[Dict]:
+        """
+        Turn query filters into a search scope, or None for the whole corpus:
+        - "where": Chroma clause on filename / page_number, pushed down into
+          the vector search
+        - "ids": the in-scope chunk ids from the registry, for the BM25 and
+          quantized scans (only computed when those are enabled)
+        - "folded": canonical chunks of other documents that in-scope pages
+          were folded into at ingest; they are searched alongside the scope
+        The ingest time window selects documents by their registry
+        `ingested_at` and is folded into the filename list.
+        """
+        if all(value is None for value in (filenames, page_from, page_to, ingested_after, ingested_before)):
+            return None
+        if ingested_after is not None or ingested_before is not None:
+            documents = await run_in_thread(self.registry.list)
+            in_window = {
+                doc["filename"] for doc in documents
+                if (ingested_after is None or doc["ingested_at"] >= ingested_after)
+                and (ingested_before is None or doc["ingested_at"] <= ingested_before)
+            }
+            filenames = sorted(in_window) if filenames is None else [name for name in filenames if name in in_window]
+
+        scope = {
+            "where": scope_where(filenames, page_from, page_to), "filenames": filenames,
+            "page_from": page_from, "page_to": page_to, "ids": None, "folded": set(),
+        }
+        if filenames is not None and not filenames:
+            scope["ids"] = set()
+            return scope
+        if self.dedup_index is not None and filenames is not None:
+            for filename in filenames:
+                scope["folded"].update(await run_in_thread(
+                    self.dedup_index.canonical_ids, safe_filename(filename), page_from, page_to
+                ))
+        if self.lexical_index is not None or self.vector_store is not None:
+            scope["ids"] = await run_in_thread(self._scope_ids, filenames, page_from, page_to) | scope["folded"]
+        return scope
+
+    def _scope_ids(self, filenames: Optional[List[str]], page_from: Optional[int], page_to: Optional[int]) -> set:
+        if filenames is None:
+            filenames = [doc["filename"] for doc in self.registry.list()]
+        return {
+            chunk_id
+            for filename in filenames
+            for chunk_id, page_number, _ in self.registry.chunks(filename)
+            if (page_from is None or (page_number is not None and page_number >= page_from))
+            and (page_to is None or (page_number is not None and page_number <= page_to))
+        }
+
+    async def _dense_query(self, query_embeddings: List[List[float]], n_results: int, scope: Dict = None) -> dict:
+        """
+        Chroma-shaped dense search for one or more queries in a single call.
+        With a quantized store, the top `n_results * QUANTIZED_RESCORE_MULTIPLIER`
+        candidates of a scan over the compact codes are re-scored with their
+        float vectors from Chroma. A `scope` is pushed down as a `where`
+        clause, or limits the quantized scan to the in-scope rows.
+        """
+        include = ["documents", "metadatas", "distances", "embeddings"]
+        if self.vector_store is None:
+            where = {"where": scope["where"]} if scope and scope["where"] else {}
+            results = await run_in_thread(
+                self.collection.query, query_embeddings=query_embeddings, n_results=n_results, include=include, **where
+            )
+            if scope and scope["folded"]:
+                results = await self._merge_folded(results, query_embeddings, n_results, scope["folded"])
+            return results
+
+        candidates = await run_in_thread(
+            self.vector_store.search_many, query_embeddings, n_results * max(1, settings.QUANTIZED_RESCORE_MULTIPLIER),
+            scope["ids"] if scope else None,
+        )
+        # One read for the union of every query's candidates
+        rows = await run_in_thread(
+            self.collection.get, ids=list(dict.fromkeys(chunk_id for found in candidates for chunk_id, _ in found)),
+            include=["documents", "metadatas", "embeddings"],
+        )
+        if not rows["ids"]:
+            return {key: [[] for _ in query_embeddings] for key in ["ids", *include]}
+        position = {chunk_id: i for i, chunk_id in enumerate(rows["ids"])}
+        results = {key: [] for key in ["ids", *include]}
+        with stage("quantized_rescore"):
+            vectors = np.asarray(rows["embeddings"], dtype=np.float32).reshape(len(rows["ids"]), -1)
+            norms = np.linalg.norm(vectors, axis=1)
+            for query_embedding, found in zip(query_embeddings, candidates):
+                picked = [position[chunk_id] for chunk_id, _ in found if chunk_id in position]
+                query = np.asarray(query_embedding, dtype=np.float32)
+                scale = norms[picked] * (np.linalg.norm(query) or 1.0)
+                distances = 1.0 - (vectors[picked] @ query) / np.where(scale == 0, 1.0, scale)
+                order = [picked[i] for i in np.argsort(distances, kind="stable")[:n_results]]
+                by_row = dict(zip(picked, distances.tolist()))
+                results["ids"].append([rows["ids"][i] for i in order])
+                results["documents"].append([rows["documents"][i] for i in order])
+                results["metadatas"].append([rows["metadatas"][i] for i in order])
+                results["distances"].append([by_row[i] for i in order])
+                results["embeddings"].append([rows["embeddings"][i] for i in order])
+        return results
+
+    async def _merge_folded(
+        self, results: dict, query_embeddings: List[List[float]], n_results: int, folded: set
+    ) -> dict:
+        """Add a scope's folded canonical chunks, scored exactly, to a where-filtered dense result."""
+        rows = await run_in_thread(
+            self.collection.get, ids=sorted(folded), include=["documents", "metadatas", "embeddings"]
+        )
+        if not rows["ids"]:
+            return results
+        keys = ["ids", "documents", "metadatas", "distances", "embeddings"]
+        merged = {key: [] for key in keys}
+        for i, query_embedding in enumerate(query_embeddings):
+            found = self._select(results, i)
+            candidates = {
+                chunk_id: (document, metadata, distance, embedding)
+                for chunk_id, document, metadata, distance, embedding in zip(*(found[key][0] for key in keys))
+            }
+            for chunk_id, document, metadata, embedding in zip(
+                rows["ids"], rows["documents"], rows["metadatas"], rows["embeddings"]
+            ):
+                candidates.setdefault(
+                    chunk_id, (document, metadata, cosine_distance(query_embedding, embedding), embedding)
+                )
+            best = sorted(candidates, key=lambda chunk_id: candidates[chunk_id][2])[:n_results]
+            merged["ids"].append(best)
+            for position, key in enumerate(keys[1:]):
+                merged[key].append([candidates[chunk_id][position] for chunk_id in best])
+        return merged
+
+    async def query(
+        self, query_text: str, top_k: int = 5, query_embedding: List[float] = None, scope: Dict = None
+    ) -> dict:
+        """
+        Returns ChromaDB-shaped results, including embeddings, with safety checks.
+        With hybrid search on, dense and BM25 candidates are fused by
+        reciprocal rank and every result carries its true cosine distance.
+        Pass `query_embedding` to reuse one the caller already computed, and
+        a `resolve_scope` result to search only part of the corpus.
+        """
+        embeddings = [query_embedding] if query_embedding is not None else None
+        return (await self.query_batch([query_text], top_k, embeddings, scope))[0]
+
+    async def query_batch(
+        self, query_texts: List[str], top_k: int = 5, query_embeddings: List[List[float]] = None, scope: Dict = None
+    ) -> List[dict]:
+        """
+        `query` for many questions at once: one embedding call and one
+        multi-query dense search for the whole batch; BM25 searches run
+        concurrently. Returns one ChromaDB-shaped result per question, in order.
+        """
+        empty = {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]], "embeddings": [[]]}
+        if not query_texts:
+            return []
+        if scope is not None and scope["ids"] is not None and not scope["ids"]:
+            return [dict(empty) for _ in query_texts]
+        await self.sync_with_writer()
+        # Errors propagate: an empty result here would be answered, and
+        # cached, as "Not found"
+        if query_embeddings is None:
+            with stage("query_embedding"):
+                query_embeddings = await self.embed(query_texts)
+        with stage("chroma_count"):
+            count = await run_in_thread(self.collection.count)
+        if scope is not None and scope["ids"] is not None:
+            count = min(count, len(scope["ids"]))
+        if self.lexical_index is None:
+            max_k = min(top_k, max(1, count))
+            with stage("chroma_query"):
+                dense = await self._dense_query(query_embeddings, max_k, scope)
+            results = [self._select(dense, i) for i in range(len(query_texts))]
+            for result in results:
+                CHROMA_RESULTS.observe(len(result["ids"][0]))
+            return results
+
+        n_candidates = min(max(1, count), top_k * settings.HYBRID_CANDIDATE_MULTIPLIER)
+        dense, lexical = await asyncio.gather(
+            timed("chroma_query", self._dense_query(query_embeddings, n_candidates, scope)),
+            timed("lexical_search", asyncio.gather(*(
+                run_in_thread(self.lexical_index.search, query_text, n_candidates, scope["ids"] if scope else None)
+                for query_text in query_texts
+            ))),
+        )
+        with stage("rank_fusion"):
+            results = []
+            for i, query_embedding in enumerate(query_embeddings):
+                question_dense = self._select(dense, i)
+                CHROMA_RESULTS.observe(len(question_dense["ids"][0]))
+                results.append(await self._fuse(
+                    question_dense, [chunk_id for chunk_id, _ in lexical[i]], query_embedding, top_k
+                ))
+            return results
+
+    @staticmethod
+    def _select(results: dict, i: int) -> dict:
+        """The i-th query of a multi-query Chroma result, as a single-query result."""
+        return {
+            key: [results[key][i] if results.get(key) is not None else []]
+            for key in ["ids", "documents", "metadatas", "distances", "embeddings"]
+        }
+
+    async def _fuse(self, dense: dict, lexical_ids: List[str], query_embedding: List[float], top_k: int) -> dict:
+        rows = {
+            chunk_id: (document, metadata, distance, embedding)
+            for chunk_id, document, metadata, distance, embedding in zip(
+                dense["ids"][0], dense["documents"][0], dense["metadatas"][0], dense["distances"][0],
+                dense["embeddings"][0],
+            )
+        }
+        fused = reciprocal_rank_fusion([dense["ids"][0], lexical_ids], k=settings.RRF_K)[:top_k]
+
+        # Lexical-only hits need their document, metadata and dense distance
+        missing = [chunk_id for chunk_id in fused if chunk_id not in rows]
+        if missing:
+            extra = await run_in_thread(
+                self.collection.get, ids=missing, include=["documents", "metadatas", "embeddings"]
+            )
+            for chunk_id, document, metadata, embedding in zip(
+                extra["ids"], extra["documents"], extra["metadatas"], extra["embeddings"]
+            ):
+                rows[chunk_id] = (document, metadata, cosine_distance(query_embedding, embedding), embedding)
+
+        # Drop ids the lexical index still knows but Chroma no longer has
+        fused = [chunk_id for chunk_id in fused if chunk_id in rows]
+        return {
+            "ids": [fused],
+            "documents": [[rows[chunk_id][0] for chunk_id in fused]],
+            "metadatas": [[rows[chunk_id][1] for chunk_id in fused]],
+            "distances": [[rows[chunk_id][2] for chunk_id in fused]],
+            "embeddings": [[rows[chunk_id][3] for chunk_id in fused]],
+        }
 
     async def search_similar(self, query: str, threshold: float = 0.7, top_k: int = 3) -> List[Dict]:
         """
@@ -0,0 +1,119 @@
+"""
+Measure /query latency while a large PDF is being ingested.
+
+Runs against a live server (default http://localhost:8000):
+- Phase 1: baseline /query latency with no ingestion
+- Phase 2: the same query load while a synthetic 500-page PDF is ingested
+
+With blocking work offloaded to executors, p99 in phase 2 should stay
+close to phase 1.
+
+Usage: python benchmarks/ingest_query_latency.py --url http://localhost:8000
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.request
+import uuid
+
+from synthetic import build_pdf
+
+
+def upload(url: str, filename: str, data: bytes) -> float:
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: application/pdf\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    request = urllib.request.Request(
+        f"{url}/upload", data=body, method="POST",
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=3600) as response:
+        job = json.loads(response.read())
+    # Upload only queues the job; wait for the background ingestion to finish
+    while job["status"] not in ("completed", "failed", "cancelled"):
+        time.sleep(0.5)
+        with urllib.request.urlopen(f"{url}/jobs/{job['job_id']}", timeout=60) as response:
+            job = json.loads(response.read())
+    return time.perf_counter() - start
+
+
+def query_once(url: str, question: str) -> float:
+    request = urllib.request.Request(
+        f"{url}/query", data=json.dumps({"question": question, "top_k": 5}).encode(),
+        method="POST", headers={"Content-Type": "application/json"},
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=120) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def query_load(url: str, concurrency: int, stop: threading.Event, samples: list) -> None:
+    def worker():
+        while not stop.is_set():
+            try:
+                samples.append(query_once(url, "How do I calibrate the motor controller setpoint?"))
+            except Exception:
+                samples.append(float("inf"))
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def percentiles(samples: list) -> dict:
+    finite = sorted(s for s in samples if s != float("inf"))
+    if len(finite) < 2:
+        return {"count": len(finite), "errors": len(samples) - len(finite)}
+    cuts = statistics.quantiles(finite, n=100)
+    return {
+        "count": len(finite),
+        "errors": len(samples) - len(finite),
+        "p50_ms": round(cuts[49] * 1000, 1),
+        "p95_ms": round(cuts[94] * 1000, 1),
+        "p99_ms": round(cuts[98] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--baseline-seconds", type=float, default=15.0)
+    args = parser.parse_args()
+
+    baseline, during = [], []
+    stop = threading.Event()
+    loader = threading.Thread(target=query_load, args=(args.url, args.concurrency, stop, baseline))
+    loader.start()
+    time.sleep(args.baseline_seconds)
+    stop.set()
+    loader.join()
+
+    pdf = build_pdf(args.pages)
+    stop = threading.Event()
+    loader = threading.Thread(target=query_load, args=(args.url, args.concurrency, stop, during))
+    loader.start()
+    upload_seconds = upload(args.url, f"bench_{args.pages}_pages.pdf", pdf)
+    stop.set()
+    loader.join()
+
+    print(json.dumps({
+        "pages": args.pages,
+        "pdf_bytes": len(pdf),
+        "upload_seconds": round(upload_seconds, 2),
+        "baseline": percentiles(baseline),
+        "during_ingest": percentiles(during),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
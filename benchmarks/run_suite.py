@@ -0,0 +1,178 @@
+"""
+Offline benchmark suite on a synthetic manual corpus.
+
+Runs fully in-process against the deterministic fake LLM backend, so no
+GEMINI_API_KEY or network is needed. Reports:
+- ingest: pages/sec parsed, chunks/sec embedded, chunks/sec embedded + written
+- query: p50/p95/p99 latency of the /query handler under concurrent load
+- retrieval: recall@k for questions whose answer lives on a known page
+
+Results are printed as JSON (and written to --output) for regression tracking.
+
+Usage: python benchmarks/run_suite.py --docs 4 --pages 100 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def configure_environment(workdir: str, args) -> None:
+    """Settings are read at import time, so this must run before importing app."""
+    os.environ.update({
+        "LLM_BACKEND": "fake",
+        "FAKE_EMBED_LATENCY_MS": str(args.embed_latency_ms),
+        "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "GEMINI_RATE_LIMIT_RPS": "0",
+        "VECTOR_DB_PATH": os.path.join(workdir, "chroma_db"),
+        "UPLOAD_DIR": os.path.join(workdir, "documents"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "cache", "embeddings.sqlite3"),
+        "EMBEDDING_CACHE_ENABLED": "false",
+        "ANSWER_CACHE_ENABLED": "false",
+        "JOB_STORE_PATH": os.path.join(workdir, "cache", "jobs.sqlite3"),
+        "BM25_INDEX_PATH": os.path.join(workdir, "cache", "bm25.sqlite3"),
+        "DOCUMENT_REGISTRY_PATH": os.path.join(workdir, "cache", "documents.sqlite3"),
+        "DEDUP_INDEX_PATH": os.path.join(workdir, "cache", "dedup.sqlite3"),
+        "QUANTIZED_STORE_PATH": os.path.join(workdir, "cache", "vectors"),
+        "LOG_LEVEL": "WARNING",
+    })
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+
+
+def percentiles(samples):
+    cuts = statistics.quantiles(sorted(samples), n=100) if len(samples) > 1 else [samples[0]] * 99
+    return {
+        "count": len(samples),
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+    }
+
+
+async def run(args) -> dict:
+    from synthetic import SyntheticManual
+    from app.services.pdf_processor import extract_text_with_pages
+    from app.services.schemas import QueryRequest
+    import app.main as main
+
+    pdf_processor = main.pdf_processor
+    vector_service = main.vector_service
+    manuals = [SyntheticManual(f"Manual {i}", args.pages) for i in range(args.docs)]
+
+    # Ingest: parse, split, embed, write
+    parse_seconds, embed_seconds, ingest_seconds = 0.0, 0.0, 0.0
+    total_pages, total_chunks = 0, 0
+    for manual in manuals:
+        pdf = manual.pdf()
+        start = time.perf_counter()
+        pages = extract_text_with_pages(pdf)
+        parse_seconds += time.perf_counter() - start
+        total_pages += len(pages)
+
+        chunks = pdf_processor.split_pages(pages, {
+            "source": f"/static/documents/{manual.name}.pdf",
+            "filename": f"{manual.name}.pdf"
+        })
+        total_chunks += len(chunks)
+
+        start = time.perf_counter()
+        await vector_service.embed([chunk["content"] for chunk in chunks])
+        embed_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        await vector_service.add_documents(chunks)
+        ingest_seconds += time.perf_counter() - start
+
+    # Retrieval quality
+    questions = [
+        {**item, "filename": f"{manual.name}.pdf"}
+        for manual in manuals
+        for item in manual.questions(args.questions_per_doc)
+    ]
+    ks = [1, 3, 5]
+    hits = {k: 0 for k in ks}
+    for item in questions:
+        results = await vector_service.query(item["question"], top_k=max(ks))
+        ranked = [
+            (metadata.get("filename"), metadata.get("page_number"))
+            for metadata in results["metadatas"][0]
+        ]
+        target = (item["filename"], item["page_number"])
+        for k in ks:
+            hits[k] += target in ranked[:k]
+
+    # Query latency under concurrent load through the /query handler
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one_query(question: str) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await main.query_documents(QueryRequest(question=question, top_k=5))
+            latencies.append(time.perf_counter() - start)
+
+    load = [questions[i % len(questions)]["question"] for i in range(args.queries)]
+    start = time.perf_counter()
+    await asyncio.gather(*(one_query(question) for question in load))
+    load_seconds = time.perf_counter() - start
+
+    return {
+        "config": {
+            "docs": args.docs,
+            "pages_per_doc": args.pages,
+            "concurrency": args.concurrency,
+            "embed_latency_ms": args.embed_latency_ms,
+            "llm_latency_ms": args.llm_latency_ms,
+        },
+        "ingest": {
+            "pages": total_pages,
+            "chunks": total_chunks,
+            "pages_per_sec_parsed": round(total_pages / parse_seconds, 1),
+            "chunks_per_sec_embedded": round(total_chunks / embed_seconds, 1),
+            "chunks_per_sec_embedded_and_written": round(total_chunks / ingest_seconds, 1),
+        },
+        "query": {
+            **percentiles(latencies),
+            "throughput_qps": round(len(latencies) / load_seconds, 1),
+        },
+        "retrieval": {
+            "questions": len(questions),
+            **{f"recall@{k}": round(hits[k] / len(questions), 4) for k in ks},
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--questions-per-doc", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--embed-latency-ms", type=float, default=0)
+    parser.add_argument("--llm-latency-ms", type=float, default=0)
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+    if args.output:
+        args.output = os.path.abspath(args.output)
+
+    with tempfile.TemporaryDirectory(prefix="pdf-search-bench-") as workdir:
+        configure_environment(workdir, args)
+        report = asyncio.run(run(args))
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Scoped vs global query latency as the corpus grows.
+
+Grows one synthetic corpus (--docs-per-step documents of --chunks-per-doc
+chunks, 4 chunks per page) through --steps sizes and at every size times:
+- global: search over every chunk
+- document: search restricted to one document
+- pages: one document and a 10-page range
+for each dense backend:
+- chroma: `where` filter pushed down into the collection query
+- quantized: int8 QuantizedVectorStore scan over the scoped rows only
+- snapshot: replica SnapshotCollection scanning only the document's partition
+
+Usage: python benchmarks/scoped_query_bench.py --steps 4 --docs-per-step 25 --dim 768
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHUNKS_PER_PAGE = 4
+
+
+class SyntheticDocs:
+    """Collection-shaped view over the generated rows, used to write the snapshot."""
+
+    def __init__(self, ids, vectors, metadatas):
+        self.ids, self.vectors, self.metadatas = ids, vectors, metadatas
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def get(self, include, limit: int, offset: int, **_):
+        end = min(len(self.ids), offset + limit)
+        return {
+            "ids": self.ids[offset:end],
+            "embeddings": self.vectors[offset:end],
+            "documents": [f"chunk {i}" for i in range(offset, end)],
+            "metadatas": self.metadatas[offset:end],
+        }
+
+
+def generate(first_doc: int, docs: int, chunks_per_doc: int, dim: int, rng):
+    ids, metadatas = [], []
+    for doc in range(first_doc, first_doc + docs):
+        for chunk in range(chunks_per_doc):
+            ids.append(f"doc{doc}_c{chunk}")
+            metadatas.append({
+                "source": f"/static/documents/doc{doc}.pdf", "filename": f"doc{doc}.pdf",
+                "page_number": chunk // CHUNKS_PER_PAGE + 1, "chunk_index": chunk % CHUNKS_PER_PAGE,
+            })
+    vectors = rng.standard_normal((len(ids), dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return ids, vectors, metadatas
+
+
+def percentiles(samples):
+    cuts = statistics.quantiles(sorted(samples), n=100)
+    return {"p50_ms": round(cuts[49] * 1000, 3), "p95_ms": round(cuts[94] * 1000, 3)}
+
+
+def timed(search, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append(time.perf_counter() - start)
+    return percentiles(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--docs-per-step", type=int, default=25)
+    parser.add_argument("--chunks-per-doc", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    sys.path.insert(0, ROOT)
+    import chromadb
+    from app.services.quantized_store import QuantizedVectorStore
+    from app.services.snapshot import SnapshotCollection, write_snapshot
+    from app.services.vector_service import scope_where
+
+    rng = np.random.default_rng(args.seed)
+    queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    scopes = {
+        "global": {},
+        "document": {"filenames": ["doc0.pdf"]},
+        "pages": {"filenames": ["doc0.pdf"], "page_from": 11, "page_to": 20},
+    }
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="scoped-bench-") as workdir:
+        client = chromadb.PersistentClient(path=os.path.join(workdir, "chroma"))
+        collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"})
+        store = QuantizedVectorStore(path=os.path.join(workdir, "quantized"), quantization="int8")
+        all_ids, all_vectors, all_metadatas = [], [], []
+        for step in range(args.steps):
+            ids, vectors, metadatas = generate(
+                step * args.docs_per_step, args.docs_per_step, args.chunks_per_doc, args.dim, rng
+            )
+            for start in range(0, len(ids), 2000):
+                end = start + 2000
+                collection.add(ids=ids[start:end], embeddings=vectors[start:end], metadatas=metadatas[start:end])
+            store.add(ids, vectors)
+            all_ids += ids
+            all_vectors.append(vectors)
+            all_metadatas += metadatas
+
+            snapshot_path = os.path.join(workdir, f"snapshot-{step}")
+            write_snapshot(SyntheticDocs(all_ids, np.concatenate(all_vectors), all_metadatas), snapshot_path)
+            snapshot = SnapshotCollection(snapshot_path)
+
+            for name, scope in scopes.items():
+                where = scope_where(**scope)
+                # VectorService resolves these ids from the document registry
+                scoped_ids = None if where is None else [
+                    chunk_id for chunk_id, metadata in zip(all_ids, all_metadatas)
+                    if metadata["filename"] in scope["filenames"]
+                    and scope.get("page_from", 0) <= metadata["page_number"] <= scope.get("page_to", 1 << 30)
+                ]
+                row = {"chunks": len(all_ids), "scope": name, "scoped_chunks": len(scoped_ids or all_ids)}
+                row["chroma"] = timed(lambda q: collection.query(
+                    query_embeddings=[q.tolist()], n_results=args.k, where=where, include=["distances"]
+                ), queries)
+                row["quantized"] = timed(lambda q: store.search(q.tolist(), args.k, ids=scoped_ids), queries)
+                row["snapshot"] = timed(lambda q: snapshot.query(
+                    [q.tolist()], n_results=args.k, where=where, include=["distances"]
+                ), queries)
+                rows.append(row)
+                print(json.dumps(row), file=sys.stderr)
+
+    print(json.dumps({"config": vars(args), "results": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
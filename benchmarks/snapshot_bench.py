@@ -0,0 +1,150 @@
+"""
+Snapshot export/import benchmark at configurable (GB) scale.
+
+Builds a synthetic corpus of --vectors chunks (--dim wide float32 vectors,
+--doc-chars of text, chunk metadata) and reports:
+- write: snapshot files written from memory (the format's own throughput)
+- import: load_snapshot into a fresh Chroma collection, no embedding calls
+- export: write_snapshot back out of Chroma
+- verify: checksum pass over the exported files
+- bytes on disk for the snapshot and for the Chroma directory
+- cold start: fresh process opening the snapshot / the Chroma collection and
+  answering one query
+Throughput is given in chunks/s and MB/s of snapshot data.
+
+Usage: python benchmarks/snapshot_bench.py --vectors 300000 --dim 768   # ~1 GB of vectors
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNAPSHOT_COLD_START = """
+import sys, time
+start = time.perf_counter()
+import numpy as np
+from app.services.snapshot import SnapshotCollection
+snapshot = SnapshotCollection(sys.argv[1])
+snapshot.query([np.asarray(snapshot.vectors[0]).tolist()], n_results=5)
+print(time.perf_counter() - start)
+"""
+
+CHROMA_COLD_START = """
+import sys, time
+start = time.perf_counter()
+import chromadb
+collection = chromadb.PersistentClient(path=sys.argv[1]).get_collection("bench")
+first = collection.get(limit=1, include=["embeddings"])["embeddings"][0]
+collection.query(query_embeddings=[first], n_results=5)
+print(time.perf_counter() - start)
+"""
+
+
+class SyntheticSource:
+    """Collection-shaped source generating rows on the fly, so the corpus never sits in memory."""
+
+    def __init__(self, n: int, dim: int, doc_chars: int, seed: int):
+        self.n, self.dim, self.doc_chars, self.seed = n, dim, doc_chars, seed
+
+    def get(self, include, limit: int, offset: int, **_):
+        end = min(self.n, offset + limit)
+        rows = range(offset, end)
+        rng = np.random.default_rng(self.seed + offset)
+        filler = "Disconnect power before servicing. Check torque on every fastener. "
+        text = (filler * (self.doc_chars // len(filler) + 1))[:self.doc_chars]
+        return {
+            "ids": [f"doc{i // 400}_p{i // 4}_c{i}" for i in rows],
+            "embeddings": rng.standard_normal((len(rows), self.dim)).astype(np.float32),
+            "documents": [f"Procedure {i}. {text}" for i in rows],
+            "metadatas": [
+                {"source": f"/static/documents/doc{i // 400}.pdf", "filename": f"doc{i // 400}.pdf",
+                 "page_number": i // 4 + 1, "chunk_index": i % 4}
+                for i in rows
+            ],
+        }
+
+
+def directory_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def rates(chunks: int, size: int, seconds: float) -> dict:
+    return {
+        "seconds": round(seconds, 2),
+        "chunks_per_s": round(chunks / max(seconds, 1e-9), 1),
+        "mb_per_s": round(size / 1e6 / max(seconds, 1e-9), 1),
+    }
+
+
+def cold_start(script: str, path: str, env: dict) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", script, path], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return round(float(out.stdout.split()[-1]), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--doc-chars", type=int, default=800)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="keep the files here instead of a temporary directory")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    sys.path.insert(0, ROOT)
+    import chromadb
+    from app.services.snapshot import SnapshotCollection, load_snapshot, verify_snapshot, write_snapshot
+
+    env = dict(os.environ, PYTHONPATH=ROOT, LOG_LEVEL="WARNING")
+    with tempfile.TemporaryDirectory(prefix="snapshot-bench-") as tmp:
+        workdir = args.workdir or tmp
+        source_path = os.path.join(workdir, "source")
+        export_path = os.path.join(workdir, "export")
+        chroma_path = os.path.join(workdir, "chroma")
+        report = {"config": vars(args)}
+
+        start = time.perf_counter()
+        manifest = write_snapshot(SyntheticSource(args.vectors, args.dim, args.doc_chars, args.seed),
+                                  source_path, args.batch_size)
+        size = directory_bytes(source_path)
+        report["snapshot_bytes"] = size
+        report["write"] = rates(manifest["count"], size, time.perf_counter() - start)
+        print(json.dumps({"write": report["write"]}), file=sys.stderr)
+
+        client = chromadb.PersistentClient(path=chroma_path)
+        collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"})
+        snapshot = SnapshotCollection(source_path)
+        start = time.perf_counter()
+        load_snapshot(snapshot, collection, min(args.batch_size, client.get_max_batch_size()))
+        report["import"] = rates(snapshot.count(), size, time.perf_counter() - start)
+        report["chroma_bytes"] = directory_bytes(chroma_path)
+        print(json.dumps({"import": report["import"]}), file=sys.stderr)
+
+        start = time.perf_counter()
+        write_snapshot(collection, export_path, args.batch_size)
+        report["export"] = rates(collection.count(), directory_bytes(export_path), time.perf_counter() - start)
+        print(json.dumps({"export": report["export"]}), file=sys.stderr)
+
+        start = time.perf_counter()
+        verify_snapshot(export_path)
+        report["verify"] = rates(collection.count(), directory_bytes(export_path), time.perf_counter() - start)
+
+        report["cold_start_s"] = {
+            "snapshot": cold_start(SNAPSHOT_COLD_START, export_path, env),
+            "chroma": cold_start(CHROMA_COLD_START, chroma_path, env),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Startup benchmark: import time of app.main and time until /readyz.
+
+Each measurement runs in a fresh interpreter against the fake LLM backend
+and a throwaway data directory. Reports:
+- import: min/median seconds to `import app.main` over --runs
+- slowest imports: top modules by cumulative time (python -X importtime)
+- ready: seconds from app startup to the first /healthz and to /readyz 200,
+  optionally with --chunks chunks already stored so index loading is included
+
+--max-import-ms makes the run exit non-zero when the median import time
+exceeds the budget, for use as a regression check.
+
+Usage: python benchmarks/startup_bench.py --runs 5 --chunks 5000 --max-import-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import app.main
+print(time.perf_counter() - start)
+"""
+
+SEED_SCRIPT = """
+import asyncio, sys
+from app.services.vector_service import VectorService
+
+async def seed(n):
+    documents = [
+        {"content": f"Procedure {i}: check valve {i % 97} and torque setting {i % 13} on unit {i}",
+         "metadata": {"source": "/static/documents/seed.pdf", "filename": "seed.pdf",
+                      "page_number": i // 4 + 1, "chunk_index": i}}
+        for i in range(n)
+    ]
+    await VectorService().add_documents(documents)
+
+asyncio.run(seed(int(sys.argv[1])))
+"""
+
+READY_SCRIPT = """
+import time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+
+with TestClient(app.main.app) as client:
+    client.get("/healthz")
+    healthy = time.perf_counter()
+    while client.get("/readyz").status_code != 200:
+        if app.main.startup_state["status"] == "failed":
+            raise SystemExit(app.main.startup_state["error"])
+        time.sleep(0.01)
+    ready = time.perf_counter()
+print(imported - start, healthy - start, ready - start)
+"""
+
+
+def environment(workdir: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "LLM_BACKEND": "fake",
+        "GEMINI_RATE_LIMIT_RPS": "0",
+        "VECTOR_DB_PATH": os.path.join(workdir, "chroma_db"),
+        "UPLOAD_DIR": os.path.join(workdir, "documents"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "cache", "embeddings.sqlite3"),
+        "JOB_STORE_PATH": os.path.join(workdir, "cache", "jobs.sqlite3"),
+        "BM25_INDEX_PATH": os.path.join(workdir, "cache", "bm25.sqlite3"),
+        "DOCUMENT_REGISTRY_PATH": os.path.join(workdir, "cache", "documents.sqlite3"),
+        "DEDUP_INDEX_PATH": os.path.join(workdir, "cache", "dedup.sqlite3"),
+        "QUANTIZED_STORE_PATH": os.path.join(workdir, "cache", "vectors"),
+        "LOG_LEVEL": "WARNING",
+        "PYTHONPATH": ROOT,
+    })
+    return env
+
+
+def run(script: str, env: dict, *args: str, flags=()) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", script, *args],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+
+
+def slowest_imports(env: dict, top: int) -> list:
+    stderr = run("import app.main", env, flags=("-X", "importtime")).stderr
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        # Packages only; their submodules are included in the cumulative time
+        if "." not in name:
+            packages[name] = max(packages.get(name, 0), int(cumulative))
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"module": name, "ms": round(us / 1000, 1)} for name, us in ranked]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--chunks", type=int, default=0, help="chunks stored before measuring readiness")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-import-ms", type=float, help="fail when the median import exceeds this")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="startup-bench-") as workdir:
+        env = environment(workdir)
+        imports = [float(run(IMPORT_SCRIPT, env).stdout.split()[-1]) for _ in range(args.runs)]
+        if args.chunks:
+            run(SEED_SCRIPT, env, str(args.chunks))
+        ready = [tuple(map(float, run(READY_SCRIPT, env).stdout.split()[-3:])) for _ in range(args.runs)]
+        report = {
+            "import": {
+                "runs": args.runs,
+                "min_s": round(min(imports), 3),
+                "median_s": round(statistics.median(imports), 3),
+            },
+            "slowest_imports": slowest_imports(env, args.top),
+            "ready": {
+                "chunks": args.chunks,
+                "median_import_s": round(statistics.median(r[0] for r in ready), 3),
+                "median_healthy_s": round(statistics.median(r[1] for r in ready), 3),
+                "median_ready_s": round(statistics.median(r[2] for r in ready), 3),
+            },
+        }
+    print(json.dumps(report, indent=2))
+
+    if args.max_import_ms is not None and report["import"]["median_s"] * 1000 > args.max_import_ms:
+        print(f"Median import time exceeds {args.max_import_ms:.0f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
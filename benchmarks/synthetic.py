@@ -0,0 +1,104 @@
+"""Synthetic service-manual corpus shared by the benchmarks."""
+import random
+from typing import Dict, List, Optional
+
+COMPONENTS = [
+    "motor controller", "hydraulic pump", "mix manufacture unit", "conveyor drive",
+    "cooling fan", "pressure valve", "temperature sensor", "power supply board",
+]
+ACTIONS = ["calibrate", "replace", "inspect", "lubricate", "reset", "align"]
+
+
+def page_lines(n: int) -> List[str]:
+    """Default page text: three lines, one unique part number per page."""
+    return [
+        f"Service manual page {n}. Motor controller M-{n:03d}A setpoint calibration.",
+        "Disconnect power before opening the housing. Check torque on every fastener.",
+        f"Mix manufacture step {n}: verify the set point and log the reading.",
+    ]
+
+
+def build_pdf(pages: int, lines_for_page=page_lines) -> bytes:
+    """Build a minimal multi-page text PDF without third-party libraries."""
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # placeholder, filled in below
+    pages_obj = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    kids = []
+    for n in range(1, pages + 1):
+        lines = [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in lines_for_page(n)]
+        text = b"BT /F1 11 Tf 50 750 Td 14 TL " + b" ".join(
+            b"(" + line.encode("latin-1", "replace") + b") Tj T*" for line in lines
+        ) + b" ET"
+        stream = add(b"<< /Length %d >>\nstream\n" % len(text) + text + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_obj, font, stream)
+        ))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj
+    objects[pages_obj - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids)
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog, xref
+    )
+    return bytes(out)
+
+
+class SyntheticManual:
+    """
+    A manual where every page states one unique, checkable fact, so
+    retrieval quality can be scored: the question for page n must
+    retrieve page n.
+    """
+
+    def __init__(self, name: str, pages: int, seed: int = 0):
+        self.name = name
+        self.pages = pages
+        rng = random.Random(f"{name}:{seed}")
+        self.facts: Dict[int, Dict] = {}
+        for n in range(1, pages + 1):
+            self.facts[n] = {
+                "component": rng.choice(COMPONENTS),
+                "action": rng.choice(ACTIONS),
+                "part": f"{name[:2].upper()}-{n:04d}{rng.choice('ABCDEFGH')}",
+                "torque": rng.randint(5, 95),
+                "interval": rng.choice([100, 250, 500, 1000, 2000]),
+            }
+
+    def lines(self, n: int) -> List[str]:
+        fact = self.facts[n]
+        return [
+            f"{self.name} section {n}.",
+            f"To {fact['action']} the {fact['component']}, use part {fact['part']}.",
+            f"Tighten the {fact['part']} mounting bolts to {fact['torque']} Nm.",
+            f"Repeat the {fact['action']} procedure every {fact['interval']} operating hours.",
+            "Disconnect power before opening the housing. Wear protective gloves at all times.",
+        ]
+
+    def pdf(self) -> bytes:
+        return build_pdf(self.pages, self.lines)
+
+    def questions(self, limit: Optional[int] = None) -> List[Dict]:
+        """(question, expected page) pairs for recall@k."""
+        items = []
+        for n, fact in list(self.facts.items())[:limit]:
+            items.append({
+                "question": f"What torque do the {fact['part']} mounting bolts need?",
+                "page_number": n,
+            })
+        return items
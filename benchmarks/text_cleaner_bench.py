@@ -0,0 +1,102 @@
+"""
+Local text cleaner benchmark: clean_pdf_text vs clean_document_pages.
+
+Generates synthetic pages with the usual PyPDF2 extraction damage (running
+headers/footers, page numbers, words hyphenated across lines, letter-spaced
+headings, stray spaces before punctuation) and reports for each cleaner:
+- pages/sec
+- artifacts left behind, by kind
+- share of pages that would still be sent to the LLM cleaner
+  (dirtiness_score >= --threshold)
+
+Usage: python benchmarks/text_cleaner_bench.py --pages 2000
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.services.text_cleaner import clean_document_pages, clean_pdf_text, dirtiness_score  # noqa: E402
+
+SENTENCES = [
+    "Disconnect the power supply before removing the cover",
+    "Check the oil level in the gearbox every week",
+    "Replace the pressure valve seal when it shows wear",
+    "Inspect the motor control board for loose connectors",
+    "Tighten the mounting screws to the specified torque",
+    "Clean the cooling fan intake with compressed air",
+]
+SPLIT_WORDS = ["maintenance", "calibration", "temperature", "lubrication", "procedure", "connector"]
+HEADINGS = ["WARNING", "SAFETY NOTICE", "MOTOR CONTROL", "CHECK THE VALVE"]
+
+
+def dirty_page(n: int, rng: random.Random) -> str:
+    lines = ["ACME Mixer Service Manual", f"| Chapter {n // 20 + 1} | Maintenance | Section {n} |"]
+    heading = rng.choice(HEADINGS)
+    lines.append(" ".join(heading.replace(" ", "")) if rng.random() < 0.5 else heading)
+    for _ in range(rng.randint(3, 6)):
+        sentence = rng.choice(SENTENCES)
+        word = rng.choice(SPLIT_WORDS)
+        cut = rng.randint(3, len(word) - 3)
+        lines.append(f"{sentence} , then log the {word[:cut]}-")
+        lines.append(f"{word[cut:]} result  for unit {rng.randint(1, 99)} .")
+    lines.append(f"Page {n} of 999")
+    return "\n".join(lines)
+
+
+def count_artifacts(text: str) -> dict:
+    return {
+        "headers": text.count("ACME Mixer Service Manual"),
+        "breadcrumbs": text.count("| Chapter"),
+        "page_numbers": len(re.findall(r"Page \d+ of 999", text)),
+        "hyphen_splits": len(re.findall(r"[a-z]- ?\n?[a-z]", text)),
+        "letter_spaced": len(re.findall(r"\b(?:[A-Z] ){3,}[A-Z]\b", text)),
+        "space_before_punct": len(re.findall(r" [.,;:]", text)),
+    }
+
+
+def measure(name: str, clean, pages, threshold: float) -> dict:
+    start = time.perf_counter()
+    cleaned = clean(pages) if clean is not None else pages
+    elapsed = time.perf_counter() - start
+    artifacts = {}
+    for text in cleaned:
+        for kind, count in count_artifacts(text).items():
+            artifacts[kind] = artifacts.get(kind, 0) + count
+    dirty = sum(1 for text in cleaned if dirtiness_score(text) >= threshold)
+    return {
+        "cleaner": name,
+        "pages_per_sec": round(len(pages) / elapsed, 1) if clean is not None else None,
+        "artifacts_left": artifacts,
+        "pages_needing_llm": dirty,
+        "llm_share": round(dirty / len(pages), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--threshold", type=float, default=0.15)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages = [dirty_page(n, rng) for n in range(1, args.pages + 1)]
+
+    report = {
+        "pages": args.pages,
+        "raw": measure("none", None, pages, args.threshold),
+        "baseline": measure("clean_pdf_text", lambda texts: [clean_pdf_text(t) for t in texts], pages, args.threshold),
+        "local": measure("clean_document_pages", clean_document_pages, pages, args.threshold),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
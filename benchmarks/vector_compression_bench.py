@@ -0,0 +1,138 @@
+"""
+Compact vector storage benchmark: Matryoshka truncation x quantization.
+
+Builds a synthetic embedding corpus whose energy is concentrated in the
+leading dimensions (as with Matryoshka-trained models such as
+gemini-embedding-001), and for every (dimensions, quantization) setting
+reports:
+- vector memory in bytes (codes + scales, or float32 for Chroma)
+- p50/p95 search latency
+- recall@k against exact full-width float32 search
+
+"none" rows search Chroma's HNSW index; float16 / int8 rows run the
+QuantizedVectorStore scan followed by the float re-scoring pass that
+VectorService applies.
+
+Usage: python benchmarks/vector_compression_bench.py --vectors 20000 --dim 3072
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def synthetic_corpus(n: int, dim: int, queries: int, seed: int):
+    rng = np.random.default_rng(seed)
+    topics = 64
+    decay = 1.0 / (1.0 + np.arange(dim) / 64.0)
+    basis = rng.standard_normal((topics, dim)).astype(np.float32) * decay
+    mix = rng.dirichlet(np.full(topics, 0.1), size=n).astype(np.float32)
+    corpus = mix @ basis + 0.02 * rng.standard_normal((n, dim)).astype(np.float32) * decay
+    picks = rng.choice(n, size=queries, replace=False)
+    query = corpus[picks] + 0.05 * rng.standard_normal((queries, dim)).astype(np.float32) * decay
+    normalize = lambda x: x / np.linalg.norm(x, axis=1, keepdims=True)  # noqa: E731
+    return normalize(corpus), normalize(query)
+
+
+def percentiles(samples):
+    cuts = statistics.quantiles(sorted(samples), n=100)
+    return {"p50_ms": round(cuts[49] * 1000, 3), "p95_ms": round(cuts[94] * 1000, 3)}
+
+
+def recall(found, truth, k: int) -> float:
+    return float(np.mean([len(set(f[:k]) & set(t[:k])) / k for f, t in zip(found, truth)]))
+
+
+def bench_chroma(corpus, queries, k: int, workdir: str, dims: int) -> dict:
+    import chromadb
+
+    client = chromadb.PersistentClient(path=os.path.join(workdir, f"chroma-{dims}"))
+    collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"})
+    ids = [str(i) for i in range(len(corpus))]
+    for start in range(0, len(corpus), 2000):
+        collection.add(ids=ids[start:start + 2000], embeddings=corpus[start:start + 2000])
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query], n_results=k, include=[])
+        latencies.append(time.perf_counter() - start)
+        found.append([int(i) for i in result["ids"][0]])
+    return {"bytes": corpus.nbytes, "latencies": latencies, "found": found}
+
+
+def bench_quantized(corpus, queries, k: int, workdir: str, dims: int, quantization: str, multiplier: int) -> dict:
+    from app.services.quantized_store import QuantizedVectorStore
+
+    store = QuantizedVectorStore(path=os.path.join(workdir, f"store-{dims}-{quantization}"), quantization=quantization)
+    ids = [str(i) for i in range(len(corpus))]
+    for start in range(0, len(corpus), 5000):
+        store.add(ids[start:start + 5000], corpus[start:start + 5000])
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        candidates = [int(chunk_id) for chunk_id, _ in store.search(query, k * multiplier)]
+        # Float re-scoring; the service reads these vectors back from Chroma
+        scores = corpus[candidates] @ query
+        best = [candidates[i] for i in np.argsort(-scores)[:k]]
+        latencies.append(time.perf_counter() - start)
+        found.append(best)
+    return {"bytes": store.stats()["bytes"], "latencies": latencies, "found": found}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--dimensions", default="0,1536,768,256", help="truncation widths, 0 = full")
+    parser.add_argument("--quantizations", default="none,float16,int8")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rescore-multiplier", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    sys.path.insert(0, ROOT)
+    from app.services.quantized_store import truncate_embeddings
+
+    corpus, queries = synthetic_corpus(args.vectors, args.dim, args.queries, args.seed)
+    truth = np.argsort(-(queries @ corpus.T), axis=1)[:, :args.k].tolist()
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="vector-bench-") as workdir:
+        for dims in [int(d) for d in args.dimensions.split(",")]:
+            width = dims or args.dim
+            small_corpus = np.asarray(truncate_embeddings(corpus, dims), dtype=np.float32)
+            small_queries = np.asarray(truncate_embeddings(queries, dims), dtype=np.float32)
+            for quantization in args.quantizations.split(","):
+                if quantization == "none":
+                    result = bench_chroma(small_corpus, small_queries, args.k, workdir, width)
+                else:
+                    result = bench_quantized(
+                        small_corpus, small_queries, args.k, workdir, width, quantization, args.rescore_multiplier
+                    )
+                rows.append({
+                    "dimensions": width,
+                    "quantization": quantization,
+                    "vector_bytes": int(result["bytes"]),
+                    **percentiles(result["latencies"]),
+                    f"recall@{args.k}": round(recall(result["found"], truth, args.k), 4),
+                })
+                print(json.dumps(rows[-1]), file=sys.stderr)
+
+    print(json.dumps({
+        "config": {"vectors": args.vectors, "dim": args.dim, "queries": args.queries, "k": args.k,
+                   "rescore_multiplier": args.rescore_multiplier},
+        "results": rows,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Settings are read at import time: point every store at a scratch directory
+# and use the deterministic fake LLM backend before anything imports app.*
+_STATE = tempfile.mkdtemp(prefix="pdf-search-tests-")
+os.environ.update({
+    "LLM_BACKEND": "fake",
+    "FAKE_EMBEDDING_DIM": "64",
+    "LOG_LEVEL": "WARNING",
+    "WARMUP_ENABLED": "false",
+    "VECTOR_DB_PATH": os.path.join(_STATE, "chroma"),
+    "UPLOAD_DIR": os.path.join(_STATE, "documents"),
+    "EMBEDDING_CACHE_PATH": os.path.join(_STATE, "embeddings.sqlite3"),
+    "BM25_INDEX_PATH": os.path.join(_STATE, "bm25.sqlite3"),
+    "JOB_STORE_PATH": os.path.join(_STATE, "jobs.sqlite3"),
+    "DOCUMENT_REGISTRY_PATH": os.path.join(_STATE, "documents.sqlite3"),
+    "DEDUP_INDEX_PATH": os.path.join(_STATE, "dedup.sqlite3"),
+    "QUANTIZED_STORE_PATH": os.path.join(_STATE, "vectors"),
+    "WRITER_LOCK_PATH": os.path.join(_STATE, "writer.lock"),
+    "STORE_VERSION_PATH": os.path.join(_STATE, "store_version"),
+    "SNAPSHOT_DIR": os.path.join(_STATE, "snapshots"),
+    "PAGE_CACHE_DIR": os.path.join(_STATE, "pages"),
+})
+
+
+@pytest.fixture
+def vector_service():
+    """The shared VectorService over an emptied store."""
+    import asyncio
+
+    from app.services.vector_service import VectorService
+
+    if not hasattr(vector_service, "instance"):
+        vector_service.instance = VectorService()
+    service = vector_service.instance
+    asyncio.run(service.delete_all())
+    return service
+
+
+@pytest.fixture
+def client():
+    """TestClient over the app once startup reports ready."""
+    import time
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        for _ in range(400):
+            if client.get("/readyz").status_code == 200:
+                break
+            time.sleep(0.05)
+        yield client
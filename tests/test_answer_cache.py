@@ -0,0 +1,68 @@
+from app.main import answer_cache, vector_service
+from app.services.answer_cache import AnswerCache
+
+
+def test_exact_hit_ignores_case_and_punctuation():
+    cache = AnswerCache()
+    cache.put("What is the torque?", 3, None, "45 Nm")
+    assert cache.get_exact("what is the TORQUE", 3) == "45 Nm"
+    assert cache.get_exact("what is the torque", 5) is None
+
+
+def test_semantic_hit_within_distance():
+    cache = AnswerCache(max_distance=0.05)
+    cache.put("What is the torque?", 3, [1.0, 0.0, 0.0], "45 Nm")
+    assert cache.get_semantic([0.999, 0.01, 0.0], 3) == "45 Nm"
+    assert cache.get_semantic([0.0, 1.0, 0.0], 3) is None
+
+
+def test_puts_extend_the_semantic_matrix_without_rebuilding(monkeypatch):
+    cache = AnswerCache(max_entries=4, max_distance=0.05)
+    cache.put("seed", 3, [0.0, 0.0, 1.0], "seed")
+    assert cache.get_semantic([0.0, 0.0, 1.0], 3) == "seed"
+    rebuilds = []
+    rebuild = cache._rebuild_matrix
+    monkeypatch.setattr(cache, "_rebuild_matrix", lambda: (rebuilds.append(1), rebuild()))
+
+    for i in range(1, 40):
+        vector = [float(i), 1.0, 0.0]
+        cache.put(f"q{i}", 3, vector, f"a{i}")
+        assert cache.get_semantic(vector, 3) == f"a{i}"
+    assert rebuilds == []
+    # Evicted entries no longer match, and stale rows were compacted away
+    assert cache.get_semantic([1.0, 1.0, 0.0], 3) is None
+    assert cache.get_semantic([0.0, 0.0, 1.0], 3) is None
+    assert len(cache._matrix_keys) <= 2 * cache.max_entries
+
+
+def test_corpus_change_invalidates_and_skips_stale_puts():
+    cache = AnswerCache()
+    version = cache.version
+    cache.put("q", 3, None, "old")
+    cache.invalidate()
+    assert cache.get_exact("q", 3) is None
+    cache.put("q", 3, None, "computed before the change", version=version)
+    assert cache.get_exact("q", 3) is None
+
+
+def test_ttl_expiry():
+    cache = AnswerCache(ttl=-1)
+    cache.put("q", 3, None, "a")
+    assert cache.get_exact("q", 3) is None
+
+
+def test_search_errors_are_not_cached(client, monkeypatch):
+    async def failing_dense_query(*args, **kwargs):
+        raise ConnectionError("chroma unavailable")
+
+    answer_cache.invalidate()
+    monkeypatch.setattr(vector_service.get(), "_dense_query", failing_dense_query)
+    for path, body in (
+        ("/query", {"question": "What is the torque?", "top_k": 3}),
+        ("/query/batch", {"questions": ["What is the torque?"], "top_k": 3}),
+    ):
+        response = client.post(path, json=body)
+        assert response.status_code == 500
+    response = client.post("/query/stream", json={"question": "What is the torque?", "top_k": 3})
+    assert "event: error" in response.text
+    assert answer_cache.stats()["entries"] == 0
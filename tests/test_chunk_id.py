@@ -0,0 +1,18 @@
+from app.services.vector_service import chunk_id
+
+
+def metadata(page: int, chunk_index: int = 0) -> dict:
+    return {"source": "/static/documents/manual.pdf", "page_number": page, "chunk_index": chunk_index}
+
+
+def test_chunk_id_is_stable_across_runs():
+    # A fixed value: ids must not depend on the process (hash seeds, ordering)
+    assert chunk_id(metadata(3), "Check torque on every fastener.") == "a7d439fe9741f16218ee"
+
+
+def test_identical_text_on_different_pages_gets_different_ids():
+    text = "Disconnect power before opening the housing."
+    ids = {chunk_id(metadata(page), text) for page in range(1, 6)}
+    assert len(ids) == 5
+    assert chunk_id(metadata(1, 0), text) != chunk_id(metadata(1, 1), text)
+    assert chunk_id(metadata(1), text) != chunk_id(metadata(1), text + " Revised.")
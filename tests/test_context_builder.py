@@ -0,0 +1,40 @@
+import numpy as np
+
+from app.services.context_builder import _merge_overlap, assemble_context, estimate_tokens, mmr_order
+
+
+def result(content: str, page: int, chunk_index: int, distance: float = 0.2, embedding=None) -> dict:
+    return {
+        "content": content, "filename": "manual.pdf", "page_number": page, "chunk_index": chunk_index,
+        "distance": distance, "embedding": embedding,
+    }
+
+
+def test_mmr_skips_near_duplicate():
+    relevance = np.array([0.9, 0.89, 0.7])
+    embeddings = np.array([[1.0, 0.0], [0.99, 0.05], [0.0, 1.0]])
+    assert mmr_order(relevance, embeddings, lambda_=0.5) == [0, 2, 1]
+    # Pure relevance keeps the duplicate second
+    assert mmr_order(relevance, embeddings, lambda_=1.0) == [0, 1, 2]
+
+
+def test_context_stays_within_token_budget():
+    results = [result(f"{page} " + "x" * 400, page, 0, embedding=[1.0, float(page)]) for page in range(1, 7)]
+    context, used = assemble_context(results, token_budget=250, max_chunks=10)
+    assert len(used) == 2
+    assert sum(estimate_tokens(r["content"]) for r in used) <= 250
+    assert estimate_tokens(context) <= 250
+
+
+def test_adjacent_chunks_merge_without_repeated_overlap():
+    assert _merge_overlap("turn the dial to 3.", "dial to 3. Then wait.") == "turn the dial to 3. Then wait."
+    assert _merge_overlap("Step one.", "Step two.") == "Step one. Step two."
+
+    results = [
+        result("Open the cover. Remove the", 4, 0),
+        result("Remove the filter cartridge.", 4, 1),
+        result("Unrelated warranty terms.", 9, 0),
+    ]
+    context, used = assemble_context(results, token_budget=1000, max_chunks=10)
+    assert len(used) == 3
+    assert context == "Open the cover. Remove the filter cartridge.\n\nUnrelated warranty terms."
@@ -0,0 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.coordination import StoreVersion
+
+
+def test_concurrent_bumps_are_not_lost(tmp_path):
+    version = StoreVersion(path=str(tmp_path / "store_version"))
+
+    def bump_many(_):
+        for _ in range(50):
+            version.bump()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(bump_many, range(8)))
+    assert version.read() == 400
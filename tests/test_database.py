@@ -0,0 +1,62 @@
+import chromadb
+import pytest
+
+from app.core.database import recover_collection_swap, swap_collection
+
+NAME = "chunks"
+
+
+@pytest.fixture
+def client(tmp_path):
+    return chromadb.PersistentClient(path=str(tmp_path))
+
+
+def collection(client, name: str, rows: int):
+    created = client.create_collection(name=name, metadata={"hnsw:space": "cosine"})
+    if rows:
+        created.add(ids=[f"{name}-{i}" for i in range(rows)], embeddings=[[1.0, float(i)] for i in range(rows)])
+    return created
+
+
+def names(client):
+    return sorted(c if isinstance(c, str) else c.name for c in client.list_collections())
+
+
+def test_swap_interrupted_between_renames_is_finished(client):
+    live = collection(client, NAME, 2)
+    collection(client, f"{NAME}__staging", 3)
+    live.modify(name=f"{NAME}__previous")
+    assert recover_collection_swap(client, NAME) == "finished the interrupted swap"
+    assert names(client) == [NAME] and client.get_collection(NAME).count() == 3
+
+
+def test_lone_backup_is_restored(client):
+    collection(client, f"{NAME}__previous", 2)
+    assert recover_collection_swap(client, NAME) == "restored the previous collection"
+    assert names(client) == [NAME] and client.get_collection(NAME).count() == 2
+
+
+def test_empty_recreated_live_collection_is_replaced(client):
+    collection(client, f"{NAME}__previous", 2)
+    collection(client, f"{NAME}__staging", 3)
+    collection(client, NAME, 0)
+    recover_collection_swap(client, NAME)
+    assert names(client) == [NAME] and client.get_collection(NAME).count() == 3
+    collection(client, f"{NAME}__previous", 2)
+    collection(client, f"{NAME}__staging", 3)
+    with pytest.raises(RuntimeError):
+        recover_collection_swap(client, NAME)
+    assert len(names(client)) == 3
+
+
+def test_failed_fill_leaves_live_collection(client):
+    collection(client, NAME, 2)
+
+    def fail(staging):
+        staging.add(ids=["new"], embeddings=[[0.0, 1.0]])
+        raise ConnectionError("snapshot unreadable")
+
+    with pytest.raises(ConnectionError):
+        swap_collection(fail, client, NAME)
+    assert swap_collection(lambda staging: staging.add(ids=["new"], embeddings=[[0.0, 1.0]]), client, NAME) is None
+    assert names(client) == [NAME] and client.get_collection(NAME).get()["ids"] == ["new"]
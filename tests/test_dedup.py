@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from app.services.dedup import NearDuplicateIndex
+
+WARNING = (
+    "WARNING: Disconnect the mixer from mains power and wait five minutes for the capacitors "
+    "to discharge before removing the motor cover or touching any wiring inside the housing."
+)
+TORQUE = "Tighten the motor mount bolts in a star pattern to {} Nm and check again after the first hour of running."
+
+
+def chunk(filename: str, page: int, content: str, index: int = 0) -> dict:
+    return {
+        "content": content,
+        "metadata": {"source": f"/static/documents/{filename}", "filename": filename,
+                     "page_number": page, "chunk_index": index},
+    }
+
+
+@pytest.fixture
+def index(tmp_path):
+    return NearDuplicateIndex(path=str(tmp_path / "dedup.sqlite3"))
+
+
+def test_near_duplicate_folds_into_canonical(index):
+    index.add({"a": index.sign(WARNING)})
+    assert index.find("b", index.sign(WARNING.replace("five", "5 "))) is None  # numbers differ
+    assert index.find("b", index.sign(WARNING + " Always.")) == "a"
+    assert index.find("a", index.sign(WARNING)) is None
+
+
+def test_pending_chunks_fold_within_a_batch(index):
+    pending = {"a": index.sign(WARNING)}
+    assert index.find("b", index.sign(WARNING), pending) == "a"
+    assert index.find("a", index.sign(WARNING), pending) is None
+
+
+def test_different_numbers_stay_separate(index):
+    index.add({"a": index.sign(TORQUE.format(45))})
+    assert index.find("b", index.sign(TORQUE.format(53))) is None
+
+
+def test_release_promotes_first_surviving_reference(index):
+    index.add({"a": index.sign(WARNING)})
+    index.add_references([
+        ("b", "a", "other.pdf", "hb", {"filename": "Other.pdf", "page_number": 2}),
+        ("c", "a", "third.pdf", "hc", {"filename": "Third.pdf", "page_number": 7}),
+    ])
+    stored, promotions = index.release(["a"])
+    assert stored == ["a"]
+    assert promotions["a"][0] == "b"
+    assert index.references(["b"]) == {"b": [{"filename": "Third.pdf", "page_number": 7}]}
+    assert index.find("d", index.sign(WARNING)) == "b"
+
+
+def test_fold_is_recorded_only_after_the_write(vector_service):
+    documents = [chunk("manual.pdf", 1, WARNING), chunk("manual.pdf", 4, WARNING + " Always.", 1)]
+
+    async def failed_ingest():
+        unique, folded = await vector_service.deduplicate(documents)
+        assert len(unique) == 1 and len(folded["references"]) == 1
+        # The write fails here, so commit_dedup never runs
+
+    asyncio.run(failed_ingest())
+    assert vector_service.dedup_index.stats() == {"canonical_chunks": 0, "duplicate_chunks": 0}
+
+    async def ingest():
+        unique, folded = await vector_service.deduplicate([chunk("other.pdf", 3, WARNING)])
+        assert len(unique) == 1 and not folded["references"]
+        await vector_service.add_documents(unique)
+        return await vector_service.commit_dedup(folded)
+
+    assert asyncio.run(ingest()) == []
+    assert vector_service.dedup_index.stats() == {"canonical_chunks": 1, "duplicate_chunks": 0}
+
+
+def test_delete_keeps_content_reachable_through_duplicates(vector_service):
+    async def ingest(filename):
+        unique, folded = await vector_service.deduplicate([chunk(filename, 1, WARNING)])
+        await vector_service.add_documents(unique)
+        return await vector_service.commit_dedup(folded)
+
+    async def run():
+        assert await ingest("manual.pdf") == []
+        folded = await ingest("other.pdf")
+        assert len(folded) == 1
+        await vector_service.delete_document("/static/documents/manual.pdf")
+        stored = await vector_service.document_chunk_ids("other.pdf")
+        return stored, vector_service.collection.get(ids=stored, include=["metadatas"])
+
+    stored, rows = asyncio.run(run())
+    assert rows["ids"] == stored
+    assert rows["metadatas"][0]["filename"] == "other.pdf"
@@ -0,0 +1,45 @@
+import asyncio
+import time
+import uuid
+
+import numpy as np
+
+from app.services.embedding_cache import EmbeddingCache
+
+
+def test_cache_hit_skips_the_backend(vector_service, monkeypatch):
+    get_embeddings = vector_service.gemini.get_embeddings
+    calls = []
+
+    async def counting_get_embeddings(texts, task_type="retrieval_document"):
+        calls.append(list(texts))
+        return await get_embeddings(texts, task_type=task_type)
+
+    monkeypatch.setattr(vector_service.gemini, "get_embeddings", counting_get_embeddings)
+    texts = [f"Check torque on fastener {uuid.uuid4().hex}" for _ in range(2)]
+    first = asyncio.run(vector_service.embed(texts))
+    assert calls == [texts]
+
+    again = asyncio.run(vector_service.embed([texts[1], texts[0]]))
+    assert calls == [texts]
+    # Stored as float32
+    assert np.allclose(again, [first[1], first[0]], atol=1e-6)
+
+    extra = f"Replace the fuse {uuid.uuid4().hex}"
+    asyncio.run(vector_service.embed([texts[0], extra]))
+    assert calls == [texts, [extra]]
+
+
+def test_lru_bound_holds(tmp_path):
+    # Four float32s are 16 bytes: room for three vectors
+    cache = EmbeddingCache(path=str(tmp_path / "embeddings.sqlite3"), max_bytes=48)
+    for text in ("a", "b", "c"):
+        cache.put_many("model", "retrieval_document", [text], [[1.0, 2.0, 3.0, 4.0]])
+        time.sleep(0.01)
+    assert cache.get_many("model", "retrieval_document", ["a"]) == [[1.0, 2.0, 3.0, 4.0]]
+    time.sleep(0.01)
+
+    cache.put_many("model", "retrieval_document", ["d"], [[5.0, 6.0, 7.0, 8.0]])
+    found = cache.get_many("model", "retrieval_document", ["a", "b", "c", "d"])
+    assert [vector is not None for vector in found] == [True, False, True, True]
+    assert cache.stats()["bytes"] <= 48
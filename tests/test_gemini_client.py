@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from app.services.gemini_client import GeminiClient, TokenBucket, is_retryable
+
+
+def client(**overrides) -> GeminiClient:
+    options = dict(max_concurrency=4, rate_per_second=0, burst=1, max_retries=3, backoff_base=0.001, backoff_max=0.01)
+    return GeminiClient(**{**options, **overrides})
+
+
+def test_identical_in_flight_calls_share_one_call():
+    gemini = client()
+    calls = []
+
+    async def embed():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return [0.1, 0.2]
+
+    async def run():
+        same = await asyncio.gather(*(gemini.call("key", embed) for _ in range(5)))
+        other = await gemini.call("other", embed)
+        return same, other
+
+    same, other = asyncio.run(run())
+    assert same == [[0.1, 0.2]] * 5 and other == [0.1, 0.2]
+    assert len(calls) == 2
+    assert gemini._in_flight == {}
+
+
+@pytest.mark.parametrize("error", [ConnectionError("reset"), google_exceptions.TooManyRequests("quota")])
+def test_retryable_errors_are_retried(error):
+    gemini = client()
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise error
+        return "ok"
+
+    assert asyncio.run(gemini.call("key", flaky)) == "ok"
+    assert len(attempts) == 3
+
+
+@pytest.mark.parametrize("error", [ValueError("bad prompt"), google_exceptions.InvalidArgument("bad request")])
+def test_other_errors_are_not_retried(error):
+    gemini = client()
+    attempts = []
+
+    async def broken():
+        attempts.append(1)
+        raise error
+
+    assert not is_retryable(error)
+    with pytest.raises(type(error)):
+        asyncio.run(gemini.call("key", broken))
+    assert len(attempts) == 1
+
+
+def test_retries_stop_after_max_retries():
+    gemini = client(max_retries=2)
+    attempts = []
+
+    async def down():
+        attempts.append(1)
+        raise google_exceptions.ServiceUnavailable("down")
+
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        asyncio.run(gemini.call("key", down))
+    assert len(attempts) == 3
+
+
+def test_concurrency_is_capped():
+    gemini = client(max_concurrency=2)
+    active, peak = 0, 0
+
+    async def generate():
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    async def run():
+        await asyncio.gather(*(gemini.call(f"key-{i}", generate) for i in range(8)))
+
+    asyncio.run(run())
+    assert peak == 2
+
+
+def test_token_bucket_paces_calls_after_the_burst():
+    bucket = TokenBucket(rate=50, capacity=2)
+
+    async def run():
+        start = time.monotonic()
+        for _ in range(7):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # Two tokens are free; the other five wait 1/50 s each
+    assert asyncio.run(run()) >= 0.09
@@ -0,0 +1,55 @@
+import asyncio
+
+from app.services.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+from app.services.vector_service import chunk_id
+from tests.test_scope import chunk, ingest, search
+
+FILLER = [
+    "Lubricate the gearbox bearings every two hundred operating hours.",
+    "Clean the air intake filter with compressed air once a week.",
+    "Store spare belts flat in a cool and dry cupboard.",
+    "Check the drive belt tension before each production shift.",
+    "Replace worn brushes on the cleaning head as a matched pair.",
+]
+
+
+def test_tokenize_keeps_part_numbers_and_compounds():
+    terms = tokenize("Set point of the M-123A valve")
+    assert {"m-123a", "m123a", "m", "123a"} <= set(terms)
+    assert "setpoint" in terms
+    assert "the" not in terms and "of" not in terms
+
+
+def test_reciprocal_rank_fusion_order():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    # b is in both lists; a single first place beats a single second place
+    assert fused == ["b", "a", "d", "c"]
+
+
+def test_bm25_ranks_exact_term_hit_first(tmp_path):
+    index = LexicalIndex(path=str(tmp_path / "bm25.sqlite3"))
+    index.add(
+        ["valve", "filler-1", "filler-2"],
+        ["Torque the M-204B relief valve to 12 Nm.", *FILLER[:2]],
+    )
+    assert [chunk_id for chunk_id, _ in index.search("relief valve M-204B")][0] == "valve"
+    assert index.search("gearbox", ids={"valve"}) == []
+
+
+def test_hybrid_search_ranks_exact_part_number_first(vector_service):
+    ingest(vector_service, [chunk("manual.pdf", page, text) for page, text in enumerate(FILLER, 1)])
+    ingest(vector_service, [chunk("manual.pdf", 9, "Torque the M-204B relief valve to 12 Nm.")])
+    result = search(vector_service, "M-204B")
+    assert result["metadatas"][0][0]["page_number"] == 9
+
+
+def test_lexical_only_id_missing_from_collection_is_dropped(vector_service):
+    documents = [chunk("manual.pdf", page, text) for page, text in enumerate(FILLER, 1)]
+    ingest(vector_service, documents)
+    ids = [chunk_id(doc["metadata"], doc["content"]) for doc in documents]
+    [query_embedding] = asyncio.run(vector_service.embed(["belt"], task_type="retrieval_query"))
+    empty = {key: [[]] for key in ["ids", "documents", "metadatas", "distances", "embeddings"]}
+
+    fused = asyncio.run(vector_service._fuse(empty, ["ghost", ids[3]], query_embedding, top_k=5))
+    assert fused["ids"] == [[ids[3]]]
+    assert fused["documents"] == [[FILLER[3]]]
@@ -0,0 +1,153 @@
+import asyncio
+import time
+
+import pytest
+
+from app.main import vector_service
+from app.services.file_manager import discard_staged_pdf, get_pdf_path, staging_pdf_path
+from app.services.ingestion import IngestionQueue, JobStore
+from app.services.pdf_processor import PDFProcessor
+from benchmarks.synthetic import build_pdf, page_lines
+
+
+def upload(client, filename: str, pdf: bytes, update: bool = False) -> dict:
+    response = client.post(
+        f"/upload?update={str(update).lower()}", files={"file": (filename, pdf, "application/pdf")}
+    )
+    assert response.status_code == 202, response.text
+    return response.json()
+
+
+def wait(client, job_id: str) -> dict:
+    for _ in range(400):
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("completed", "failed", "cancelled"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish: {job}")
+
+
+def test_failed_job_leaves_nothing_searchable(client, monkeypatch):
+    client.delete("/documents/all")
+    service = vector_service.get()
+    add_documents = service.add_documents
+    calls = []
+
+    async def fail_second_range(documents, progress=None):
+        calls.append(len(documents))
+        if len(calls) > 1:
+            raise ConnectionError("embedding service unavailable")
+        return await add_documents(documents, progress)
+
+    monkeypatch.setattr(service, "add_documents", fail_second_range)
+    job = wait(client, upload(client, "Broken Manual.pdf", build_pdf(20))["job_id"])
+    assert job["status"] == "failed"
+    assert len(calls) == 2
+    assert service.collection.count() == 0
+    assert client.get("/documents").json() == []
+
+
+def test_registry_row_is_written_on_completion(client, monkeypatch):
+    client.delete("/documents/all")
+    service = vector_service.get()
+    job = wait(client, upload(client, "Manual.pdf", build_pdf(4))["job_id"])
+    assert job["status"] == "completed"
+    [before] = client.get("/documents").json()
+    assert before["page_count"] == 4 and before["chunk_count"] > 0
+
+    async def failing_add_documents(documents, progress=None):
+        raise ConnectionError("embedding service unavailable")
+
+    monkeypatch.setattr(service, "add_documents", failing_add_documents)
+    job = wait(client, upload(client, "Manual.pdf", build_pdf(6), update=True)["job_id"])
+    assert job["status"] == "failed"
+    job = wait(client, upload(client, "Empty.pdf", build_pdf(3))["job_id"])
+    assert job["status"] == "failed"
+    assert client.get("/documents").json() == [before]
+
+
+def test_failed_update_rolls_back_to_previous_revision(client, monkeypatch):
+    client.delete("/documents/all")
+    service = vector_service.get()
+    original = build_pdf(4)
+    assert wait(client, upload(client, "Manual.pdf", original)["job_id"])["status"] == "completed"
+    before = sorted(asyncio.run(service.document_chunk_ids("Manual.pdf")))
+    add_documents = service.add_documents
+    calls = []
+
+    async def fail_second_range(documents, progress=None):
+        calls.append(len(documents))
+        if len(calls) > 1:
+            raise ConnectionError("embedding service unavailable")
+        return await add_documents(documents, progress)
+
+    monkeypatch.setattr(service, "add_documents", fail_second_range)
+    job = wait(client, upload(client, "Manual.pdf", build_pdf(20), update=True)["job_id"])
+    assert job["status"] == "failed" and calls[0] > 0
+    assert sorted(asyncio.run(service.document_chunk_ids("Manual.pdf"))) == before
+    assert service.collection.count() == len(before)
+    assert get_pdf_path("Manual.pdf").read_bytes() == original
+    assert not any((get_pdf_path("Manual.pdf").parent / ".staging").iterdir())
+
+
+def test_one_unfinished_job_per_document(tmp_path):
+    store = JobStore(path=str(tmp_path / "jobs.sqlite3"))
+    job = store.create("Test Manual.pdf", "/static/documents/test_manual.pdf", "staged-1")
+    with pytest.raises(ValueError):
+        store.create("test_manual.pdf", "/static/documents/test_manual.pdf", "staged-2")
+    store.update(job["job_id"], status="completed")
+    assert store.create("test_manual.pdf", "/static/documents/test_manual.pdf", "staged-2")["status"] == "queued"
+
+
+def test_update_reembeds_only_changed_chunks(client):
+    client.delete("/documents/all")
+    service = vector_service.get()
+    assert wait(client, upload(client, "Manual.pdf", build_pdf(4))["job_id"])["status"] == "completed"
+    before = set(asyncio.run(service.document_chunk_ids("Manual.pdf")))
+
+    def revised(n):
+        lines = page_lines(n)
+        return [lines[0], "Revised: replace the fuse before resetting the controller."] if n == 2 else lines
+
+    job = wait(client, upload(client, "Manual.pdf", build_pdf(5, revised), update=True)["job_id"])
+    assert job["status"] == "completed" and job["mode"] == "update"
+    after = set(asyncio.run(service.document_chunk_ids("Manual.pdf")))
+    assert job["chunks_unchanged"] == len(before & after) > 0
+    assert job["chunks_removed"] == len(before - after) > 0
+    assert job["chunks_added"] == len(after - before) > 0
+    assert job["chunks_embedded"] == job["chunks_added"]
+    pages = {m["page_number"] for m in service.collection.get(ids=sorted(after - before))["metadatas"]}
+    assert pages == {2, 5}
+
+
+def test_cancel_between_dequeue_and_start_is_kept(vector_service, tmp_path):
+    store = JobStore(path=str(tmp_path / "jobs.sqlite3"))
+    staged = staging_pdf_path("Manual.pdf")
+    staged.parent.mkdir(parents=True, exist_ok=True)
+    staged.write_bytes(build_pdf(2))
+    read_by_worker = store.get
+
+    def get(job_id):
+        job = read_by_worker(job_id)
+        if get.armed and job["status"] == "queued":
+            # The cancel lands after the worker read the job as queued, before it starts
+            get.armed = False
+            store.update(job_id, status="cancelled")
+            discard_staged_pdf(job["file_path"], job["filename"])
+        return job
+
+    get.armed = False
+    store.get = get
+
+    async def run():
+        queue = IngestionQueue(PDFProcessor(), vector_service, store)
+        await queue.start(workers=1)
+        job = await queue.submit("Manual.pdf", "/static/documents/manual.pdf", str(staged))
+        get.armed = True
+        await queue._queue.join()
+        await queue.stop()
+        return job
+
+    job = asyncio.run(run())
+    assert read_by_worker(job["job_id"])["status"] == "cancelled"
+    assert vector_service.collection.count() == 0
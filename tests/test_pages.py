@@ -0,0 +1,56 @@
+import os
+
+from app.services.page_cache import PageCache
+from benchmarks.synthetic import build_pdf
+from tests.test_ingestion import upload, wait
+
+
+def test_page_range_etag_and_range(client):
+    client.delete("/documents/all")
+    assert wait(client, upload(client, "Manual.pdf", build_pdf(6))["job_id"])["status"] == "completed"
+
+    response = client.get("/document/Manual.pdf/pages/2-3")
+    assert response.status_code == 200 and response.headers["content-type"] == "application/pdf"
+    assert response.content.startswith(b"%PDF")
+    etag = response.headers["etag"]
+    body = response.content
+
+    assert client.get("/document/Manual.pdf/pages/2-3", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/document/Manual.pdf/pages/2-3", headers={"If-None-Match": '"other"'}).status_code == 200
+    assert client.get("/document/Manual.pdf/pages/4", headers={"If-None-Match": etag}).status_code == 200
+
+    partial = client.get("/document/Manual.pdf/pages/2-3", headers={"Range": "bytes=0-99"})
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == f"bytes 0-99/{len(body)}"
+    assert partial.content == body[:100]
+    stale = client.get("/document/Manual.pdf/pages/2-3", headers={"Range": "bytes=0-99", "If-Range": '"other"'})
+    assert stale.status_code == 200 and stale.content == body
+
+    # A re-upload changes the extract, so the old validator no longer matches
+    assert wait(client, upload(client, "Manual.pdf", build_pdf(7))["job_id"])["status"] == "completed"
+    assert client.get("/document/Manual.pdf/pages/2-3", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_page_range_errors(client):
+    client.delete("/documents/all")
+    assert client.get("/document/Missing.pdf/pages/1").status_code == 404
+    assert client.get("/document/Missing.pdf/pages/3-1").status_code == 400
+    assert client.get("/document/Missing.pdf/pages/x").status_code == 400
+
+
+def test_recently_served_extracts_are_not_evicted(tmp_path):
+    cache = PageCache(path=str(tmp_path), max_bytes=150)
+
+    def put(key):
+        extract = tmp_path / f"{key}.part"
+        extract.write_bytes(b"%PDF" + b"x" * 96)
+        return cache.put(key, "manual.pdf", str(extract))
+
+    served = put("a")
+    put("b")
+    # "a" may still be about to be opened by its response
+    assert os.path.exists(served) and cache.stats()["entries"] == 2
+    cache._conn.execute("UPDATE pages SET last_used = last_used - 60 WHERE key = 'a'")
+    put("c")
+    assert not os.path.exists(served) and cache.get("a") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from app.services.quantized_store import QuantizedVectorStore
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(7)
+    # Clustered like real chunk embeddings, so neighbours are close calls
+    centers = rng.normal(size=(20, 64))
+    vectors = centers[rng.integers(0, 20, size=2000)] + 0.35 * rng.normal(size=(2000, 64))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.choice(2000, size=50, replace=False)] + 0.1 * rng.normal(size=(50, 64))
+    return [f"c{i}" for i in range(2000)], vectors.astype(np.float32), queries.astype(np.float32)
+
+
+@pytest.mark.parametrize("quantization", ["int8", "float16"])
+def test_search_recall_against_exact_cosine(tmp_path, corpus, quantization):
+    ids, vectors, queries = corpus
+    store = QuantizedVectorStore(path=str(tmp_path), quantization=quantization)
+    store.add(ids, vectors.tolist())
+    exact = np.argsort(-(queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ vectors.T, axis=1)[:, :10]
+    found = store.search_many(queries.tolist(), 10)
+    recall = np.mean([
+        len({ids[i] for i in truth} & {chunk_id for chunk_id, _ in hits}) / 10 for truth, hits in zip(exact, found)
+    ])
+    assert recall >= (0.9 if quantization == "int8" else 0.99)
+
+
+def test_scoped_search_and_delete(tmp_path, corpus):
+    ids, vectors, queries = corpus
+    store = QuantizedVectorStore(path=str(tmp_path), quantization="int8")
+    store.add(ids, vectors.tolist())
+    scope = set(ids[:100])
+    assert {chunk_id for chunk_id, _ in store.search(queries[0].tolist(), 10, scope)} <= scope
+    store.delete(ids[:1000])
+    assert store.count() == 1000
+    assert all(int(chunk_id[1:]) >= 1000 for chunk_id, _ in store.search(queries[0].tolist(), 10))
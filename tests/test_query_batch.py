@@ -0,0 +1,37 @@
+from benchmarks.synthetic import build_pdf, page_lines
+from tests.test_ingestion import upload, wait
+
+
+def question(n: int) -> str:
+    return f"Motor controller M-{n:03d}A setpoint calibration"
+
+
+def page_text(n: int) -> str:
+    # A whole page: ranked first by both the dense and the lexical search
+    return " ".join(page_lines(n))
+
+
+def test_batch_answers_in_order_with_per_question_settings(client):
+    client.delete("/documents/all")
+    assert wait(client, upload(client, "Manual.pdf", build_pdf(6))["job_id"])["status"] == "completed"
+
+    response = client.post("/query/batch", json={
+        "questions": [
+            {"question": page_text(2), "top_k": 1, "threshold": 0},
+            {"question": page_text(5), "threshold": 0},
+            {"question": question(3), "threshold": 1},
+            question(4),
+        ],
+        "top_k": 3,
+    })
+    assert response.status_code == 200
+    first, second, strict, plain = response.json()["responses"]
+    assert [r["page_number"] for r in first["results"]] == [2]
+    assert len(second["results"]) == 3 and second["results"][0]["page_number"] == 5
+    assert strict == {"results": [], "answer": "Not found"}
+    assert len(plain["results"]) <= 3
+
+
+def test_batch_rejects_bad_per_question_settings(client):
+    for item in ({"question": "torque", "top_k": 0}, {"question": "torque", "threshold": 1.5}):
+        assert client.post("/query/batch", json={"questions": [item]}).status_code == 400
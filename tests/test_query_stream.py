@@ -0,0 +1,58 @@
+import json
+
+from app import main
+from app.main import gemini_service, vector_service
+from benchmarks.synthetic import build_pdf
+from tests.test_ingestion import upload, wait
+
+
+def events(client, question: str) -> list:
+    found = []
+    with client.stream("POST", "/query/stream", json={"question": question, "top_k": 3}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        for block in response.read().decode().split("\n\n"):
+            if block.strip():
+                event, data = block.split("\n", 1)
+                found.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return found
+
+
+def test_results_arrive_before_the_answer(client, monkeypatch):
+    # Fake embeddings of a short question sit far from whole-page chunks
+    monkeypatch.setattr(main, "SIMILARITY_THRESHOLD", 0.0)
+    client.delete("/documents/all")
+    assert wait(client, upload(client, "Manual.pdf", build_pdf(4))["job_id"])["status"] == "completed"
+
+    stream = events(client, "Motor controller M-003A setpoint calibration steps")
+    names = [name for name, _ in stream]
+    assert names[0] == "results" and names[-1] == "done"
+    assert set(names[1:-1]) == {"token"}
+    results, done = stream[0][1], stream[-1][1]
+    assert 3 in [r["page_number"] for r in results]
+    answer = "".join(data["text"] for name, data in stream if name == "token")
+    assert done["answer"] == answer.strip() and "M-003A" in answer
+    assert done["results"] == results
+
+
+def test_errors_are_reported_in_the_stream(client, monkeypatch):
+    monkeypatch.setattr(main, "SIMILARITY_THRESHOLD", 0.0)
+    client.delete("/documents/all")
+    assert wait(client, upload(client, "Manual.pdf", build_pdf(2))["job_id"])["status"] == "completed"
+
+    async def failing_stream_answer(question, context):
+        raise ConnectionError("generation unavailable")
+        yield
+
+    monkeypatch.setattr(gemini_service.get(), "stream_answer", failing_stream_answer)
+    stream = events(client, "Motor controller M-002A torque check")
+    assert [name for name, _ in stream] == ["results", "error"]
+    assert "generation unavailable" in stream[1][1]["detail"]
+
+    async def failing_embed(texts, task_type="retrieval_query"):
+        raise ConnectionError("embedding unavailable")
+
+    monkeypatch.setattr(vector_service.get(), "embed", failing_embed)
+    stream = events(client, "Motor controller M-001A fastener torque")
+    assert [name for name, _ in stream] == ["error"]
+    assert "embedding unavailable" in stream[0][1]["detail"]
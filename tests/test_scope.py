@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+WARNING = (
+    "WARNING: Disconnect the mixer from mains power and wait five minutes for the capacitors "
+    "to discharge before removing the motor cover or touching any wiring inside the housing."
+)
+
+
+def chunk(filename: str, page: int, content: str) -> dict:
+    return {
+        "content": content,
+        "metadata": {"source": f"/static/documents/{filename}", "filename": filename,
+                     "page_number": page, "chunk_index": 0},
+    }
+
+
+def ingest(service, documents):
+    async def run():
+        unique, folded = await service.deduplicate(documents)
+        await service.add_documents(unique)
+        await service.commit_dedup(folded)
+
+    asyncio.run(run())
+
+
+def search(service, question: str, **filters):
+    async def run():
+        scope = await service.resolve_scope(**filters)
+        [result] = await service.query_batch([question], top_k=10, scope=scope)
+        return result
+
+    return asyncio.run(run())
+
+
+def corpus(service):
+    ingest(service, [
+        chunk(filename, page, f"{filename} page {page}: calibrate the motor controller M-{page:03d}A setpoint.")
+        for filename in ("alpha.pdf", "beta.pdf") for page in range(1, 6)
+    ] + [chunk("alpha.pdf", 6, WARNING)])
+    ingest(service, [chunk("beta.pdf", 6, WARNING)])
+
+
+def test_filename_and_page_range_scope(vector_service):
+    corpus(vector_service)
+    result = search(vector_service, "calibrate the motor controller", filenames=["beta.pdf"], page_from=2, page_to=4)
+    pages = {(m["filename"], m["page_number"]) for m in result["metadatas"][0]}
+    assert pages and pages <= {("beta.pdf", 2), ("beta.pdf", 3), ("beta.pdf", 4)}
+
+
+def test_scope_includes_chunks_folded_into_other_documents(vector_service):
+    corpus(vector_service)
+    result = search(vector_service, "disconnect mains power capacitors", filenames=["beta.pdf"], page_from=6)
+    # beta.pdf's copy of the warning was folded into alpha.pdf's stored chunk
+    assert [m["filename"] for m in result["metadatas"][0]] == ["alpha.pdf"]
+
+
+def test_empty_ingest_window_matches_nothing(vector_service):
+    corpus(vector_service)
+    result = search(vector_service, "calibrate the motor controller", ingested_after=time.time() + 3600)
+    assert result["ids"] == [[]]
@@ -0,0 +1,98 @@
+import asyncio
+
+import numpy as np
+
+from app.services.snapshot import SnapshotCollection, load_dedup, load_snapshot, write_snapshot
+
+WARNING = (
+    "WARNING: Disconnect the mixer from mains power and wait five minutes for the capacitors "
+    "to discharge before removing the motor cover or touching any wiring inside the housing."
+)
+
+
+class ShrinkingCollection:
+    """In-memory collection that loses its first row once the export has read one batch."""
+
+    def __init__(self, rows: int):
+        self.rows = {
+            f"c{i}": (np.full(4, i + 1, dtype=np.float32), f"chunk {i}", {"filename": "manual.pdf", "page_number": i})
+            for i in range(rows)
+        }
+        self.reads = 0
+
+    def get(self, ids=None, include=(), limit=None, offset=0):
+        if self.reads == 1:
+            del self.rows["c0"]
+        self.reads += 1
+        if ids is None:
+            ids = list(self.rows)[offset:None if limit is None else offset + limit]
+        ids = [chunk_id for chunk_id in ids if chunk_id in self.rows]
+        return {
+            "ids": ids,
+            "embeddings": [self.rows[i][0] for i in ids],
+            "documents": [self.rows[i][1] for i in ids],
+            "metadatas": [self.rows[i][2] for i in ids],
+        }
+
+
+def test_rows_deleted_during_export_do_not_drop_others(tmp_path):
+    write_snapshot(ShrinkingCollection(5), str(tmp_path), batch_size=2)
+    snapshot = SnapshotCollection(str(tmp_path))
+    assert snapshot.get()["ids"] == ["c1", "c2", "c3", "c4"]
+
+
+def test_round_trip_keeps_folded_duplicates(vector_service, tmp_path):
+    def chunk(filename: str) -> dict:
+        return {"content": WARNING, "metadata": {
+            "source": f"/static/documents/{filename}", "filename": filename, "page_number": 1, "chunk_index": 0,
+        }}
+
+    async def ingest(filename: str):
+        unique, folded = await vector_service.deduplicate([chunk(filename)])
+        await vector_service.add_documents(unique)
+        return await vector_service.commit_dedup(folded)
+
+    asyncio.run(ingest("manual.pdf"))
+    assert len(asyncio.run(ingest("other.pdf"))) == 1
+    manifest = write_snapshot(vector_service.collection, str(tmp_path), dedup_index=vector_service.dedup_index)
+    assert manifest["dedup"] == {"signatures": 1, "duplicate_refs": 1, "num_perm": 128}
+    stats = vector_service.dedup_index.stats()
+
+    asyncio.run(vector_service.delete_all())
+    snapshot = SnapshotCollection(str(tmp_path))
+    assert load_snapshot(snapshot, vector_service.collection) == 1
+    assert load_dedup(snapshot, vector_service.dedup_index) == {"signatures": 1, "duplicate_refs": 1}
+    assert vector_service.dedup_index.stats() == stats
+    assert len(asyncio.run(vector_service.document_chunk_ids("other.pdf"))) == 1
+    assert vector_service.dedup_index.find("new", vector_service.dedup_index.sign(WARNING)) is not None
+
+
+def test_round_trip_preserves_rows_and_search(vector_service, tmp_path):
+    documents = [
+        {"content": f"Page {page}: calibrate the motor controller M-{page:03d}A setpoint to {page * 5} Nm.",
+         "metadata": {"source": "/static/documents/manual.pdf", "filename": "manual.pdf",
+                      "page_number": page, "chunk_index": 0}}
+        for page in range(1, 13)
+    ]
+    asyncio.run(vector_service.add_documents(documents))
+    collection = vector_service.collection
+    original = collection.get(include=["documents", "metadatas", "embeddings"])
+    query = [original["embeddings"][3].tolist()]
+    expected = collection.query(query_embeddings=query, n_results=5)["ids"]
+
+    manifest = write_snapshot(collection, str(tmp_path), batch_size=5)
+    assert manifest["count"] == 12
+    snapshot = SnapshotCollection(str(tmp_path))
+    assert snapshot.query(query, n_results=5)["ids"] == expected
+    assert snapshot.query(query, n_results=5, where={"page_number": {"$gte": 10}})["ids"][0] == \
+        collection.query(query_embeddings=query, n_results=3, where={"page_number": {"$gte": 10}})["ids"][0]
+
+    asyncio.run(vector_service.delete_all())
+    assert load_snapshot(snapshot, collection, batch_size=5) == 12
+    restored = collection.get(ids=original["ids"], include=["documents", "metadatas", "embeddings"])
+    by_id = dict(zip(restored["ids"], zip(restored["documents"], restored["metadatas"], restored["embeddings"])))
+    for chunk_id, document, metadata, embedding in zip(
+        original["ids"], original["documents"], original["metadatas"], original["embeddings"]
+    ):
+        assert by_id[chunk_id][:2] == (document, metadata)
+        assert np.allclose(by_id[chunk_id][2], embedding)
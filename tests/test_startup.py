@@ -0,0 +1,19 @@
+from app.main import startup_state
+
+
+def test_data_endpoints_answer_503_until_ready(client, monkeypatch):
+    monkeypatch.setitem(startup_state, "status", "starting")
+    assert client.get("/healthz").status_code == 200
+    assert client.get("/readyz").status_code == 503
+    for method, path, body in (
+        ("get", "/documents", None),
+        ("get", "/jobs", None),
+        ("get", "/cache/stats", None),
+        ("post", "/query", {"question": "How do I reset the motor controller?"}),
+        ("post", "/query/batch", {"questions": ["How do I reset the motor controller?"]}),
+        ("post", "/query/stream", {"question": "How do I reset the motor controller?"}),
+    ):
+        response = getattr(client, method)(path, json=body) if body else getattr(client, method)(path)
+        assert response.status_code == 503, path
+    monkeypatch.setitem(startup_state, "status", "ready")
+    assert client.get("/documents").status_code == 200
@@ -0,0 +1,71 @@
+import asyncio
+
+from app.core.config import settings
+from app.services.text_cleaner import clean_document_pages, clean_page_text, dirtiness_score
+
+
+def test_table_rows_are_kept():
+    page = (
+        "Torque table\n"
+        "Bolt size Nm\n"
+        "25 30\n"
+        "240\n"
+        "M-123A | 240V | 15 A\n"
+        "M-124B | 120V | 10 A\n"
+        "Tighten in a star pattern."
+    )
+    cleaned = clean_page_text(page)
+    for row in ("25 30", "240", "M-123A | 240V | 15 A", "M-124B | 120V | 10 A"):
+        assert row in cleaned
+
+
+def test_page_number_and_breadcrumb_dropped_at_page_edges():
+    page = "Manual | Motor | Setup\nDisconnect power before servicing.\nPage 12 of 40"
+    assert clean_page_text(page) == "Disconnect power before servicing."
+
+
+def test_repeated_header_dropped_but_multi_number_rows_kept():
+    pages = [
+        f"ACME Mixer Service Manual\nStep {n}: check the oil level.\nTorque 25 Nm 30 Nm\n{n}"
+        for n in range(1, 6)
+    ]
+    for n, cleaned in enumerate(clean_document_pages(pages), start=1):
+        assert "ACME Mixer Service Manual" not in cleaned
+        assert f"Step {n}: check the oil level." in cleaned
+        assert "Torque 25 Nm 30 Nm" in cleaned
+
+
+def test_letter_spaced_words_are_joined():
+    assert clean_page_text("Intro\nW A R N I N G disconnect power\nEnd") == "Intro WARNING disconnect power End"
+    assert clean_page_text("Intro\nC H E C K T H E O I L level\nEnd") == "Intro CHECK THE OIL level End"
+
+
+def test_single_letter_runs_are_not_joined():
+    for text in ("Steps: a b c d then go", "Options A B C D", "x y z q r", "T h e end"):
+        assert text in clean_page_text(f"Intro\n{text}\nEnd")
+
+
+def test_hyphen_split_rejoined():
+    assert clean_page_text("Regular main-\ntenance keeps the unit running.") == (
+        "Regular maintenance keeps the unit running."
+    )
+
+
+def test_dirtiness_score():
+    assert dirtiness_score("Disconnect power before servicing the motor.") == 0.0
+    assert dirtiness_score("D i s c o n n e c t p o w e r") > 0.5
+
+
+def test_cleaned_text_stored_only_when_it_differs(vector_service, monkeypatch):
+    async def clean(text):
+        return text.replace("m otor", "motor")
+
+    monkeypatch.setattr(vector_service.gemini, "clean_extracted_text", clean)
+    monkeypatch.setattr(settings, "CLEAN_DIRTY_THRESHOLD", 0.0)
+    documents = [
+        {"content": "Replace the m otor brushes every 500 hours.", "metadata": {}},
+        {"content": "Replace the motor brushes every 500 hours.", "metadata": {}},
+    ]
+    asyncio.run(vector_service.clean_documents(documents))
+    assert documents[0]["metadata"]["cleaned_text"] == "Replace the motor brushes every 500 hours."
+    assert "cleaned_text" not in documents[1]["metadata"]